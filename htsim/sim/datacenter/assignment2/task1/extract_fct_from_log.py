@@ -7,7 +7,11 @@ import sys
 import os
 import re
 import struct
-from statistics import mean, median
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "connection_matrices"))
+import cmgen
+import quantile_sketch
 
 def parse_binary_log(log_file):
     """Parse binary log file logout.dat"""
@@ -39,52 +43,43 @@ def parse_binary_log(log_file):
     
     return flow_completions
 
+# A DCTCP event line: timestamp DCTCP ... Uec_src_dst, of the first flow named on the line like task4 extract_fct.py
+DCTCP_EVENT = re.compile(r'^(\d+\.\d+)\s+DCTCP.*?\b(Uec_\d+_\d+)\b')
+
+def scan_dctcp_events(output_file):
+    """Scan output file once, returning (first time, last time) of the DCTCP events of each flow"""
+    events = {}
+    with open(output_file, 'r') as f:
+        for line in f:
+            match = DCTCP_EVENT.match(line)
+            if match:
+                current_time = float(match.group(1))
+                name = match.group(2)
+                if name in events:
+                    events[name] = (events[name][0], current_time)
+                else:
+                    events[name] = (current_time, current_time)
+    return events
+
 def calculate_fct_from_stats(output_file, connection_matrix_file):
-    """Calculate FCT from statistics and connection matrix"""
-    fcts = []
+    """Calculate FCT from statistics and connection matrix, returning a quantile sketch of the FCTs and the flows"""
+    fcts = quantile_sketch.QuantileSketch()
     flow_info = []
     
-    # Read connection matrix to get all flow information
+    # Read connection matrix to get all flow information, from its binary sidecar (see cmgen.binary)
     flows_from_cm = []
     if os.path.exists(connection_matrix_file):
-        with open(connection_matrix_file, 'r') as f:
-            for line in f:
-                if '->' in line:
-                    parts = line.split()
-                    src = None
-                    dst = None
-                    flow_size = 0
-                    start_time_us = 0
-                    
-                    # First extract source and destination (handle "0->8" format)
-                    for part in parts:
-                        if '->' in part:
-                            # Directly handle "0->8" format
-                            src_dst_parts = part.split('->')
-                            if len(src_dst_parts) == 2:
-                                try:
-                                    src = int(src_dst_parts[0])
-                                    dst = int(src_dst_parts[1])
-                                except:
-                                    pass
-                            break
-                    
-                    # Then extract size and start
-                    for i, part in enumerate(parts):
-                        if part == 'size' and i + 1 < len(parts):
-                            flow_size = int(parts[i+1])
-                        elif part == 'start' and i + 1 < len(parts):
-                            start_time_us = float(parts[i+1])
-                    
-                    if src is not None and dst is not None:
-                        flows_from_cm.append({
-                            'src': src,
-                            'dst': dst,
-                            'size': flow_size,
-                            'start_time': start_time_us,
-                            'name': f'flow_{src}_{dst}',
-                            'uec_name': f'Uec_{src}_{dst}'
-                        })
+        columns = cmgen.load(connection_matrix_file).flows
+        for src, dst, size, start in zip(columns['src'].tolist(), columns['dst'].tolist(),
+                                         columns['size'].tolist(), columns['start'].clip(0).tolist()):
+            flows_from_cm.append({
+                'src': src,
+                'dst': dst,
+                'size': size,
+                'start_time': float(start),
+                'name': f'flow_{src}_{dst}',
+                'uec_name': f'Uec_{src}_{dst}'
+            })
     
     # If no flows read from connection matrix, create a default one
     if not flows_from_cm:
@@ -97,24 +92,12 @@ def calculate_fct_from_stats(output_file, connection_matrix_file):
             'uec_name': 'Uec_0_16'
         })
     
-    # Extract time information for each flow from output file
-    with open(output_file, 'r') as f:
-        lines = f.readlines()
+    # Extract time information for each flow from output file in one pass
+    events = scan_dctcp_events(output_file)
     
     # Find corresponding DCTCP events for each flow
     for flow in flows_from_cm:
-        uec_name = flow['uec_name']
-        first_dctcp_time = None
-        last_dctcp_time = None
-        
-        for line in lines:
-            # Find DCTCP events for this flow
-            match = re.search(r'^(\d+\.\d+)\s+DCTCP.*' + re.escape(uec_name), line)
-            if match:
-                current_time = float(match.group(1))
-                if first_dctcp_time is None:
-                    first_dctcp_time = current_time
-                last_dctcp_time = current_time
+        first_dctcp_time, last_dctcp_time = events.get(flow['uec_name'], (None, None))
         
         # Use start time from connection matrix, or first DCTCP time as start
         start_time_us = flow['start_time']
@@ -125,7 +108,7 @@ def calculate_fct_from_stats(output_file, connection_matrix_file):
         if last_dctcp_time is not None and start_time_us is not None:
             fct_us = last_dctcp_time - start_time_us
             if fct_us > 0:
-                fcts.append(fct_us)
+                fcts.add(fct_us)
                 flow_info.append({
                     'name': flow['name'],
                     'fct_us': fct_us,
@@ -139,8 +122,8 @@ def calculate_fct_from_stats(output_file, connection_matrix_file):
     return fcts, flow_info
 
 def extract_fct_from_output(output_file):
-    """Extract FCT directly from output file (if exists)"""
-    fcts = []
+    """Extract FCT directly from output file (if exists), returning a quantile sketch of the FCTs and the flows"""
+    fcts = quantile_sketch.QuantileSketch()
     flow_info = []
     
     with open(output_file, 'r') as f:
@@ -159,7 +142,7 @@ def extract_fct_from_output(output_file):
                         fct_us = float(match.group(2) if len(match.groups()) > 1 else match.group(1))
                         flow_size = int(match.group(3)) if len(match.groups()) > 2 else 0
                         
-                        fcts.append(fct_us)
+                        fcts.add(fct_us)
                         flow_info.append({
                             'name': flow_name,
                             'fct_us': fct_us,
@@ -170,23 +153,21 @@ def extract_fct_from_output(output_file):
     
     return fcts, flow_info
 
-def calculate_statistics(fcts):
-    """Calculate FCT statistics"""
-    if not fcts:
+def calculate_statistics(sketch):
+    """Calculate FCT statistics from a quantile sketch of the FCTs"""
+    if not sketch.count:
         return None
     
-    sorted_fcts = sorted(fcts)
-    n = len(sorted_fcts)
-    
+    # Count, mean, min and max are exact; percentiles (nearest rank) come from the sketch
     return {
-        'count': n,
-        'mean': mean(fcts),
-        'median': median(fcts),
-        'min': min(fcts),
-        'max': max(fcts),
-        'p50': sorted_fcts[n//2] if n > 0 else 0,
-        'p95': sorted_fcts[int(n * 0.95)] if n > 1 else sorted_fcts[-1],
-        'p99': sorted_fcts[int(n * 0.99)] if n > 1 else sorted_fcts[-1],
+        'count': sketch.count,
+        'mean': sketch.mean,
+        'median': sketch.quantile(0.50),
+        'min': sketch.min,
+        'max': sketch.max,
+        'p50': sketch.quantile(0.50),
+        'p95': sketch.quantile(0.95),
+        'p99': sketch.quantile(0.99),
     }
 
 if __name__ == "__main__":
@@ -203,7 +184,7 @@ if __name__ == "__main__":
     fcts, flow_info = extract_fct_from_output(output_file)
     
     # If not found, try to calculate from statistics
-    if not fcts:
+    if not fcts.count:
         if connection_matrix_file and os.path.exists(connection_matrix_file):
             fcts, flow_info = calculate_fct_from_stats(output_file, connection_matrix_file)
         else:
@@ -220,21 +201,21 @@ if __name__ == "__main__":
                     break
     
     # If still not found, try to parse log file
-    if not fcts and os.path.exists(log_file):
+    if not fcts.count and os.path.exists(log_file):
         log_fcts = parse_binary_log(log_file)
         if log_fcts:
-            fcts = log_fcts
+            fcts.update(log_fcts)
             # If no flow_info, create default
             if not flow_info:
-                flow_info = [{'name': f'flow_{i}', 'fct_us': fct} for i, fct in enumerate(fcts)]
+                flow_info = [{'name': f'flow_{i}', 'fct_us': fct} for i, fct in enumerate(log_fcts)]
     
-    if fcts:
+    if fcts.count:
         stats = calculate_statistics(fcts)
         
         print(f"\n{'='*60}")
         print(f"Flow Completion Time (FCT) Analysis")
         print(f"{'='*60}")
-        print(f"\nFound {len(fcts)} flow completion(s):\n")
+        print(f"\nFound {fcts.count} flow completion(s):\n")
         
         for i, info in enumerate(flow_info, 1):
             print(f"Flow {i}: {info.get('name', 'unknown')}")
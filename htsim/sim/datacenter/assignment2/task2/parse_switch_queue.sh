@@ -1,6 +1,6 @@
 #!/bin/bash
 
-# Script to parse switch queue data from logout.dat using parse_output
+# Script to parse switch queue data from logout.dat using htsim_log.py
 
 LOG_FILE="logout.dat"
 IDMAP_FILE="idmap.txt"
@@ -18,35 +18,14 @@ if [ ! -f "$IDMAP_FILE" ]; then
     exit 1
 fi
 
-# Find parse_output executable
-PARSE_OUTPUT=""
-if [ -f "../../../../build/parse_output" ]; then
-    PARSE_OUTPUT="../../../../build/parse_output"
-elif [ -f "../../../build/parse_output" ]; then
-    PARSE_OUTPUT="../../../build/parse_output"
-elif [ -f "../../../../htsim/sim/build/parse_output" ]; then
-    PARSE_OUTPUT="../../../../htsim/sim/build/parse_output"
-else
-    echo "parse_output not found. Attempting to compile..."
-    cd ../../../..
-    if [ -d "build" ]; then
-        cd build
-        make parse_output 2>&1
-        if [ $? -eq 0 ] && [ -f "parse_output" ]; then
-            PARSE_OUTPUT="$(pwd)/parse_output"
-            cd ../../htsim/sim/datacenter/assignment2/task3
-        else
-            echo "Failed to compile parse_output"
-            exit 1
-        fi
-    else
-        echo "Build directory not found. Please compile the project first."
-        echo "Run: cd htsim/sim && mkdir -p build && cd build && cmake .. && make parse_output"
-        exit 1
-    fi
+# The binary log is read by htsim_log.py in the datacenter folder
+HTSIM_LOG="$(cd "$(dirname "$0")/../.." && pwd)/htsim_log.py"
+if [ ! -f "$HTSIM_LOG" ]; then
+    echo "Error: $HTSIM_LOG not found"
+    exit 1
 fi
 
-echo "Using parse_output: $PARSE_OUTPUT"
+echo "Using htsim_log.py: $HTSIM_LOG"
 echo ""
 
 # Parse queue data with ASCII output
@@ -57,8 +36,8 @@ echo ""
 mkdir -p results
 
 # Extract QUEUE_APPROX events for switches
-$PARSE_OUTPUT "$LOG_FILE" -ascii -idmap "$IDMAP_FILE" 2>&1 | \
-    grep -E "QUEUE_APPROX.*Switch_(Upper|Lower)Pod" > "$OUTPUT_FILE"
+python3 "$HTSIM_LOG" "$LOG_FILE" -idmap "$IDMAP_FILE" -type QUEUE_APPROX -type QUEUE_RECORD \
+    -kind switch -tier upper -tier lower > "$OUTPUT_FILE"
 
 if [ $? -eq 0 ]; then
     echo "✓ Queue data extracted successfully"
@@ -7,90 +7,75 @@ Handles multiple concurrent flows with comprehensive statistics
 import sys
 import os
 import re
-from statistics import mean, median, stdev, variance
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "connection_matrices"))
+import cmgen
+import quantile_sketch
+
 def parse_connection_matrix(cm_file):
-    """Parse connection matrix to get all flow information"""
+    """Get all flow information of a connection matrix, from its binary sidecar (see cmgen.binary)"""
     flows = []
     
     if not os.path.exists(cm_file):
         print(f"Warning: Connection matrix file not found: {cm_file}")
         return flows
     
-    with open(cm_file, 'r') as f:
-        for line in f:
-            if '->' in line:
-                parts = line.split()
-                src = None
-                dst = None
-                flow_size = 0
-                start_time_us = 0
-                flow_id = None
-                
-                # Extract source and destination (format: "0->16")
-                for part in parts:
-                    if '->' in part:
-                        src_dst_parts = part.split('->')
-                        if len(src_dst_parts) == 2:
-                            try:
-                                src = int(src_dst_parts[0])
-                                dst = int(src_dst_parts[1])
-                            except:
-                                pass
-                        break
-                
-                # Extract other parameters
-                for i, part in enumerate(parts):
-                    if part == 'size' and i + 1 < len(parts):
-                        flow_size = int(parts[i+1])
-                    elif part == 'start' and i + 1 < len(parts):
-                        start_time_us = float(parts[i+1])
-                    elif part == 'id' and i + 1 < len(parts):
-                        flow_id = int(parts[i+1])
-                
-                if src is not None and dst is not None:
-                    flows.append({
-                        'src': src,
-                        'dst': dst,
-                        'size': flow_size,
-                        'start_time': start_time_us,
-                        'flow_id': flow_id if flow_id else len(flows) + 1,
-                        'name': f'flow_{src}_{dst}',
-                        'uec_name': f'Uec_{src}_{dst}'
-                    })
+    columns = cmgen.load(cm_file).flows
+    starts = columns['start'].clip(0).tolist()
+    for n, (src, dst, size, flow_id) in enumerate(zip(columns['src'].tolist(), columns['dst'].tolist(),
+                                                      columns['size'].tolist(), columns['id'].tolist())):
+        flows.append({
+            'src': src,
+            'dst': dst,
+            'size': size,
+            'start_time': float(starts[n]),
+            'flow_id': flow_id if flow_id else n + 1,
+            'name': f'flow_{src}_{dst}',
+            'uec_name': f'Uec_{src}_{dst}'
+        })
     
     return flows
 
+# Time at the start of a DCTCP event line, and the flow it belongs to
+LINE_TIME = re.compile(r'^(\d+\.\d+)')
+UEC_NAME = re.compile(r'\bUec_\d+_\d+\b')
+
+def scan_dctcp_events(output_file):
+    """Scan the simulation output once, returning [first time, last time, count] of the DCTCP events of each flow"""
+    events = {}
+    with open(output_file, 'r') as f:
+        for line in f:
+            # Pattern: timestamp DCTCP ... Uec_src_dst
+            if 'DCTCP' not in line:
+                continue
+            match = LINE_TIME.match(line)
+            name = UEC_NAME.search(line)
+            if not match or not name:
+                continue
+            current_time = float(match.group(1))
+            entry = events.get(name.group(0))
+            if entry is None:
+                events[name.group(0)] = [current_time, current_time, 1]
+            else:
+                entry[1] = current_time
+                entry[2] += 1
+    return events
+
 def extract_fct_from_output(output_file, flows):
-    """Extract FCT for each flow from simulation output"""
+    """Extract FCT for each flow from simulation output, with sketches of the FCTs and throughputs of all flows"""
     flow_results = []
+    sketches = {'fct': quantile_sketch.QuantileSketch(), 'throughput': quantile_sketch.QuantileSketch()}
     
     if not os.path.exists(output_file):
         print(f"Error: Output file not found: {output_file}")
-        return flow_results
+        return flow_results, sketches
     
-    with open(output_file, 'r') as f:
-        lines = f.readlines()
+    events = scan_dctcp_events(output_file)
     
-    # For each flow, find DCTCP events
     for flow in flows:
-        uec_name = flow['uec_name']
-        first_event_time = None
-        last_event_time = None
-        event_count = 0
-        
-        for line in lines:
-            # Find DCTCP events for this flow
-            # Pattern: timestamp DCTCP ... Uec_src_dst
-            if uec_name in line and 'DCTCP' in line:
-                match = re.search(r'^(\d+\.\d+)', line)
-                if match:
-                    current_time = float(match.group(1))
-                    if first_event_time is None:
-                        first_event_time = current_time
-                    last_event_time = current_time
-                    event_count += 1
+        first_event_time, last_event_time, event_count = events.get(flow['uec_name'], (None, None, 0))
         
         # Calculate FCT
         if first_event_time is not None and last_event_time is not None:
@@ -113,8 +98,10 @@ def extract_fct_from_output(output_file, flows):
                     'throughput_gbps': throughput_gbps,
                     'event_count': event_count
                 })
+                sketches['fct'].add(fct_us)
+                sketches['throughput'].add(throughput_gbps)
     
-    return flow_results
+    return flow_results, sketches
 
 def categorize_flows(flow_results):
     """Categorize flows by size for detailed analysis"""
@@ -149,31 +136,29 @@ def identify_incast_flows(flow_results):
     
     return incast_patterns
 
-def calculate_statistics(values):
-    """Calculate comprehensive statistics"""
-    if not values:
+def sketch_of(values):
+    """Quantile sketch of values, added one at a time"""
+    sketch = quantile_sketch.QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+def calculate_statistics(sketch):
+    """Calculate comprehensive statistics from a quantile sketch of the values"""
+    if not sketch.count:
         return None
     
+    # Count, mean, min, max and variance are exact; percentiles (nearest rank) come from the sketch
     stats = {
-        'count': len(values),
-        'mean': mean(values),
-        'median': median(values),
-        'min': min(values),
-        'max': max(values),
+        'count': sketch.count,
+        'mean': sketch.mean,
+        'median': sketch.quantile(0.5),
+        'min': sketch.min,
+        'max': sketch.max,
+        'variance': sketch.variance(),
     }
-    
-    if len(values) > 1:
-        stats['stdev'] = stdev(values)
-        stats['variance'] = variance(values)
-    else:
-        stats['stdev'] = 0
-        stats['variance'] = 0
-    
-    # Calculate percentiles
-    sorted_values = sorted(values)
-    stats['p50'] = sorted_values[int(len(sorted_values) * 0.50)]
-    stats['p95'] = sorted_values[int(len(sorted_values) * 0.95)] if len(sorted_values) > 1 else sorted_values[0]
-    stats['p99'] = sorted_values[int(len(sorted_values) * 0.99)] if len(sorted_values) > 1 else sorted_values[0]
+    stats['stdev'] = stats['variance'] ** 0.5
+    stats['p50'], stats['p95'], stats['p99'] = sketch.quantiles([0.50, 0.95, 0.99])
     
     return stats
 
@@ -195,17 +180,14 @@ def print_flow_results(flow_results):
         print(f"  Time: {flow['start_time']:.2f} -> {flow['end_time']:.2f} us")
         print(f"  DCTCP Events: {flow['event_count']}")
 
-def print_statistics(flow_results):
+def print_statistics(sketches):
     """Print comprehensive FCT statistics"""
-    if not flow_results:
+    if not sketches['fct'].count:
         print("\nNo flow completions found!")
         return
     
-    fcts = [f['fct_us'] for f in flow_results]
-    throughputs = [f['throughput_gbps'] for f in flow_results]
-    
-    stats = calculate_statistics(fcts)
-    tp_stats = calculate_statistics(throughputs)
+    stats = calculate_statistics(sketches['fct'])
+    tp_stats = calculate_statistics(sketches['throughput'])
     
     print("\n" + "="*70)
     print("Overall FCT Statistics")
@@ -241,8 +223,7 @@ def print_category_analysis(flow_results):
         if not flows:
             continue
         
-        fcts = [f['fct_us'] for f in flows]
-        stats = calculate_statistics(fcts)
+        stats = calculate_statistics(sketch_of(f['fct_us'] for f in flows))
         
         print(f"\n{cat_name.upper()} Flows (n={len(flows)}):")
         print(f"  Mean FCT: {stats['mean']:.2f} us ({stats['mean']/1000:.2f} ms)")
@@ -265,8 +246,7 @@ def print_incast_analysis(flow_results):
     print("="*70)
     
     for receiver, flows in incast_patterns.items():
-        fcts = [f['fct_us'] for f in flows]
-        stats = calculate_statistics(fcts)
+        stats = calculate_statistics(sketch_of(f['fct_us'] for f in flows))
         senders = [f['src'] for f in flows]
         
         print(f"\nReceiver {receiver}: {len(flows)} senders")
@@ -296,7 +276,7 @@ def main():
     print(f"\nExpected Flows: {len(flows)}")
     
     # Extract FCT from output
-    flow_results = extract_fct_from_output(output_file, flows)
+    flow_results, sketches = extract_fct_from_output(output_file, flows)
     print(f"Completed Flows: {len(flow_results)}")
     
     if not flow_results:
@@ -309,7 +289,7 @@ def main():
     
     # Print analyses
     print_flow_results(flow_results)
-    print_statistics(flow_results)
+    print_statistics(sketches)
     print_category_analysis(flow_results)
     print_incast_analysis(flow_results)
     
@@ -2,138 +2,127 @@
 """
 Extract and Analyze Queue Length Variance for Core Switches
 Processes binary log files to calculate queue statistics
+(--tier selects the upper/lower pod switches instead, or all tiers)
 """
 
 import sys
 import os
-import subprocess
-import re
-from statistics import mean, median, stdev, variance
-from collections import defaultdict
+import argparse
 
-def find_parse_output():
-    """Find parse_output executable"""
-    possible_paths = [
-        "../../../../build/parse_output",
-        "../../../build/parse_output",
-        "../../build/parse_output",
-        "../../../../htsim/sim/build/parse_output"
-    ]
-    
-    for path in possible_paths:
-        if os.path.exists(path):
-            return os.path.abspath(path)
-    
-    return None
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import fat_tree_names
+import htsim_log
+
+# Switch tiers of the fat tree (see fat_tree_names)
+TIERS = ['core', 'upper', 'lower']
+TIER_LABELS = {
+    'core': 'Core',
+    'upper': 'Upper Pod (Spine)',
+    'lower': 'Lower Pod (Leaf)',
+}
 
-def extract_queue_data(log_file, idmap_file, parse_output):
-    """Extract queue usage data for core switches"""
+def write_rows(out, row_format, *columns, chunk=1 << 20):
+    """Write columns as text rows, formatting a whole chunk of rows at once"""
+    for first in range(0, len(columns[0]), chunk):
+        values = np.column_stack([column[first:first + chunk].astype(object) for column in columns])
+        out.write((row_format * len(values)) % tuple(values.ravel().tolist()))
+
+def extract_queue_data(log_file, idmap_file, tiers=('core',), raw_file="queue_raw_samples.csv"):
+    """Extract queue usage samples of the switches of the given tiers as arrays"""
 
 
     if not os.path.exists(log_file):
         print(f"Error: Log file not found: {log_file}")
-        return {}
+        return None
     
     if not os.path.exists(idmap_file):
         print(f"Error: ID map file not found: {idmap_file}")
-        return {}
+        return None
     
-    # Run parse_output to extract queue data
+    # Map the binary log and select the QUEUE_APPROX range samples of the switches
     try:
-        cmd = [parse_output, log_file, "-ascii", "-idmap", idmap_file]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        
-        if result.returncode != 0:
-            print(f"Warning: parse_output returned non-zero exit code: {result.returncode}")
-        
-        output = result.stdout
-        
-    except subprocess.TimeoutExpired:
-        print("Error: parse_output timed out")
-        return {}
-    except Exception as e:
-        print(f"Error running parse_output: {e}")
-        return {}
-    
-    #CDF raw data
-    raw_out = open("queue_raw_samples.csv", "w")
-    raw_out.write("switch,time,queue_bytes\n")
-    
-    # Parse output to extract core switch queue data
-    queue_data = defaultdict(list)
-    
-    for line in output.split('\n'):
-        if 'QUEUE_APPROX' in line and 'Switch_Core' in line:
-            # Extract queue information
-            # Format: Time Type QUEUE_APPROX ID X Ev RANGE LastQ Y MinQ Z MaxQ W Name Switch_Core_N
-            parts = line.split()
-            
-            try:
-                # Find indices
-                time_idx = 0
-                lastq_idx = None
-                minq_idx = None
-                maxq_idx = None
-                name_idx = None
-                
-                for i, part in enumerate(parts):
-                    if part == 'LastQ' and i + 1 < len(parts):
-                        lastq_idx = i + 1
-                    elif part == 'MinQ' and i + 1 < len(parts):
-                        minq_idx = i + 1
-                    elif part == 'MaxQ' and i + 1 < len(parts):
-                        maxq_idx = i + 1
-                    elif part.startswith('Switch_Core_'):
-                        name_idx = i
-                
-                if lastq_idx is not None and name_idx is not None:
-                    timestamp = float(parts[time_idx])
-                    last_q = int(parts[lastq_idx])
-                    min_q = int(parts[minq_idx]) if minq_idx else last_q
-                    max_q = int(parts[maxq_idx]) if maxq_idx else last_q
-                    switch_name = parts[name_idx]
-                    
-                    queue_data[switch_name].append({
-                        'time': timestamp,
-                        'last_q': last_q,
-                        'min_q': min_q,
-                        'max_q': max_q
-                    })
+        log = htsim_log.HtsimLog(log_file, idmap_file)
+    except (OSError, ValueError) as e:
+        print(f"Error reading log file: {e}")
+        return None
 
-                    # NEW: dump raw queue sample for CDF
-                    raw_out.write(f"{switch_name},{timestamp},{last_q}\n")
-            
-            except (ValueError, IndexError) as e:
-                continue
+    names = fat_tree_names.NameTable(log.names)
+    ids = names.select_ids(tier=tiers, kind='switch')
+    mask = log.select(types=['QUEUE_APPROX'])
+    mask &= names.mask(log['id'], tier=tiers, kind='switch')
+    mask &= log['event'] == htsim_log.QUEUE_APPROX_EVENTS['RANGE']
+    # parse_output skipped records at time 0, keep doing so
+    mask &= log['time'] != 0
+    samples = log.table(mask)
+    if len(samples) == 0:
+        return None
+
+    # Samples are grouped by switch name (queues of one switch may log under several ids)
+    switch_names = np.array([log.names[id] for id in ids.tolist()])
+    switches, name_index = np.unique(switch_names, return_inverse=True)
+    switch = name_index[np.searchsorted(ids, samples['id'])]
+
+    queue_data = {
+        'switches': switches,
+        'tiers': names.tier_names(ids[np.unique(name_index, return_index=True)[1]]),
+        'switch': switch,
+        'time': samples['time'],
+        'last_q': samples['val1'].astype(np.int64),
+        'min_q': samples['val2'].astype(np.int64),
+        'max_q': samples['val3'].astype(np.int64),
+    }
+
+    #CDF raw data, written switch by switch in time order
+    order = np.argsort(switch, kind='stable')
+    bounds = np.searchsorted(switch[order], np.arange(len(switches) + 1))
+    with open(raw_file, "w") as raw_out:
+        raw_out.write("switch,time,queue_bytes\n")
+        for index, name in enumerate(switches):
+            group = order[bounds[index]:bounds[index + 1]]
+            write_rows(raw_out, f"{name},%.9f,%d\n", queue_data['time'][group], queue_data['last_q'][group])
 
-    
-    raw_out.close()
     return queue_data
 
 def calculate_queue_statistics(queue_data):
-    """Calculate statistics for each core switch"""
+    """Calculate statistics for each switch in one pass over the sample arrays"""
+    switch = queue_data['switch']
+    last_q = queue_data['last_q']
+    count = np.bincount(switch, minlength=len(queue_data['switches']))
+    present = count > 0
+    sampled = np.flatnonzero(present)
+
+    # Sort by switch, then queue length: group minimum, maximum and median are then positional.
+    # Only switches with samples have a group, the others would index past the end.
+    order = np.lexsort((last_q, switch))
+    sorted_q = last_q[order].astype(np.float64)
+    start = np.concatenate(([0], np.cumsum(count)[:-1]))
+    first = start[sampled]
+    last = first + count[sampled] - 1
+    median = (sorted_q[first + (count[sampled] - 1) // 2] + sorted_q[first + count[sampled] // 2]) / 2
+
+    mean = np.bincount(switch, weights=last_q, minlength=len(count)) / np.maximum(count, 1)
+    squares = np.bincount(switch, weights=(last_q - mean[switch]) ** 2, minlength=len(count))
+    variance = np.where(count > 1, squares / np.maximum(count - 1, 1), 0.0)
+
+    by_switch = np.argsort(switch, kind='stable')
+    overall_min = np.minimum.reduceat(queue_data['min_q'][by_switch], first)
+    overall_max = np.maximum.reduceat(queue_data['max_q'][by_switch], first)
+
     stats = {}
-    
-    for switch_name, measurements in queue_data.items():
-        if not measurements:
-            continue
-        
-        last_qs = [m['last_q'] for m in measurements]
-        min_qs = [m['min_q'] for m in measurements]
-        max_qs = [m['max_q'] for m in measurements]
-        
-        # Calculate statistics
-        stats[switch_name] = {
-            'count': len(measurements),
-            'mean': mean(last_qs),
-            'median': median(last_qs),
-            'min': min(last_qs),
-            'max': max(last_qs),
-            'stdev': stdev(last_qs) if len(last_qs) > 1 else 0,
-            'variance': variance(last_qs) if len(last_qs) > 1 else 0,
-            'overall_min': min(min_qs),
-            'overall_max': max(max_qs),
-            'range': max(max_qs) - min(min_qs)
+    for k, index in enumerate(sampled):
+        stats[str(queue_data['switches'][index])] = {
+            'count': int(count[index]),
+            'mean': float(mean[index]),
+            'median': float(median[k]),
+            'min': float(sorted_q[first[k]]),
+            'max': float(sorted_q[last[k]]),
+            'stdev': float(np.sqrt(variance[index])),
+            'variance': float(variance[index]),
+            'overall_min': int(overall_min[k]),
+            'overall_max': int(overall_max[k]),
+            'range': int(overall_max[k] - overall_min[k])
         }
     
     return stats
@@ -144,14 +133,14 @@ def calculate_overall_variance(stats):
         return None
     
     # Get mean queue length for each switch (represents load on that switch)
-    all_means = [s['mean'] for s in stats.values()]
+    all_means = np.array([s['mean'] for s in stats.values()])
     
     # Variance AMONG switches (how evenly distributed is the load?)
-    variance_among_switches = variance(all_means) if len(all_means) > 1 else 0
-    stdev_among_switches = stdev(all_means) if len(all_means) > 1 else 0
+    variance_among_switches = float(np.var(all_means, ddof=1)) if len(all_means) > 1 else 0
+    stdev_among_switches = float(np.std(all_means, ddof=1)) if len(all_means) > 1 else 0
     
     # Also keep temporal variance info for reference
-    all_temporal_variances = [s['variance'] for s in stats.values()]
+    all_temporal_variances = np.array([s['variance'] for s in stats.values()])
     
     return {
         'total_switches': len(stats),
@@ -159,15 +148,15 @@ def calculate_overall_variance(stats):
         'variance_among_switches': variance_among_switches,
         'stdev_among_switches': stdev_among_switches,
         # Statistics of mean queue lengths across switches
-        'mean_queue_length': mean(all_means),
-        'median_queue_length': median(all_means),
-        'min_queue_length': min(all_means),
-        'max_queue_length': max(all_means),
-        'range_queue_length': max(all_means) - min(all_means),
+        'mean_queue_length': float(all_means.mean()),
+        'median_queue_length': float(np.median(all_means)),
+        'min_queue_length': float(all_means.min()),
+        'max_queue_length': float(all_means.max()),
+        'range_queue_length': float(all_means.max() - all_means.min()),
         # Peak queue observed
         'max_queue_observed': max([s['max'] for s in stats.values()]),
         # Temporal variance (kept for reference)
-        'mean_temporal_variance': mean(all_temporal_variances),
+        'mean_temporal_variance': float(all_temporal_variances.mean()),
     }
 
 def print_switch_statistics(stats):
@@ -192,12 +181,12 @@ def print_switch_statistics(stats):
         print(f"  Overall Max: {s['overall_max']:.0f} bytes")
         print(f"  Total Range: {s['range']:.0f} bytes")
 
-def print_overall_statistics(overall):
+def print_overall_statistics(overall, label="Core"):
     """Print overall variance statistics - focusing on spatial variance for load balancing"""
     print("\n" + "="*70)
     print("Load Balancing Analysis - Variance Among Switches")
     print("="*70)
-    print(f"  Total Core Switches: {overall['total_switches']}")
+    print(f"  Total {label} Switches: {overall['total_switches']}")
     print("")
     print("  === SPATIAL VARIANCE (Load Balancing Metric) ===")
     print(f"  Variance Among Switches: {overall['variance_among_switches']:.2f} bytes²")
@@ -220,14 +209,18 @@ def print_overall_statistics(overall):
     print(f"    → How much queues fluctuate over time")
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python3 extract_queue_variance.py <logout_file> <idmap_file>")
-        print("\nExample:")
-        print("  python3 extract_queue_variance.py results/logout_ecmp.dat results/idmap.txt")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Queue length variance analysis of the switches of one or all tiers")
+    parser.add_argument("log_file", help="Binary log (e.g. results/logout_ecmp.dat)")
+    parser.add_argument("idmap_file", help="ID map (e.g. results/idmap.txt)")
+    parser.add_argument("--tier", choices=sorted(TIERS) + ["all"], default="core",
+                        help="Switch tier to analyze (default: core)")
+    parser.add_argument("--raw-output", default="queue_raw_samples.csv",
+                        help="CSV file receiving every queue sample (default: queue_raw_samples.csv)")
+    args = parser.parse_args()
     
-    log_file = sys.argv[1]
-    idmap_file = sys.argv[2]
+    log_file = args.log_file
+    idmap_file = args.idmap_file
+    tiers = TIERS if args.tier == "all" else [args.tier]
     
     print("="*70)
     print("Queue Length Variance Analysis - Task 4")
@@ -235,38 +228,31 @@ def main():
     print(f"Log File: {log_file}")
     print(f"ID Map: {idmap_file}")
     
-    # Find parse_output
-    parse_output = find_parse_output()
-    if not parse_output:
-        print("\nError: parse_output executable not found")
-        print("Please compile the project first:")
-        print("  cd htsim/sim && mkdir -p build && cd build")
-        print("  cmake .. && make parse_output")
-        sys.exit(1)
-    
-    print(f"Using parse_output: {parse_output}")
     print("\nExtracting queue data from binary log...")
     
     # Extract queue data
-    queue_data = extract_queue_data(log_file, idmap_file, parse_output)
+    queue_data = extract_queue_data(log_file, idmap_file, tiers, args.raw_output)
     
-    if not queue_data:
-        print("\nWarning: No core switch queue data found!")
+    if queue_data is None:
+        print(f"\nWarning: No {args.tier} switch queue data found!")
         print("This might indicate:")
         print("  - No queue usage was logged")
         print("  - Log file format is different than expected")
-        print("  - No core switches in topology")
+        print(f"  - No {args.tier} switches in topology")
         sys.exit(1)
     
-    print(f"Found data for {len(queue_data)} core switches")
-    
-    # Calculate statistics
+    # Calculate statistics, of the switches with samples
     stats = calculate_queue_statistics(queue_data)
-    overall = calculate_overall_variance(stats)
+    scope = "switches across all tiers" if args.tier == "all" else f"{args.tier} switches"
+    print(f"Found data for {len(stats)} {scope}")
     
-    # Print results
+    # Print results, with the spatial variance of every tier on its own
     print_switch_statistics(stats)
-    print_overall_statistics(overall)
+    tier_of = dict(zip(queue_data['switches'].tolist(), queue_data['tiers'].tolist()))
+    for tier in tiers:
+        tier_stats = {name: s for name, s in stats.items() if tier_of[name] == tier}
+        if tier_stats:
+            print_overall_statistics(calculate_overall_variance(tier_stats), TIER_LABELS[tier])
     
     print("\n" + "="*70)
     print("Analysis Complete")
@@ -1,44 +1,142 @@
-import pandas as pd
+import argparse
+import os
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 
-# load data
-smartt = pd.read_csv("core_link_bytes_smartt.csv")
-conga = pd.read_csv("core_link_bytes_smartt_conga.csv")
-
-# sort for aligned comparison
-smartt = smartt.sort_values("link_name").reset_index(drop=True)
-conga  = conga.sort_values("link_name").reset_index(drop=True)
-
-# sanity check
-assert all(smartt["link_name"] == conga["link_name"])
-
-# relative utilization
-smartt_util = smartt["total_bytes"] / smartt["total_bytes"].mean()
-conga_util  = conga["total_bytes"]  / conga["total_bytes"].mean()
-
-# ===== Bar chart =====
-x = np.arange(len(smartt))
-width = 0.35
-
-plt.figure(figsize=(10, 4))
-plt.bar(x - width/2, smartt_util, width, label="SmartT")
-plt.bar(x + width/2, conga_util,  width, label="SmartT-CONDA")
-
-plt.xticks(x, smartt["link_name"], rotation=45)
-plt.ylabel("Normalized Link Utilization")
-plt.title("Core Link Utilization Comparison")
-plt.legend()
-plt.tight_layout()
-plt.show()
-
-# ===== Variance / Std =====
-print("SmartT:")
-print("  mean =", smartt_util.mean())
-print("  std  =", smartt_util.std())
-print("  var  =", smartt_util.var())
-
-print("\nSmartT-CONDA:")
-print("  mean =", conga_util.mean())
-print("  std  =", conga_util.std())
-print("  var  =", conga_util.var())
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import fat_tree_names
+import htsim_log
+import link_utilization
+
+
+def compare_core_csv():
+    import pandas as pd
+
+    # load data
+    smartt = pd.read_csv("core_link_bytes_smartt.csv")
+    conga = pd.read_csv("core_link_bytes_smartt_conga.csv")
+
+    # sort for aligned comparison
+    smartt = smartt.sort_values("link_name").reset_index(drop=True)
+    conga  = conga.sort_values("link_name").reset_index(drop=True)
+
+    # sanity check
+    assert all(smartt["link_name"] == conga["link_name"])
+
+    # relative utilization
+    smartt_util = smartt["total_bytes"] / smartt["total_bytes"].mean()
+    conga_util  = conga["total_bytes"]  / conga["total_bytes"].mean()
+
+    # ===== Bar chart =====
+    x = np.arange(len(smartt))
+    width = 0.35
+
+    plt.figure(figsize=(10, 4))
+    plt.bar(x - width/2, smartt_util, width, label="SmartT")
+    plt.bar(x + width/2, conga_util,  width, label="SmartT-CONDA")
+
+    plt.xticks(x, smartt["link_name"], rotation=45)
+    plt.ylabel("Normalized Link Utilization")
+    plt.title("Core Link Utilization Comparison")
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+    # ===== Variance / Std =====
+    print("SmartT:")
+    print("  mean =", smartt_util.mean())
+    print("  std  =", smartt_util.std())
+    print("  var  =", smartt_util.var())
+
+    print("\nSmartT-CONDA:")
+    print("  mean =", conga_util.mean())
+    print("  std  =", conga_util.std())
+    print("  var  =", conga_util.var())
+
+
+def compare_logs(runs, idmap, tier, bin_us, mtu):
+    """Per-link utilization of every run from its binary log, binned over time"""
+    results = {}
+    for label, log_file in runs:
+        log = htsim_log.HtsimLog(log_file, idmap)
+        names = fat_tree_names.NameTable(log.names)
+        ids = link_utilization.link_ids(names)
+        result = link_utilization.link_bytes(log, bin_us * 1e-6, ids, packet_size=mtu)
+        if not result['bytes'].any():
+            sys.exit(f"No link departures in {log_file} (was the run logged with -log traffic?)")
+        results[label] = (names, result)
+
+    # ===== Imbalance of every tier =====
+    for label, (names, result) in results.items():
+        print(f"{label}:")
+        for name, rows in link_utilization.tier_rows(names, result['ids']).items():
+            stats = link_utilization.imbalance(result['bytes'][rows])
+            busy = stats['bin_cv'][result['bytes'][rows].sum(axis=0) > 0]
+            print(f"  {name:<10} links = {stats['links']:<4} total CV = {stats['total_cv']:.4f}"
+                  f"  max/mean = {stats['total_max_over_mean']:.4f}"
+                  f"  mean bin CV = {busy.mean() if len(busy) else 0.0:.4f}")
+        print()
+
+    # Total bytes of the links of the tier by link name, so that the bars of all runs line up
+    tier_totals = {}
+    for label, (names, result) in results.items():
+        rows = link_utilization.tier_rows(names, result['ids']).get(tier)
+        if rows is not None:
+            link_names = [names.names.get(int(id), str(id)) for id in result['ids'][rows]]
+            tier_totals[label] = dict(zip(link_names, result['bytes'][rows].sum(axis=1)))
+    if not tier_totals:
+        sys.exit(f"No {tier} links in the logs")
+    link_names = sorted(set().union(*tier_totals.values()))
+
+    fig, (bars, series) = plt.subplots(2, 1, figsize=(10, 8))
+    width = 0.8 / len(results)
+    x = np.arange(len(link_names))
+    for k, (label, (names, result)) in enumerate(results.items()):
+        if label not in tier_totals:
+            continue
+        # ===== Normalized total bytes of the links of the tier, 0 for the links a run does not have =====
+        totals = np.array([tier_totals[label].get(name, 0.0) for name in link_names])
+        bars.bar(x - 0.4 + width * (k + 0.5), totals / totals.mean() if totals.any() else totals, width, label=label)
+
+        # ===== Imbalance between the links over time =====
+        rows = link_utilization.tier_rows(names, result['ids'])[tier]
+        stats = link_utilization.imbalance(result['bytes'][rows])
+        series.plot(result['edges'][:-1] * 1e6, stats['bin_cv'], label=label)
+
+    bars.set_xticks(x)
+    bars.set_xticklabels(link_names, rotation=45, fontsize=7)
+    bars.set_ylabel("Normalized Link Utilization")
+    bars.set_title(f"{tier} Link Utilization Comparison")
+    bars.legend()
+    series.set_xlabel("Time (us)")
+    series.set_ylabel(f"CV of bytes per {bin_us:g} us bin")
+    series.set_title(f"{tier} Link Imbalance over Time")
+    series.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare link utilization of load balancing runs. Without --log, compares the "
+                    "core_link_bytes_smartt*.csv totals in the current directory.")
+    parser.add_argument("--log", nargs=2, action="append", metavar=("LABEL", "LOGFILE"), default=None,
+                        help="Label and binary log of a run logged with -log traffic (repeatable)")
+    parser.add_argument("--idmap", default=None, help="ID map of the runs (e.g. results/idmap.txt)")
+    parser.add_argument("--tier", choices=sorted(link_utilization.LINK_TIERS), default="agg_up",
+                        help="Links to plot (default: agg_up, the links into the core switches)")
+    parser.add_argument("--bin-us", type=float, default=10.0, help="Width of the time bins in us (default: 10)")
+    parser.add_argument("--mtu", type=int, default=link_utilization.DEFAULT_PACKET_SIZE,
+                        help="Bytes of a packet whose record has no size")
+    args = parser.parse_args()
+
+    if args.log:
+        compare_logs(args.log, args.idmap, args.tier, args.bin_us, args.mtu)
+    else:
+        compare_core_csv()
+
+
+if __name__ == "__main__":
+    main()
@@ -52,20 +52,13 @@ else
     echo "✓ Connection matrix found"
 fi
 
-# Check parse_output
-PARSE_OUTPUT=""
-if [ -f "../../../../build/parse_output" ]; then
-    PARSE_OUTPUT="../../../../build/parse_output"
-elif [ -f "../../../build/parse_output" ]; then
-    PARSE_OUTPUT="../../../build/parse_output"
-fi
-
-if [ -z "$PARSE_OUTPUT" ]; then
-    echo "⚠  Warning: parse_output not found (needed for queue analysis)"
-    echo "   To compile: cd ../../build && make parse_output"
+# Check numpy
+if ! python3 -c "import numpy" 2>/dev/null; then
+    echo "⚠  Warning: numpy not found (needed for queue analysis)"
+    echo "   To install: pip install numpy"
     echo ""
 else
-    echo "✓ parse_output found"
+    echo "✓ numpy found"
 fi
 
 echo ""
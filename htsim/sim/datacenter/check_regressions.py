@@ -1,210 +1,448 @@
-#!/usr/bin/env python                                                                                                              
-import subprocess
-import sys
-import os
+#!/usr/bin/env python
+# Compares the outputs of two validation runs and reports regressions.
+#
+# The outputs of validate.py (or the result files of the runners) are parsed
+# into experiments keyed by their name, so experiments are matched by name
+# whatever order they were reported in. Given a test file, only that file is
+# compared; without one, every output under --newdir is compared with the file
+# of the same relative path under --olddir, on a process pool.
+#
+# Every difference is a finding with a level: FAIL (a regression), WARNING
+# (worth investigating), NOTE (an improvement or a harmless change) or ERROR (the
+# outputs cannot be compared). The thresholds of the tail FCT, retransmission
+# and ACK checks are set on the command line, and --report writes the verdict
+# with every finding as JSON.
+#
+# Experiments run over several seeds (named "<name> (seed <n>)", see --seeds of
+# the runners) are compared as distributions instead: the tail FCT, 99th
+# percentile FCT and retransmissions of all seeds of the old and new output go
+# through a one-sided Mann-Whitney test, and only a significant slowdown larger
+# than --min-effect fails. The report gives the p-value, the change of the
+# median and Cliff's delta of every metric. The smallest p-value the test can
+# give is 1 / C(n_old + n_new, n_new), so at the default alpha of 0.05 it needs
+# at least 4 seeds per side (3 and 3 give at best 0.05); with fewer seeds the
+# metrics are not tested and the comparison warns instead.
+
 import argparse
+import itertools
+import json
+import math
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-# Set up argument parser
-parser = argparse.ArgumentParser(description='Check regression test results.')
-parser.add_argument('testfile', help='The test file to compare.')
-parser.add_argument('--olddir', default='validate_outputs_old/', help='Directory for old test outputs.')
-parser.add_argument('--newdir', default='validate_outputs/', help='Directory for new test outputs.')
-
-# Parse arguments
-args = parser.parse_args()
-
-# Assign directories from arguments
-olddir = args.olddir
-newdir = args.newdir
-testname = args.testfile
-
-oldname = os.path.join(olddir, testname)
-newname = os.path.join(newdir, testname)
-
-print("COMPARING RESULTS FOR ", testname)
-
-try:
-    of = open(oldname, "r")
-    nf = open(newname, "r")
-except FileNotFoundError as error:
-    print(error)
-    sys.exit()
-
-c = 0
-experiment = "UNDEFINED"
-fail = False
-warn = False
-
-while True:
-    c += 1
-    oline = of.readline()
-    nline = nf.readline()
-
-    if not oline and not nline:
-        break
-    if not oline:
-        print("ERROR: " + oldname + " is shorter than " + newname);
-        sys.exit()
-    if not nline:
-        print("ERROR: " + newname + " is shorter than " + oldname);
-        sys.exit()
-
-#    print(oline, end='')
-    otokens = oline.split()
-    ntokens = nline.split()
-    if len(otokens) <= 1: #skip empty lines
-        continue
-
-    if otokens[0] == "Experiment:":
-        if oline != nline:
-            print("ERROR: Experiment name mismatch at line", c)
-            print("  Original: ", oline, end='')
-            print("  New:      ", nline, end='')
-            sys.exit()
-        experiment = oline
-
-    if otokens[0] == "[PASS]":
-        if ntokens[0] == "[FAIL]":
-            print(experiment, end='')
-            print("FAIL: test previously passes, now fails at line", c)
-            print("   ", oline, end='')
-            print("   ", nline)
-            fail = True
-        elif ntokens[0] != "[PASS]":
-            print(experiment, end='')
-            print("ERROR: format mismatch at line", c, otokens[0], " vs ", ntokens[0])
-            print("   ", oline, end='')
-            print("   ", nline)
-            sys.exit()
-
-    if otokens[0] == "[FAIL]":
-        if ntokens[0] == "[PASS]":
-            print(experiment, end='')
-            print("NOTE: test previously failed, now passes at line", c)
-            print("   ", oline, end='')
-            print("   ", nline)
-        elif ntokens[0] != "[FAIL]":
-            print("ERROR: format mismatch at line", c, otokens[0], " vs ", ntokens[0])
-            sys.exit()
-
-    if otokens[0] == "[PASS]" or otokens[0] == "[FAIL]":
-        if otokens[1] == "Connection":
-            if ntokens[1] != "Connection":
-                print(experiment, end='')
-                print("ERROR: format mismatch at line", c, otokens[1], " vs ", ntokens[1])
-                sys.exit()
-            ocount = int(otokens[3])
-            ncount = int(ntokens[3])
-            if ocount != ncount:
-                if otokens[0] == "[PASS]" and otokens[0] == "[PASS]":
-                    print(experiment, end='')
-                    print("FAIL: mismatch in completed connections of passing test at line", c)
-                    print("   ", oline, end='')
-                    print("   ", nline)
-            else:
-                #print("completed connections match", ocount)
-                pass
-        if otokens[1] == "Tail":
-            if ntokens[1] != "Tail":
-                print(experiment, end='')
-                print("ERROR: format mismatch at line", c, otokens[1], " vs ", ntokens[1])
-                print("   ", oline, end='')
-                print("   ", nline)
-            ofct = float(otokens[3])
-            nfct = float(ntokens[3])
-            if nfct < ofct * 0.95:
-                print(experiment, end='')
-                print("NOTE: tail FCT decreased significantly at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-            elif nfct < ofct * 0.99:
-                print(experiment, end='')
-                print("NOTE: tail FCT decreased slightly at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-            elif ofct * 1.05 < nfct:
-                print(experiment, end='')
-                print("FAIL: tail FCT increased significantly at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-                fail = True
-            elif ofct * 1.01 < nfct:
-                print(experiment, end='')
-                print("WARNING: tail FCT increased slightly at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-                warn = True
-            elif ofct == nfct:
-                #print("FCT matches", ofct)
-                pass
-                
-        
-
-    if otokens[0] == "Summary:":
-        if ntokens[0] != "Summary:":
-            print("ERROR: format mismatch at line", c, otokens[0], " vs ", ntokens[0])
-            print("   ", oline, end='')
-            print("   ", nline)
-            
-        if otokens[1] == "New:":
-            if ntokens[1] != "New:":
-                print("ERROR: format mismatch at line", c, otokens[1], " vs ", ntokens[1])
-                sys.exit()
-            onew = int(otokens[2])
-            nnew = int(ntokens[2])
-            if onew != nnew:
-                print("FAIL: different number of new packets sent at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
+import numpy as np
+
+import results_table
+
+DEFAULT_THRESHOLDS = {
+    'fct_slight': 0.01,
+    'fct_significant': 0.05,
+    'rtx': 0.2,
+    'acks': 0.2,
+    'alpha': 0.05,
+    'min_effect': 0.01,
+}
+
+# The metrics compared across seeds, with the name they are reported under.
+SEED_METRICS = {
+    'fct_tail': "tail FCT",
+    'fct_p99': "p99 FCT",
+    'Rtx': "retransmissions",
+}
+SEED_NAME = re.compile(r"^(.*) \(seed (\d+)\)$")
+# Above this many splits of the samples the permutation test is sampled rather than exhaustive.
+MAX_PERMUTATIONS = 20000
+
+
+def parse_text_output(path):
+    """
+    Parses the report printed by validate.py into a dict of experiments keyed by name.
+    An experiment holds the PASS/FAIL status of each check, its tail FCT, its
+    finished connection count and its summary counters.
+    """
+    experiments = {}
+    experiment = None
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            tokens = line.split()
+            if len(tokens) <= 1:
+                continue
+
+            if tokens[0] == "Experiment:":
+                name = line.split(":", 1)[1].strip()
+                # A name used twice in one output is told apart by its occurrence.
+                key = name
+                occurrence = 1
+                while key in experiments:
+                    occurrence += 1
+                    key = f"{name}#{occurrence}"
+                experiment = {'checks': {}, 'fct_tail': None, 'fct_p99': None, 'finished': None, 'counters': {},
+                              'error': None}
+                experiments[key] = experiment
+            elif experiment is None:
+                continue
+            elif tokens[0] in ("[PASS]", "[FAIL]"):
+                status = tokens[0][1:-1]
+                if tokens[1] == "Connection":
+                    experiment['checks']["Connection count"] = status
+                    experiment['finished'] = int(tokens[3])
+                elif tokens[1] == "Total":
+                    experiment['checks']["Connection count"] = status
+                    experiment['finished'] = int(tokens[tokens.index("only") + 1])
+                elif tokens[1] == "Tail":
+                    experiment['checks']["Tail FCT"] = status
+                    experiment['fct_tail'] = float(tokens[3])
+                elif tokens[1] == "FCT":
+                    experiment['checks']["FCT " + tokens[6]] = status
+            elif tokens[0] == "Summary:":
+                for key, value in zip(tokens[1::2], tokens[2::2]):
+                    try:
+                        experiment['counters'][key.rstrip(":")] = int(value)
+                    except ValueError:
+                        pass
+            elif tokens[0] == "Error":
+                experiment['error'] = line.strip()
+    return experiments
+
+
+def parse_results_file(path):
+    """
+    Reads a result file of the runners (see results_table) into the same form as parse_text_output.
+    Only the tail FCT and connection checks can be rebuilt from it.
+    """
+    experiments = {}
+    for row in results_table.to_rows(results_table.read_results(path)):
+        checks = {"Connection count": "PASS" if row['finished'] == row['connections'] else "FAIL"}
+        experiments[row['name']] = {
+            'checks': checks,
+            'fct_tail': row['fct_tail'],
+            'fct_p99': row.get('fct_p99'),
+            'finished': row['finished'],
+            'counters': {counter: row[counter] for counter in results_table.COUNTERS},
+            'error': (row['failure'] or "error") if row['returncode'] != 0 else None,
+        }
+    return experiments
+
+
+def parse_output(path):
+    if path.endswith(".json") or path.endswith(".parquet"):
+        return parse_results_file(path)
+    return parse_text_output(path)
+
+
+def compare_experiment(old, new, thresholds):
+    """
+    Returns the findings of one experiment as a list of (level, message) pairs.
+    """
+    findings = []
+    if new['error'] and not old['error']:
+        findings.append(('FAIL', f"experiment previously ran, now fails: {new['error']}"))
+        return findings
+
+    for check, old_status in old['checks'].items():
+        new_status = new['checks'].get(check)
+        if new_status is None:
+            findings.append(('ERROR', f"check '{check}' is missing from the new output"))
+        elif old_status == "PASS" and new_status == "FAIL":
+            findings.append(('FAIL', f"test previously passes, now fails: {check}"))
+        elif old_status == "FAIL" and new_status == "PASS":
+            findings.append(('NOTE', f"test previously failed, now passes: {check}"))
+
+    if old['finished'] is not None and new['finished'] is not None and old['finished'] != new['finished']:
+        if old['checks'].get("Connection count") == "PASS":
+            findings.append(('FAIL', f"mismatch in completed connections of passing test: "
+                                     f"{old['finished']} -> {new['finished']}"))
+
+    ofct = old['fct_tail']
+    nfct = new['fct_tail']
+    if ofct is not None and nfct is not None:
+        if nfct < ofct * (1 - thresholds['fct_significant']):
+            findings.append(('NOTE', f"tail FCT decreased significantly: {ofct} -> {nfct} us"))
+        elif nfct < ofct * (1 - thresholds['fct_slight']):
+            findings.append(('NOTE', f"tail FCT decreased slightly: {ofct} -> {nfct} us"))
+        elif ofct * (1 + thresholds['fct_significant']) < nfct:
+            findings.append(('FAIL', f"tail FCT increased significantly: {ofct} -> {nfct} us"))
+        elif ofct * (1 + thresholds['fct_slight']) < nfct:
+            findings.append(('WARNING', f"tail FCT increased slightly: {ofct} -> {nfct} us"))
+
+    ocounters = old['counters']
+    ncounters = new['counters']
+    if "New" in ocounters and "New" in ncounters and ocounters["New"] != ncounters["New"]:
+        findings.append(('WARNING', f"different number of new packets sent: {ocounters['New']} -> {ncounters['New']}"))
+    if "Rtx" in ocounters and "Rtx" in ncounters:
+        ortx = ocounters["Rtx"]
+        nrtx = ncounters["Rtx"]
+        if ortx > nrtx * (1 + thresholds['rtx']):
+            findings.append(('NOTE', f"significant reduction in retransmissions: {ortx} -> {nrtx}"))
+        if nrtx > ortx * (1 + thresholds['rtx']):
+            findings.append(('FAIL', f"significant increase in retransmissions: {ortx} -> {nrtx}"))
+    if "ACKs" in ocounters and "ACKs" in ncounters:
+        oacks = ocounters["ACKs"]
+        nacks = ncounters["ACKs"]
+        if oacks > nacks * (1 + thresholds['acks']):
+            findings.append(('NOTE', f"significant reduction in ACKs: {oacks} -> {nacks}"))
+        if nacks > oacks * (1 + thresholds['acks']):
+            findings.append(('WARNING', f"significant increase in ACKs: {oacks} -> {nacks}"))
+    return findings
+
+
+def mann_whitney(old, new):
+    """
+    Returns the U statistic of new against old (the number of pairs where the new
+    sample is larger, ties counting half) and the one-sided p-values of new being
+    larger and of new being smaller, from an exact permutation test.
+    """
+    samples = np.concatenate([np.asarray(old, dtype=float), np.asarray(new, dtype=float)])
+    n_old = len(old)
+    n_new = len(new)
+    n = n_old + n_new
+    # wins[i, j] counts sample i beating sample j, so the U of a split is the sum over new rows and old columns.
+    wins = (samples[:, None] > samples[None, :]) + 0.5 * (samples[:, None] == samples[None, :])
+
+    if math.comb(n, n_new) <= MAX_PERMUTATIONS:
+        splits = np.zeros((math.comb(n, n_new), n), dtype=bool)
+        for row, members in enumerate(itertools.combinations(range(n), n_new)):
+            splits[row, list(members)] = True
+    else:
+        rng = np.random.default_rng(0)
+        splits = np.zeros((MAX_PERMUTATIONS, n), dtype=bool)
+        order = np.argsort(rng.random((MAX_PERMUTATIONS, n)), axis=1)[:, :n_new]
+        np.put_along_axis(splits, order, True, axis=1)
+    u = ((splits @ wins) * ~splits).sum(axis=1)
+
+    observed = wins[n_old:, :n_old].sum()
+    p_greater = float(np.mean(u >= observed - 1e-9))
+    p_less = float(np.mean(u <= observed + 1e-9))
+    return float(observed), p_greater, p_less
+
+
+def smallest_p_value(n_old, n_new):
+    """
+    Returns the smallest one-sided p-value of the Mann-Whitney test of n_new samples
+    against n_old, reached when every new sample is larger than every old one.
+    """
+    return 1 / math.comb(n_old + n_new, n_new)
+
+
+def seeds_needed(alpha):
+    """
+    Returns the number of seeds per side with which the Mann-Whitney test can reach p < alpha.
+    """
+    seeds = 2
+    while smallest_p_value(seeds, seeds) >= alpha:
+        seeds += 1
+    return seeds
+
+
+def metric_value(experiment, metric):
+    if metric in experiment:
+        return experiment[metric]
+    return experiment['counters'].get(metric)
+
+
+def compare_distributions(old, new, thresholds):
+    """
+    Compares the seeds of one experiment metric by metric.
+    Returns the findings as (level, message) pairs and the statistics of each metric.
+    """
+    findings = []
+    statistics = {}
+    failed = [experiment['error'] for experiment in new if experiment['error']]
+    if failed and not any(experiment['error'] for experiment in old):
+        findings.append(('FAIL', f"{len(failed)} of {len(new)} seeds now fail: {failed[0]}"))
+        return findings, statistics
+
+    untestable = []
+    for metric, label in SEED_METRICS.items():
+        osamples = [value for value in (metric_value(experiment, metric) for experiment in old) if value is not None]
+        nsamples = [value for value in (metric_value(experiment, metric) for experiment in new) if value is not None]
+        if len(osamples) < 2 or len(nsamples) < 2:
+            continue
+        if smallest_p_value(len(osamples), len(nsamples)) >= thresholds['alpha']:
+            # No outcome could be significant, so a slowdown would silently pass.
+            untestable.append(label)
+            continue
+        u, p_greater, p_less = mann_whitney(osamples, nsamples)
+        omedian = float(np.median(osamples))
+        nmedian = float(np.median(nsamples))
+        change = (nmedian - omedian) / omedian if omedian else 0.0
+        stats = {
+            'old_median': omedian,
+            'new_median': nmedian,
+            'median_change': change,
+            'cliffs_delta': 2 * u / (len(osamples) * len(nsamples)) - 1,
+            'p_greater': p_greater,
+            'p_less': p_less,
+            'seeds': [len(osamples), len(nsamples)],
+        }
+        statistics[label] = stats
+        summary = (f"median {omedian} -> {nmedian} ({change:+.1%}), p={{:.3g}}, "
+                   f"Cliff's delta {stats['cliffs_delta']:+.2f}")
+        if p_greater < thresholds['alpha']:
+            if change > thresholds['min_effect']:
+                findings.append(('FAIL', f"{label} increased significantly: " + summary.format(p_greater)))
             else:
-                #print("new pkts match")
-                pass
-        if otokens[3] == "Rtx:":
-            if ntokens[3] != "Rtx:":
-                print("ERROR: format mismatch at line", c, otokens[3], " vs ", ntokens[3])
-                sys.exit()
-            ortx = int(otokens[4])
-            nrtx = int(ntokens[4])
-            if ortx > nrtx * 1.2:
-                print(experiment, end='')
-                print("NOTE: Significant reduction in retransmissions at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-            if nrtx > ortx * 1.2:
-                print(experiment, end='')
-                print("FAIL: Significant increase in retransmissions at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-                fail = True
-            if nrtx == ortx:
-                #print("rtx matches")p
-                pass
-        if otokens[9] == "ACKs:":
-            if ntokens[9] != "ACKs:":
-                print("ERROR: format mismatch at line", c, otokens[3], " vs ", ntokens[3])
-                sys.exit()
-            oacks = int(otokens[10])
-            nacks = int(ntokens[10])
-            if oacks > nacks * 1.2:
-                print(experiment, end='')
-                print("NOTE: Significant reduction in ACKs at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-            if nacks > oacks* 1.2:
-                print(experiment, end='')
-                print("WARNING: Significant increase in ACKs at line", c)
-                print("   ", oline, end='')
-                print("   ", nline)
-                warn = True
-            if nacks == oacks:
-                #print("ack count matches")
-                pass
-
-print("SUMMARY: ", end='')
-if fail:
-    print(" SOME TESTS FAILED - REQUIRES MANUAL FOLLOWUP")
-elif warn:
-    print(" ALL TESTS PASSED, BUT INVESTIGATE WARNINGS")
-else:
-    print(" ALL TESTS PASSED")
-print("-------------------------------")
+                findings.append(('WARNING', f"{label} increased significantly but slightly: "
+                                 + summary.format(p_greater)))
+        elif p_less < thresholds['alpha']:
+            findings.append(('NOTE', f"{label} decreased significantly: " + summary.format(p_less)))
+    if untestable:
+        findings.append(('WARNING', f"{len(old)} old and {len(new)} new seeds cannot reach p < {thresholds['alpha']}, "
+                                    f"{', '.join(untestable)} not compared; run at least "
+                                    f"{seeds_needed(thresholds['alpha'])} seeds"))
+    return findings, statistics
+
+
+def group_seeds(experiments):
+    """
+    Splits experiments into those run once, keyed by name, and those run over
+    several seeds, keyed by the name without the seed and holding the list of runs.
+    """
+    single = {}
+    seeded = {}
+    for name, experiment in experiments.items():
+        match = SEED_NAME.match(name)
+        if match:
+            seeded.setdefault(match.group(1), []).append(experiment)
+        else:
+            single[name] = experiment
+    return single, seeded
+
+
+def verdict(levels):
+    """
+    Returns FAIL if any finding is an error or a failure, WARN if any is a warning, and PASS otherwise.
+    """
+    if 'ERROR' in levels or 'FAIL' in levels:
+        return 'FAIL'
+    if 'WARNING' in levels:
+        return 'WARN'
+    return 'PASS'
+
+
+def compare_files(oldname, newname, thresholds):
+    """
+    Compares two outputs experiment by experiment and returns the report of the pair.
+    """
+    report = {'old': oldname, 'new': newname, 'experiments': {}}
+    try:
+        old, old_seeded = group_seeds(parse_output(oldname))
+        new, new_seeded = group_seeds(parse_output(newname))
+    except (OSError, ValueError, KeyError) as error:
+        report['error'] = str(error)
+        report['verdict'] = 'FAIL'
+        return report
+
+    if old_seeded or new_seeded:
+        report['statistics'] = {}
+    for name, old_runs in old_seeded.items():
+        if name not in new_seeded:
+            findings = [('ERROR', "experiment is missing from the new output")]
+        else:
+            findings, report['statistics'][name] = compare_distributions(old_runs, new_seeded[name], thresholds)
+        report['experiments'][name] = [{'level': level, 'message': message} for level, message in findings]
+    for name in new_seeded:
+        if name not in old_seeded:
+            report['experiments'][name] = [{'level': 'NOTE', 'message': "experiment is new"}]
+
+    for name, old_experiment in old.items():
+        if name not in new:
+            findings = [('ERROR', "experiment is missing from the new output")]
+        else:
+            findings = compare_experiment(old_experiment, new[name], thresholds)
+        report['experiments'][name] = [{'level': level, 'message': message} for level, message in findings]
+    for name in new:
+        if name not in old:
+            report['experiments'][name] = [{'level': 'NOTE', 'message': "experiment is new"}]
+
+    report['verdict'] = verdict([finding['level'] for findings in report['experiments'].values()
+                                 for finding in findings])
+    return report
+
+
+def find_outputs(newdir):
+    """
+    Returns the paths of every file under newdir, relative to it, in sorted order.
+    """
+    outputs = []
+    for directory, _, filenames in os.walk(newdir):
+        for filename in filenames:
+            outputs.append(os.path.relpath(os.path.join(directory, filename), newdir))
+    return sorted(outputs)
+
+
+def print_report(testname, report):
+    print("COMPARING RESULTS FOR ", testname)
+    if 'error' in report:
+        print("ERROR:", report['error'])
+        return
+    for name, findings in report['experiments'].items():
+        for finding in findings:
+            print(f"{name}: {finding['level']}: {finding['message']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check regression test results.')
+    parser.add_argument('testfile', nargs='*',
+                        help='The test files to compare (default: every file under --newdir).')
+    parser.add_argument('--olddir', default='validate_outputs_old/', help='Directory for old test outputs.')
+    parser.add_argument('--newdir', default='validate_outputs/', help='Directory for new test outputs.')
+    parser.add_argument('--fct-slight', type=float, default=DEFAULT_THRESHOLDS['fct_slight'],
+                        help='Relative tail FCT increase that is a warning (and decrease that is noted).')
+    parser.add_argument('--fct-significant', type=float, default=DEFAULT_THRESHOLDS['fct_significant'],
+                        help='Relative tail FCT increase that fails the comparison.')
+    parser.add_argument('--rtx', type=float, default=DEFAULT_THRESHOLDS['rtx'],
+                        help='Relative increase in retransmissions that fails the comparison.')
+    parser.add_argument('--acks', type=float, default=DEFAULT_THRESHOLDS['acks'],
+                        help='Relative increase in ACKs that is a warning.')
+    parser.add_argument('--alpha', type=float, default=DEFAULT_THRESHOLDS['alpha'],
+                        help='Significance level of the comparison of experiments run over several seeds '
+                             '(at 0.05 it needs at least 4 seeds per side).')
+    parser.add_argument('--min-effect', type=float, default=DEFAULT_THRESHOLDS['min_effect'],
+                        help='Relative increase of the median over the seeds below which a significant '
+                             'slowdown is only a warning.')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of files compared at once (default: one per core).')
+    parser.add_argument('--report', default=None, help='Write the verdict and every finding to this JSON file.')
+    args = parser.parse_args()
+
+    thresholds = {
+        'fct_slight': args.fct_slight,
+        'fct_significant': args.fct_significant,
+        'rtx': args.rtx,
+        'acks': args.acks,
+        'alpha': args.alpha,
+        'min_effect': args.min_effect,
+    }
+    testnames = args.testfile or find_outputs(args.newdir)
+    oldnames = [os.path.join(args.olddir, testname) for testname in testnames]
+    newnames = [os.path.join(args.newdir, testname) for testname in testnames]
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        reports = list(executor.map(compare_files, oldnames, newnames, [thresholds] * len(testnames)))
+
+    for testname, report in zip(testnames, reports):
+        print_report(testname, report)
+
+    verdicts = [report['verdict'] for report in reports]
+    overall = 'FAIL' if 'FAIL' in verdicts else 'WARN' if 'WARN' in verdicts else 'PASS'
+    print("SUMMARY: ", end='')
+    if overall == 'FAIL':
+        print(" SOME TESTS FAILED - REQUIRES MANUAL FOLLOWUP")
+    elif overall == 'WARN':
+        print(" ALL TESTS PASSED, BUT INVESTIGATE WARNINGS")
+    else:
+        print(" ALL TESTS PASSED")
+    print("-------------------------------")
+
+    if args.report is not None:
+        with open(args.report, 'w') as f:
+            json.dump({'verdict': overall, 'thresholds': thresholds,
+                       'files': dict(zip(testnames, reports))}, f, indent=1)
+    sys.exit(1 if overall == 'FAIL' else 0)
+
+
+if __name__ == "__main__":
+    main()
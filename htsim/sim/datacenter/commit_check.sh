@@ -68,9 +68,8 @@ for file in "${files[@]}"; do
 
     # Get the old output file from branch_to_compare and store it in the old_validate_dir
     env GIT_CONFIG_GLOBAL=/dev/null git show refs/remotes/$branch_to_compare:htsim/sim/datacenter/$output_relative_dir >$old_validate_dir/$output_filename
-
-    # Run the regression check script on the output file
-    # Example: if output_relative_dir is "validate_outputs/validate_uec_sender.out"
-    #          then the command will be: python check_regressions.py validate_uec_sender.out --olddir "validate_outputs_old" --newdir "validate_outputs"
-    python3 check_regressions.py $output_filename --olddir $old_validate_dir --newdir $validate_dir
 done
+
+# Run the regression check script once on all the output files; experiments are matched by name
+# and the files are compared in parallel. The verdict and every finding are also written as JSON.
+python3 check_regressions.py --olddir $old_validate_dir --newdir $validate_dir --report regression_report.json
@@ -0,0 +1,15 @@
+# Connection matrix generation for htsim (see generators and matrix).
+#
+# The gen_*.py scripts of connection_matrices are wrappers around the
+# generators of this package, which can also be called directly:
+#
+#   import cmgen
+#   cmgen.permutation(1024, 1024, 2000000, randseed=42).write("perm.cm")
+#   flows = cmgen.load("perm.cm").flows
+
+from .binary import is_fresh, load, read_binary, read_text, sidecar_path, write_binary
+from .generators import (butterfly_allreduce, full_bisection_permutation, incast, outcast_incast, permutation, ring_allreduce,
+                         serial_alltoall, windowed_alltoall)
+from .topology import cross_pod, intra_rack, oversubscription_stress, rack_incast, top_tier, topo_layout
+from .matrix import (FLOW_DTYPE, NO_PRIO, NO_START, TRIGGER_DTYPE, TRIGGER_TYPES, ConnectionMatrix, empty_flows,
+                     make_triggers)
@@ -0,0 +1,318 @@
+# Binary sidecar of a connection matrix.
+#
+# The text .cm file stays what htsim_uec -tm reads. Next to it, the Python
+# tools keep perm.cm.bin: a HEADER_DTYPE header, the flows as FLOW_DTYPE
+# records and the triggers as TRIGGER_DTYPE records, each table starting on a
+# 64 byte boundary. The header records the size and modification time of the
+# text file it was made from, and load() makes the sidecar again whenever the
+# text file has changed since. The tables are memory mapped, so reading the
+# sizes of a 67M flow all-to-all only maps the file instead of tokenizing 7 GB
+# of text. The text is parsed a block at a time straight into FLOW_DTYPE
+# columns, and the sidecar written block by block, so that making it holds
+# no Python object per flow. Failure lines of the text file are not kept in
+# the sidecar.
+
+import os
+
+import numpy as np
+
+from .matrix import FLOW_DTYPE, NO_PRIO, NO_START, TRIGGER_DTYPE, TRIGGER_TYPES, ConnectionMatrix, empty_flows
+
+MAGIC = b'HTSIMCM'
+VERSION = 1
+SIDECAR_SUFFIX = '.bin'
+ALIGNMENT = 64
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', np.uint32),
+    ('nodes', np.uint32),
+    ('flows', np.uint64),
+    ('triggers', np.int64),       # -1 for a matrix without a Triggers line
+    ('source_size', np.int64),
+    ('source_mtime_ns', np.int64),
+])
+
+FLOW_TOKENS = {'start', 'size', 'id', 'trigger', 'send_done_trigger', 'recv_done_trigger', 'prio'}
+# Bytes of text parsed at once
+TEXT_BLOCK = 1 << 23
+DIGITS = b'0123456789'
+# Translation table keeping the digits and turning every other byte into a space
+DIGITS_ONLY = bytes(c if c in DIGITS else ord(' ') for c in range(256))
+
+
+def sidecar_path(path):
+    return path + SIDECAR_SUFFIX
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(flows):
+    flow_offset = _aligned(HEADER_DTYPE.itemsize)
+    trigger_offset = _aligned(flow_offset + flows * FLOW_DTYPE.itemsize)
+    return flow_offset, trigger_offset
+
+
+def write_binary(matrix, path, source=None):
+    """
+    Writes the sidecar of a matrix to path, recording the size and modification
+    time of the text file source it stands for.
+    """
+    write_tables(path, source, [matrix.flows], lambda: (matrix.nodes, matrix.triggers))
+
+
+def write_tables(path, source, flow_blocks, tables):
+    """
+    Writes a sidecar to path from flow_blocks, an iterable of FLOW_DTYPE arrays written
+    one after the other, and tables(), called once the flows are written, which returns
+    the nodes and the triggers (or None) of the matrix.
+    """
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    if source is not None:
+        # Taken before the flows are read, so that a text file changed meanwhile makes a stale sidecar
+        stat = os.stat(source)
+        header['source_size'] = stat.st_size
+        header['source_mtime_ns'] = stat.st_mtime_ns
+
+    # Written under a temporary name, so that a reader never maps a partial sidecar
+    partial = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(partial, 'wb') as f:
+            flows = 0
+            f.seek(_aligned(HEADER_DTYPE.itemsize))
+            for block in flow_blocks:
+                np.ascontiguousarray(block, dtype=FLOW_DTYPE).tofile(f)
+                flows += len(block)
+            nodes, triggers = tables()
+            _, trigger_offset = _layout(flows)
+            if triggers is not None:
+                f.seek(trigger_offset)
+                np.ascontiguousarray(triggers, dtype=TRIGGER_DTYPE).tofile(f)
+            f.truncate()
+            header['nodes'] = nodes
+            header['flows'] = flows
+            header['triggers'] = -1 if triggers is None else len(triggers)
+            f.seek(0)
+            f.write(header.tobytes())
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.unlink(partial)
+        raise
+
+
+def read_header(path):
+    """
+    Returns the header of a sidecar, or None if path is not a sidecar of this version.
+    """
+    try:
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    except (OSError, ValueError):
+        return None
+    if len(header) == 0 or header['magic'][0] != MAGIC or header['version'][0] != VERSION:
+        return None
+    return header[0]
+
+
+def is_fresh(path, source):
+    """
+    Returns whether the sidecar path was made from the current contents of the text file source.
+    """
+    header = read_header(path)
+    if header is None:
+        return False
+    stat = os.stat(source)
+    return int(header['source_size']) == stat.st_size and int(header['source_mtime_ns']) == stat.st_mtime_ns
+
+
+def read_binary(path):
+    """
+    Returns the matrix of a sidecar, with its flows and triggers memory mapped.
+    """
+    header = read_header(path)
+    if header is None:
+        raise ValueError(f"{path} is not a connection matrix sidecar")
+    flows = int(header['flows'])
+    triggers = int(header['triggers'])
+    flow_offset, trigger_offset = _layout(flows)
+
+    def table(dtype, offset, count):
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    return ConnectionMatrix(int(header['nodes']), table(FLOW_DTYPE, flow_offset, flows),
+                            None if triggers < 0 else table(TRIGGER_DTYPE, trigger_offset, triggers))
+
+
+class TextParser:
+    """
+    Parser of a text .cm file like ConnectionMatrix::load, without its failures.
+
+    The file is read TEXT_BLOCK bytes at a time and blocks() yields the flows of
+    every block as a FLOW_DTYPE array; nodes and triggers are set once it is
+    exhausted. The flow lines of a block that have the same keywords, e.g.
+    "12->7 id 3 start 0 size 2000000", are converted by a single np.fromstring
+    into the columns of their fields. Other lines (the header, triggers, comments
+    and flows with a fractional start or odd spacing) are parsed one by one.
+    """
+
+    def __init__(self, path, block_size=TEXT_BLOCK):
+        self.path = path
+        self.block_size = block_size
+        self.nodes = 0
+        self.has_triggers = False
+        self.trigger_rows = []
+
+    @property
+    def triggers(self):
+        if not self.has_triggers and not self.trigger_rows:
+            return None
+        return np.array(self.trigger_rows, dtype=TRIGGER_DTYPE)
+
+    def tables(self):
+        return self.nodes, self.triggers
+
+    def blocks(self):
+        with open(self.path, 'rb') as f:
+            rest = b''
+            while True:
+                data = f.read(self.block_size)
+                if not data:
+                    break
+                data = rest + data
+                cut = data.rfind(b'\n') + 1
+                rest = data[cut:]
+                if cut:
+                    yield self.parse_block(data[:cut])
+            if rest:
+                yield self.parse_block(rest + b'\n')
+
+    def parse_line(self, tokens):
+        """
+        Parses the tokens of one line, returning the record of a flow line or None.
+        """
+        if not tokens or tokens[0].startswith(b'#'):
+            return None
+        if b'->' in tokens[0]:
+            src, dst = tokens[0].split(b'->')
+            flow = {'start': NO_START, 'size': 0, 'id': 0, 'trigger': 0, 'send_done_trigger': 0,
+                    'recv_done_trigger': 0, 'prio': NO_PRIO}
+            i = 1
+            while i < len(tokens):
+                token = tokens[i].decode('utf-8', errors='replace')
+                if token in FLOW_TOKENS:
+                    flow[token] = int(float(tokens[i + 1])) if token == 'start' else int(tokens[i + 1])
+                    i += 1
+                elif token == 'msg' and i + 1 < len(tokens) and tokens[i + 1].isdigit():
+                    i += 1
+                i += 1
+            return (int(src), int(dst), flow['id'], flow['start'], flow['size'], flow['prio'],
+                    flow['trigger'], flow['send_done_trigger'], flow['recv_done_trigger'])
+        if tokens[0] == b'trigger':
+            id, type, count = 0, 0, 0
+            for i, token in enumerate(tokens):
+                if token == b'id':
+                    id = int(tokens[i + 1])
+                elif token == b'count':
+                    count = int(tokens[i + 1])
+                elif token.decode('utf-8', errors='replace') in TRIGGER_TYPES:
+                    type = TRIGGER_TYPES.index(token.decode())
+            self.trigger_rows.append((id, type, count))
+        elif tokens[0] == b'Nodes':
+            self.nodes = int(tokens[1])
+        elif tokens[0] == b'Triggers':
+            self.has_triggers = True
+        return None
+
+    def parse_block(self, data):
+        """
+        Returns the flows of data, a block of whole lines.
+        """
+        lines = np.array(data.split(b'\n'), dtype=object)
+        # Lines of the same keywords in the same places have the same shape once their digits are dropped
+        shapes = data.translate(None, DIGITS).split(b'\n')
+        codes = {shape: code for code, shape in enumerate(set(shapes))}
+        line_codes = np.fromiter(map(codes.__getitem__, shapes), dtype=np.int64, count=len(shapes))
+
+        is_flow = np.zeros(len(lines), dtype=bool)
+        columns = []
+        others = []
+        for shape, code in codes.items():
+            indices = np.flatnonzero(line_codes == code)
+            fields = flow_fields(shape)
+            if fields is not None:
+                text = b' '.join(lines[indices]).translate(DIGITS_ONLY)
+                values = np.fromstring(text, dtype=np.int64, sep=' ')
+                # A missing number, as in "->7 id 3", leaves fewer values than fields
+                if len(values) == len(indices) * len(fields):
+                    is_flow[indices] = True
+                    columns.append((indices, fields, values.reshape(len(indices), len(fields))))
+                    continue
+            others.extend(indices.tolist())
+
+        records = []
+        for i in sorted(others):
+            flow = self.parse_line(lines[i].split())
+            if flow is not None:
+                is_flow[i] = True
+                records.append((i, flow))
+
+        rows = np.cumsum(is_flow) - 1
+        flows = empty_flows(int(np.count_nonzero(is_flow)))
+        for indices, fields, values in columns:
+            for k, field in enumerate(fields):
+                if field is not None:
+                    flows[field][rows[indices]] = values[:, k]
+        for i, flow in records:
+            flows[rows[i]] = flow
+        return flows
+
+
+def flow_fields(shape):
+    """
+    Returns the fields of the numbers of a flow line of the given shape, None for the
+    value of msg, or None if the shape is not that of "src->dst" and single spaced
+    keyword and value pairs, e.g. b"-> id  start  size " for "12->7 id 3 start 0 size 2000".
+    """
+    if not shape.startswith(b'->'):
+        return None
+    words = shape[2:].split(b' ')
+    if any(words[0::2]):
+        return None
+    keywords = [word.decode() for word in words[1::2]]
+    if not all(keyword in FLOW_TOKENS or keyword == 'msg' for keyword in keywords):
+        return None
+    return ['src', 'dst'] + [keyword if keyword != 'msg' else None for keyword in keywords]
+
+
+def read_text(path):
+    """
+    Parses a text .cm file like ConnectionMatrix::load does, without its failures.
+    """
+    parser = TextParser(path)
+    blocks = list(parser.blocks())
+    flows = np.concatenate(blocks) if blocks else empty_flows(0)
+    return ConnectionMatrix(parser.nodes, flows, parser.triggers)
+
+
+def load(path):
+    """
+    Returns the matrix of a .cm file from its sidecar, making the sidecar first if it
+    is missing or older than the text file. If the sidecar cannot be written (e.g. in a
+    read-only directory) the parsed text is returned instead. path may also name a sidecar.
+    """
+    if read_header(path) is not None:
+        return read_binary(path)
+    sidecar = sidecar_path(path)
+    if not is_fresh(sidecar, path):
+        parser = TextParser(path)
+        try:
+            write_tables(sidecar, path, parser.blocks(), parser.tables)
+        except OSError:
+            return read_text(path)
+    return read_binary(sidecar)
@@ -0,0 +1,209 @@
+# Command lines of the gen_*.py scripts.
+#
+# Every function takes the argv of its script, prints its parameters, writes
+# the matrix with its binary sidecar, so that the first load() does not parse
+# the text again, and exits with status 1 if the parameters do not make a matrix.
+# run() dispatches an argv on the name of the script in argv[0], so a caller
+# such as validate_all.py can generate a matrix from a script command line
+# without starting the script.
+
+import os
+import sys
+
+import numpy as np
+
+from . import generators, topology
+
+
+def usage(argv, count, text):
+    if len(argv) != count:
+        print("Usage: python " + text)
+        sys.exit()
+
+
+def generate(filename, generator, *args):
+    """
+    Writes the matrix of generator(*args) and its sidecar to filename, or exits if the
+    parameters do not make one.
+    """
+    try:
+        matrix = generator(*args)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    matrix.write(filename, sidecar=True)
+
+
+def gen_permutation(argv):
+    if len(argv) != 8:
+        usage(argv, 7, "gen_pemutation.py <filename> <nodes> <conns> <flowsize> <extrastarttime> <randseed> "
+                       "[<cross>]")
+    filename, nodes, conns, flowsize = argv[1], int(argv[2]), int(argv[3]), int(argv[4])
+    extrastarttime, randseed = float(argv[5]), int(argv[6])
+    cross = int(argv[7]) if len(argv) == 8 else None
+
+    print("Nodes: ", nodes)
+    print("Connections: ", conns)
+    print("Flowsize: ", flowsize, "bytes")
+    print("ExtraStartTime: ", extrastarttime, "us")
+    print("Random Seed ", randseed)
+    if cross:
+        print("Cross groups of ", cross, "nodes")
+    generate(filename, generators.permutation, nodes, conns, flowsize, extrastarttime, randseed, cross)
+
+
+def gen_permutation_full_bisection(argv):
+    usage(argv, 7, "gen_permutation_full_bisection.py <filename> <nodes> <conns> <flowsize> <extrastarttime> "
+                   "<randseed>")
+    filename, nodes, conns, flowsize = argv[1], int(argv[2]), int(argv[3]), int(argv[4])
+    extrastarttime, randseed = float(argv[5]), int(argv[6])
+
+    print("Nodes: ", nodes)
+    print("Connections: ", conns)
+    print("Flowsize: ", flowsize, "bytes")
+    print("ExtraStartTime: ", extrastarttime, "us")
+    print("Random Seed ", randseed)
+    generate(filename, generators.full_bisection_permutation, nodes, conns, flowsize, extrastarttime, randseed)
+
+
+def gen_incast(argv):
+    usage(argv, 8, "gen_incast.py <filename> <nodes> <conns> <flowsize> <extrastarttime> <randseed> <prefer_remote>")
+    filename, nodes, conns, flowsize = argv[1], int(argv[2]), int(argv[3]), int(argv[4])
+    extrastarttime, randseed, prefer_remote = float(argv[5]), int(argv[6]), int(argv[7])
+
+    print("Nodes: ", nodes)
+    print("Connections: ", conns)
+    print("Flowsize: ", flowsize, "bytes")
+    print("ExtraStartTime: ", extrastarttime, "us")
+    print("Random Seed ", randseed)
+    generate(filename, generators.incast, nodes, conns, flowsize, extrastarttime, randseed, prefer_remote != 0)
+
+
+def gen_outcast_incast(argv):
+    usage(argv, 7, "gen_outcast_incast.py <filename> <nodes> <conns_incast> <conns_outcast> <flowsize> <randseed>")
+    filename, nodes, conns1, conns2 = argv[1], int(argv[2]), int(argv[3]), int(argv[4])
+    flowsize, randseed = int(argv[5]), int(argv[6])
+
+    print("Nodes: ", nodes)
+    print("Connections incast: ", conns1, "outcast:", conns2)
+    print("Flowsize: ", flowsize, "bytes")
+    print("Random Seed ", randseed)
+    generate(filename, generators.outcast_incast, nodes, conns1, conns2, flowsize, randseed)
+
+
+def gen_allreduce(argv):
+    usage(argv, 8, "gen_allreduce.py <filename> <nodes> <conns> <groupsize> <flowsize> <locality> <randseed>")
+    filename, nodes, conns, groupsize = argv[1], int(argv[2]), int(argv[3]), int(argv[4])
+    flowsize, locality, randseed = int(argv[5]), int(argv[6]), int(argv[7])
+
+    print("Connections: ", conns)
+    print("All-reduce group size: ", groupsize)
+    print("Flowsize: ", flowsize, "bytes")
+    print("Random Seed ", randseed)
+    print("Groups ", conns // groupsize)
+    generate(filename, generators.ring_allreduce, nodes, conns, groupsize, flowsize, locality == 1, randseed)
+
+
+def gen_allreduce_butterfly(argv):
+    usage(argv, 8, "gen_allreduce_butterfly.py <filename> <nodes> <groups> <groupsize> <flowsize> <locality> "
+                   "<randseed>")
+    filename, nodes, groups, groupsize = argv[1], int(argv[2]), int(argv[3]), int(argv[4])
+    flowsize, locality, randseed = int(argv[5]), int(argv[6]), int(argv[7])
+
+    print("Connections: ", groups * groupsize * (groupsize.bit_length() - 1))
+    print("All-reduce group size: ", groupsize)
+    print("Flowsize: ", flowsize, "bytes")
+    print("Random Seed ", randseed)
+    print("Groups ", groups)
+    generate(filename, generators.butterfly_allreduce, nodes, groups, groupsize, flowsize, locality == 1,
+             randseed)
+
+
+def gen_serial_alltoall(argv):
+    usage(argv, 8, "gen_serial_alltoall.py <filename> <nodes> <conns> <groupsize> <flowsize> <extrastarttime> "
+                   "<randseed>")
+    filename, nodes, conns, groupsize = argv[1], int(argv[2]), int(argv[3]), int(argv[4])
+    flowsize, extrastarttime, randseed = int(argv[5]), float(argv[6]), int(argv[7])
+    alltoall_parameters(nodes, conns, groupsize, flowsize, extrastarttime, randseed)
+    generate(filename, generators.serial_alltoall, nodes, conns, groupsize, flowsize, extrastarttime, randseed)
+
+
+def gen_serialn_alltoall(argv, prio=False):
+    usage(argv, 9, "gen_serialn_alltoall.py <filename> <nodes> <conns_per_group> <groupsize> <parallel_cons> "
+                   "<flowsize> <extrastarttime> <randseed>")
+    filename, nodes, conns, groupsize, parallel = argv[1], int(argv[2]), int(argv[3]), int(argv[4]), int(argv[5])
+    flowsize, extrastarttime, randseed = int(argv[6]), float(argv[7]), int(argv[8])
+    alltoall_parameters(nodes, conns, groupsize, flowsize, extrastarttime, randseed)
+    print("Left is ", str((groupsize - 1) % parallel), "parallel", parallel, "Conns per node", groupsize - 1)
+    generate(filename, generators.windowed_alltoall, nodes, conns, groupsize, parallel, flowsize, extrastarttime,
+             randseed, prio)
+
+
+def gen_serialn_alltoall_prio(argv):
+    gen_serialn_alltoall(argv, prio=True)
+
+
+def gen_topology(argv):
+    usage(argv, 8, "gen_topology.py <filename> <topofile> <pattern> <conns> <flowsize> <extrastarttime> <randseed>")
+    filename, topofile, pattern, conns = argv[1], argv[2], argv[3], int(argv[4])
+    flowsize, extrastarttime, randseed = int(argv[5]), float(argv[6]), int(argv[7])
+    if pattern not in topology.PATTERNS:
+        print("Pattern must be one of", ", ".join(topology.PATTERNS))
+        sys.exit(1)
+    layout = topology.topo_layout(topofile)
+
+    print("Nodes: ", layout['nodes'])
+    print("Racks: ", layout['racks'], "of", layout['hosts_per_rack'], "hosts")
+    print("Pods: ", layout['pods'], "of", layout['hosts_per_pod'], "hosts")
+    print("Oversubscribed: ", layout['oversubscribed'])
+    print("Pattern: ", pattern)
+    print("Connections: ", conns)
+    print("Flowsize: ", flowsize, "bytes")
+    print("ExtraStartTime: ", extrastarttime, "us")
+    print("Random Seed ", randseed)
+    try:
+        matrix = topology.PATTERNS[pattern](layout, conns, flowsize, extrastarttime, randseed)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    tiers = np.bincount(topology.top_tier(layout, matrix.flows['src'], matrix.flows['dst']), minlength=3)
+    print("Flows up to tier " + " / ".join(str(tier) for tier in range(layout['tiers'])) + ": ",
+          " / ".join(str(count) for count in tiers[:layout['tiers']]))
+    matrix.write(filename, sidecar=True)
+
+
+def alltoall_parameters(nodes, conns, groupsize, flowsize, extrastarttime, randseed):
+    if conns % groupsize != 0:
+        print("conns must be a multiple of groupsize\n")
+        sys.exit()
+    print("Nodes: ", nodes)
+    print("Connections: ", conns)
+    print("All-to-all group size: ", groupsize)
+    print("Flowsize: ", flowsize, "bytes")
+    print("ExtraStartTime: ", extrastarttime, "us")
+    print("Random Seed ", randseed)
+    print("Groups ", conns // groupsize)
+
+
+SCRIPTS = {
+    'gen_permutation.py': gen_permutation,
+    'gen_permutation_full_bisection.py': gen_permutation_full_bisection,
+    'gen_incast.py': gen_incast,
+    'gen_outcast_incast.py': gen_outcast_incast,
+    'gen_allreduce.py': gen_allreduce,
+    'gen_allreduce_butterfly.py': gen_allreduce_butterfly,
+    'gen_serial_alltoall.py': gen_serial_alltoall,
+    'gen_serialn_alltoall.py': gen_serialn_alltoall,
+    'gen_serialn_alltoall_prio.py': gen_serialn_alltoall_prio,
+    'gen_topology.py': gen_topology,
+}
+
+
+def run(argv):
+    """
+    Runs the command line of the generator script named by argv[0].
+    """
+    script = os.path.basename(argv[0])
+    if script not in SCRIPTS:
+        raise ValueError(f"{script} is not a generator of the cmgen package")
+    SCRIPTS[script](argv)
@@ -0,0 +1,307 @@
+# Generators of the traffic patterns of the gen_*.py scripts.
+#
+# Every generator returns a ConnectionMatrix whose flows are built as arrays.
+# The collectives are made of chains: every member of a group runs the same
+# sequence of flows, shifted round the group, each flow started by a trigger
+# fired by the one before it. A chain is laid out once and repeated for all
+# members of all groups with broadcasting, so a generator costs a few array
+# operations whatever the number of flows.
+#
+# The nodes of the collectives are shuffled, and incast start times drawn,
+# with Python's random module seeded with randseed (unseeded for 0) in the
+# same order as the scripts always did, so a seed gives the same matrix it
+# always gave. Permutations are drawn with a NumPy generator seeded the same
+# way (see derangement).
+
+import random
+
+import numpy as np
+
+from .matrix import NO_START, ConnectionMatrix, empty_flows, make_triggers
+
+# Rounds of random swaps mixing a derangement
+MIX_ROUNDS = 2
+
+
+def shuffled_nodes(nodes, randseed, first=0):
+    """
+    Returns the nodes first..nodes-1 in random order, and the random generator
+    seeded with randseed (or unseeded for 0) that shuffled them.
+    """
+    rng = random.Random(randseed if randseed != 0 else None)
+    order = list(range(first, nodes))
+    rng.shuffle(order)
+    return np.array(order, dtype=np.int32), rng
+
+
+def numpy_rng(randseed):
+    """
+    Returns a NumPy random generator seeded with randseed, or unseeded for 0.
+    """
+    return np.random.default_rng(randseed if randseed != 0 else None)
+
+
+def derangement(count, rng, group_size=1, rounds=MIX_ROUNDS):
+    """
+    Returns a random permutation dst of the nodes 0..count-1 in which no node is
+    mapped into its own group of group_size consecutive nodes (e.g. the hosts of a
+    rack or a pod); with group_size 1, a permutation without fixed points.
+
+    The nodes are put in random order with the nodes of every group together and
+    each mapped to the node as many places on as a group has nodes, which is always
+    in another group. Rounds of swaps of the destinations of random disjoint pairs
+    of nodes, made where both stay out of their own groups, then mix the result.
+    """
+    largest = min(group_size, count)
+    if largest > count - largest:
+        raise ValueError(f"No permutation of {count} nodes avoids groups of {largest} nodes")
+
+    order = rng.permutation(count)
+    if group_size > 1:
+        label = rng.permutation(-(-count // group_size))[order // group_size]
+        order = order[np.argsort(label, kind='stable')]
+    dst = np.empty(count, dtype=np.int64)
+    dst[order] = np.roll(order, -largest)
+    for _ in range(rounds):
+        pairs = rng.permutation(count)[:count // 2 * 2].reshape(-1, 2)
+        i, j = pairs[:, 0], pairs[:, 1]
+        swap = (dst[j] // group_size != i // group_size) & (dst[i] // group_size != j // group_size)
+        i, j = i[swap], j[swap]
+        dst[i], dst[j] = dst[j], dst[i].copy()
+
+    if np.any(dst // group_size == np.arange(count) // group_size):
+        raise RuntimeError("derangement mapped a node into its own group")
+    return dst
+
+
+def permutation(nodes, conns, flowsize, extrastarttime=0, randseed=0, cross=None):
+    """
+    Returns a permutation matrix: conns flows from distinct random sources to distinct
+    destinations, none to itself, all starting at extrastarttime us. With cross, every
+    flow leaves its block of cross consecutive nodes, e.g. the hosts of its rack or pod.
+    """
+    if conns > nodes:
+        raise ValueError(f"A permutation of {nodes} nodes has at most {nodes} connections")
+    rng = numpy_rng(randseed)
+    dsts = derangement(nodes, rng, cross or 1)
+    srcs = rng.permutation(nodes)[:conns]
+
+    flows = empty_flows(conns)
+    flows['src'] = srcs
+    flows['dst'] = dsts[srcs]
+    flows['id'] = np.arange(1, conns + 1)
+    flows['start'] = int(extrastarttime * 1000000)
+    flows['size'] = flowsize
+    return ConnectionMatrix(nodes, flows)
+
+
+def full_bisection_permutation(nodes, conns, flowsize, extrastarttime=0, randseed=0):
+    """
+    Returns a permutation matrix where every node sends to the node half the nodes
+    away, so that every flow crosses the bisection: conns flows from distinct random
+    sources, all starting at extrastarttime us.
+    """
+    if nodes < 2 or conns > nodes:
+        raise ValueError(f"A full bisection permutation of {nodes} nodes has 1 to {nodes} connections")
+    srcs, _ = shuffled_nodes(nodes, randseed)
+    srcs = srcs[:conns]
+
+    flows = empty_flows(conns)
+    flows['src'] = srcs
+    flows['dst'] = (srcs + nodes // 2) % nodes
+    flows['id'] = np.arange(1, conns + 1)
+    flows['start'] = int(extrastarttime * 1000000)
+    flows['size'] = flowsize
+    return ConnectionMatrix(nodes, flows)
+
+
+def incast(nodes, conns, flowsize, extrastarttime=0, randseed=0, prefer_remote=False):
+    """
+    Returns an incast matrix: conns flows to node 0, from random nodes or, with
+    prefer_remote, from the upper half of the nodes in order. Each flow starts at
+    a random time up to extrastarttime us.
+    """
+    if prefer_remote:
+        srcs = np.arange(nodes // 2, nodes, dtype=np.int32)
+        rng = random.Random(randseed if randseed != 0 else None)
+    else:
+        srcs, rng = shuffled_nodes(nodes, randseed, first=1)
+    if conns > len(srcs):
+        raise ValueError(f"Only {len(srcs)} nodes can send to the incast destination")
+
+    flows = empty_flows(conns)
+    flows['src'] = srcs[:conns]
+    flows['dst'] = 0
+    flows['id'] = np.arange(1, conns + 1)
+    extra = int(extrastarttime * 1000000)
+    flows['start'] = [rng.randint(0, extra) for _ in range(conns)]
+    flows['size'] = flowsize
+    return ConnectionMatrix(nodes, flows)
+
+
+def outcast_incast(nodes, conns1, conns2, flowsize, randseed=0):
+    """
+    Returns an incast of conns1 flows from nodes 1..conns1 to node 0, where every sender
+    but the first also sends to conns2-1 other nodes of its own, all starting at 0.
+    """
+    if (conns1 - 1) * conns2 + 1 + conns1 >= nodes:
+        raise ValueError("Too many connections for target topology")
+    outcast = max(conns2 - 1, 0)
+
+    # Every sender n sends to 0, then senders past the first to their own targets
+    per_sender = np.where(np.arange(conns1) == 0, 1, 1 + outcast)
+    flows = empty_flows(int(per_sender.sum()))
+    sender = np.repeat(np.arange(conns1), per_sender)
+    first = np.concatenate([[0], np.cumsum(per_sender)[:-1]])
+    rank = np.arange(len(flows)) - np.repeat(first, per_sender)
+    flows['src'] = sender + 1
+    flows['dst'] = np.where(rank == 0, 0, conns1 + (sender - 1) * outcast + rank)
+    flows['id'] = np.arange(1, len(flows) + 1)
+    flows['start'] = 0
+    flows['size'] = flowsize
+    return ConnectionMatrix(nodes, flows)
+
+
+def group_members(nodes, conns, groupsize, randseed, shuffle=True, locality=False):
+    """
+    Returns the nodes of the conns // groupsize groups of a collective, one row per
+    group, taken in order from the shuffled (or, without shuffle, ordered) nodes.
+    With locality the nodes of every group are sorted.
+    """
+    groups = conns // groupsize
+    if groups * groupsize > nodes:
+        raise ValueError(f"{groups} groups of {groupsize} do not fit in {nodes} nodes")
+    if shuffle:
+        srcs, _ = shuffled_nodes(nodes, randseed)
+    else:
+        srcs = np.arange(nodes, dtype=np.int32)
+    members = srcs[:groups * groupsize].reshape(groups, groupsize)
+    if locality:
+        members = np.sort(members, axis=1)
+    return members
+
+
+def chain_flows(members, src_offset, dst_offset, trigger, send_done_trigger, start, size, prio=None):
+    """
+    Returns the flows of a chain run by every member of every group, and the number
+    of triggers of a chain. Flow k of the chain of member s goes from member
+    s + src_offset[k] to member s + dst_offset[k] of its group (round the group).
+    trigger and send_done_trigger are the triggers of the flows counted from 1 within
+    the chain (0 for none), numbered on from the triggers of the chains before it;
+    start is the start time of each flow (NO_START for none).
+    """
+    groups, groupsize = members.shape
+    chains = groups * groupsize
+    per_chain = len(src_offset)
+    triggers = int(max(np.max(trigger, initial=0), np.max(send_done_trigger, initial=0)))
+
+    chain = np.arange(chains, dtype=np.int32)[:, None]
+    s = chain % groupsize
+    flat = members.ravel()
+    flows = empty_flows(chains * per_chain)
+    flows['src'] = flat[(chain - s + (s + np.asarray(src_offset, dtype=np.int32)) % groupsize).ravel()]
+    flows['dst'] = flat[(chain - s + (s + np.asarray(dst_offset, dtype=np.int32)) % groupsize).ravel()]
+    flows['id'] = np.arange(1, len(flows) + 1)
+    base = chain * triggers
+    flows['trigger'] = np.where(np.asarray(trigger) > 0, base + np.asarray(trigger, dtype=np.int32), 0).ravel()
+    flows['send_done_trigger'] = np.where(np.asarray(send_done_trigger) > 0,
+                                          base + np.asarray(send_done_trigger, dtype=np.int32), 0).ravel()
+    flows['start'] = np.tile(start, chains)
+    flows['size'] = size
+    if prio is not None:
+        flows['prio'] = np.tile(prio, chains)
+    return flows, chains * triggers
+
+
+def ring_allreduce(nodes, conns, groupsize, flowsize, locality=False, randseed=0):
+    """
+    Returns a ring allreduce over conns // groupsize groups of shuffled nodes: every
+    member passes 2*groupsize-1 messages round the ring, each sent when the one
+    before it has been sent.
+    """
+    members = group_members(nodes, conns, groupsize, randseed, locality=locality)
+    d = np.arange(1, 2 * groupsize)
+    flows, triggers = chain_flows(members, d - 1, d, np.where(d > 1, d - 1, 0),
+                                  np.where(d < 2 * groupsize - 1, d, 0),
+                                  np.where(d == 1, 0, NO_START), flowsize)
+    return ConnectionMatrix(nodes, flows, make_triggers(np.arange(1, triggers + 1)))
+
+
+def butterfly_allreduce(nodes, groups, groupsize, flowsize, locality=False, randseed=0):
+    """
+    Returns a butterfly allreduce over groups groups of consecutive nodes: in step d
+    every member exchanges a message with the member 2^d away, once the message of
+    step d-1 has been received.
+    """
+    if groupsize & (groupsize - 1) or groupsize < 1:
+        raise ValueError("The groupsize of a butterfly allreduce must be a power of two")
+    members = group_members(nodes, groups * groupsize, groupsize, randseed, shuffle=False, locality=locality)
+    steps = groupsize.bit_length() - 1
+    per_step = groupsize
+
+    # Flows of each step in (group, step, pair, direction) order
+    src = np.empty((groups, steps, per_step), dtype=np.int32)
+    dst = np.empty_like(src)
+    trigger = np.zeros_like(src)
+    recv_done_trigger = np.zeros_like(src)
+    received = np.zeros((groups, groupsize), dtype=np.int32)
+    group = np.arange(groups, dtype=np.int32)[:, None]
+    index = np.arange(groupsize)
+    for d in range(steps):
+        lower = index[(index >> d) % 2 == 0]
+        src[:, d] = np.stack([lower, lower + (1 << d)], axis=1).ravel()
+        dst[:, d] = np.stack([lower + (1 << d), lower], axis=1).ravel()
+        if d > 0:
+            trigger[:, d] = received[group, src[:, d]]
+        if d < steps - 1:
+            recv_done_trigger[:, d] = group * (steps - 1) * per_step + d * per_step + np.arange(1, per_step + 1)
+            received[group, dst[:, d]] = recv_done_trigger[:, d]
+
+    flows = empty_flows(src.size)
+    flows['src'] = members[group[:, :, None], src].ravel()
+    flows['dst'] = members[group[:, :, None], dst].ravel()
+    flows['id'] = np.arange(1, len(flows) + 1)
+    flows['start'] = np.where(trigger.ravel() > 0, NO_START, 0)
+    flows['trigger'] = trigger.ravel()
+    flows['recv_done_trigger'] = recv_done_trigger.ravel()
+    flows['size'] = flowsize
+    return ConnectionMatrix(nodes, flows, make_triggers(np.arange(1, groups * max(steps - 1, 0) * per_step + 1)))
+
+
+def windowed_alltoall(nodes, conns, groupsize, parallel, flowsize, extrastarttime=0, randseed=0, prio=False,
+                      trigger_type='multishot'):
+    """
+    Returns an all-to-all over conns // groupsize groups of shuffled nodes: every member
+    sends to the other members of its group parallel flows at a time, the next flows
+    triggered when all of the previous ones have been sent. The first flows start at
+    extrastarttime us. With prio, the flows of every round get the priority of their
+    round, counted from 1.
+    """
+    if conns % groupsize != 0:
+        raise ValueError("conns must be a multiple of groupsize")
+    rounds = (groupsize - 1) // parallel
+    left = (groupsize - 1) % parallel
+    if rounds == 0:
+        raise ValueError("parallel must be below groupsize")
+    members = group_members(nodes, conns, groupsize, randseed)
+
+    # Rounds 1..rounds of parallel flows, then the left over flows after the last round
+    d = np.repeat(np.arange(1, rounds + 1), parallel)
+    window = np.tile(np.arange(parallel), rounds)
+    done = (d != rounds) | (left > 0)
+    dst_offset = np.concatenate([d + window * rounds, parallel * rounds + np.arange(left) + 1])
+    trigger = np.concatenate([np.where(d > 1, d - 1, 0), np.full(left, rounds)])
+    send_done_trigger = np.concatenate([np.where(done, d, 0), np.zeros(left, dtype=np.int64)])
+    start = np.concatenate([np.where(d == 1, int(extrastarttime * 1000000), NO_START), np.full(left, NO_START)])
+    priority = np.concatenate([d, np.full(left, rounds + 1)]) if prio else None
+
+    flows, triggers = chain_flows(members, np.zeros(len(dst_offset), dtype=np.int32), dst_offset, trigger,
+                                  send_done_trigger, start, flowsize, priority)
+    return ConnectionMatrix(nodes, flows, make_triggers(np.arange(1, triggers + 1), trigger_type))
+
+
+def serial_alltoall(nodes, conns, groupsize, flowsize, extrastarttime=0, randseed=0):
+    """
+    Returns an all-to-all sending one flow at a time (see windowed_alltoall).
+    """
+    return windowed_alltoall(nodes, conns, groupsize, 1, flowsize, extrastarttime, randseed, trigger_type='oneshot')
@@ -0,0 +1,157 @@
+# Connection matrices as arrays, and their .cm text form.
+#
+# A ConnectionMatrix holds one row per flow in a structured array with the
+# fields of a flow line of a .cm file (see ConnectionMatrix::load in
+# connection_matrix.cpp), and one row per trigger in a second array. Absent
+# fields are NO_START for start, NO_PRIO for prio and 0 for the triggers, as
+# trigger id 0 is not allowed. The text is written with one %-format over a
+# whole chunk of flows: every flow gets the format of the fields it has, with
+# the fields that are the same for the whole chunk already filled in, and the
+# values of all flows of the chunk are formatted in a single operation.
+
+import numpy as np
+
+NO_START = -1
+NO_PRIO = -1
+TRIGGER_TYPES = ['oneshot', 'multishot', 'barrier']
+
+FLOW_DTYPE = np.dtype([
+    ('src', np.int32),
+    ('dst', np.int32),
+    ('id', np.int32),
+    ('start', np.int64),
+    ('size', np.int64),
+    ('prio', np.int32),
+    ('trigger', np.int32),
+    ('send_done_trigger', np.int32),
+    ('recv_done_trigger', np.int32),
+])
+TRIGGER_DTYPE = np.dtype([
+    ('id', np.int32),
+    ('type', np.int8),
+    ('count', np.int32),
+])
+
+# Fields of a flow line in the order they are written, and whether each is always present
+LINE_FIELDS = [('src', True), ('dst', True), ('id', True), ('start', False), ('trigger', False), ('size', True),
+               ('send_done_trigger', False), ('recv_done_trigger', False), ('prio', False)]
+LINE_FORMATS = {'src': '%d', 'dst': '->%d', 'id': ' id %d', 'start': ' start %d', 'trigger': ' trigger %d',
+                'size': ' size %d', 'send_done_trigger': ' send_done_trigger %d',
+                'recv_done_trigger': ' recv_done_trigger %d', 'prio': ' prio %d'}
+CHUNK_FLOWS = 1 << 20
+
+
+def empty_flows(count):
+    """
+    Returns an array of count flows with no start, priority or triggers.
+    """
+    flows = np.zeros(count, dtype=FLOW_DTYPE)
+    flows['start'] = NO_START
+    flows['prio'] = NO_PRIO
+    return flows
+
+
+def make_triggers(ids, type='oneshot', count=0):
+    """
+    Returns the trigger table of triggers with the given ids, all of one type.
+    """
+    triggers = np.zeros(len(ids), dtype=TRIGGER_DTYPE)
+    triggers['id'] = ids
+    triggers['type'] = TRIGGER_TYPES.index(type)
+    triggers['count'] = count
+    return triggers
+
+
+class ConnectionMatrix:
+    def __init__(self, nodes, flows, triggers=None):
+        """
+        A matrix of the given number of nodes with the given flows (a FLOW_DTYPE array)
+        and triggers (a TRIGGER_DTYPE array, or None for a matrix without a Triggers line).
+        """
+        self.nodes = nodes
+        self.flows = flows
+        self.triggers = triggers
+
+    def __len__(self):
+        return len(self.flows)
+
+    def header(self):
+        """
+        Returns the header lines of the matrix.
+        """
+        lines = f"Nodes {self.nodes}\nConnections {len(self.flows)}\n"
+        if self.triggers is not None:
+            lines += f"Triggers {len(self.triggers)}\n"
+        return lines
+
+    def write(self, path, sidecar=False):
+        """
+        Writes the matrix as a .cm file and, with sidecar, its binary sidecar (see binary).
+        """
+        with open(path, 'w') as f:
+            f.write(self.header())
+            for begin in range(0, len(self.flows), CHUNK_FLOWS):
+                f.write(format_flows(self.flows[begin:begin + CHUNK_FLOWS]))
+            if self.triggers is not None:
+                for begin in range(0, len(self.triggers), CHUNK_FLOWS):
+                    f.write(format_triggers(self.triggers[begin:begin + CHUNK_FLOWS]))
+        if sidecar:
+            from .binary import sidecar_path, write_binary
+            write_binary(self, sidecar_path(path), path)
+
+
+def format_flows(flows):
+    """
+    Returns the flow lines of the given flows.
+    """
+    if len(flows) == 0:
+        return ""
+    present = np.empty((len(flows), len(LINE_FIELDS)), dtype=bool)
+    for column, (field, always) in enumerate(LINE_FIELDS):
+        if always:
+            present[:, column] = True
+        elif field in ('start', 'prio'):
+            present[:, column] = flows[field] >= 0
+        else:
+            present[:, column] = flows[field] > 0
+
+    # Fields with the same value on every line that has them are written into the formats
+    pieces = []
+    variable = []
+    for column, (field, _) in enumerate(LINE_FIELDS):
+        values = flows[field][present[:, column]]
+        if len(values) == 0:
+            pieces.append("")
+        elif values.min() == values.max():
+            pieces.append(LINE_FORMATS[field] % int(values[0]))
+        else:
+            pieces.append(LINE_FORMATS[field])
+            variable.append(column)
+
+    # One line format per combination of present fields, picked for every flow
+    codes = present.astype(np.int64) @ (1 << np.arange(len(LINE_FIELDS), dtype=np.int64))
+    first = int(codes[0])
+    formats = np.empty(int(codes.max()) + 1, dtype=object)
+    for code in np.unique(codes).tolist():
+        formats[code] = "".join(piece for column, piece in enumerate(pieces) if code >> column & 1) + "\n"
+
+    values = np.empty((len(flows), len(variable)), dtype=np.int64)
+    for index, column in enumerate(variable):
+        values[:, index] = flows[LINE_FIELDS[column][0]]
+    if np.all(codes == first):
+        return formats[first] * len(flows) % tuple(values.ravel().tolist())
+    return "".join(formats[codes].tolist()) % tuple(values[present[:, variable]].tolist())
+
+
+def format_triggers(triggers):
+    """
+    Returns the trigger lines of the given triggers.
+    """
+    if len(triggers) == 0:
+        return ""
+    barrier = triggers['type'] == TRIGGER_TYPES.index('barrier')
+    formats = np.array([f"trigger id %d {type}" + (" count %d\n" if type == 'barrier' else "\n")
+                        for type in TRIGGER_TYPES], dtype=object)
+    values = np.stack([triggers['id'], triggers['count']], axis=1).astype(np.int64)
+    present = np.stack([np.ones(len(triggers), dtype=bool), barrier], axis=1)
+    return "".join(formats[triggers['type']].tolist()) % tuple(values[present].tolist())
@@ -0,0 +1,53 @@
+# Fat tree .topo files, as read by FatTreeTopologyCfg.
+#
+# read_topo parses the header (Nodes, Tiers, Podsize) and the attributes of
+# every tier, and pod_layout works out from them how many hosts, ToR switches
+# and aggregation switches a pod holds, like the simulator does. The topology
+# generators place hosts in racks and pods with it, and the log tools of
+# sim/datacenter (fat_tree_names, htsim_log -pod) place switches and links.
+
+
+def read_topo(path):
+    """
+    Reads a fat tree .topo file (see FatTreeTopologyCfg::read_cfg) into a dict with
+    the nodes, tiers and podsize of its header and, under 'tier', one dict of
+    attributes per tier with lowercase keys. Oversubscribed and Bundle default to 1.
+    """
+    topo = {'nodes': 0, 'tiers': 0, 'podsize': 0, 'tier': []}
+    current = None
+    with open(path, 'r') as f:
+        for line in f:
+            tokens = line.split()
+            if not tokens or tokens[0].startswith('#'):
+                continue
+            key = tokens[0].lower()
+            if key == 'tier':
+                current = int(tokens[1])
+                while len(topo['tier']) <= current:
+                    topo['tier'].append({'oversubscribed': 1, 'bundle': 1})
+            elif current is None:
+                topo[key] = int(tokens[1])
+            else:
+                topo['tier'][current][key] = int(tokens[1])
+    return topo
+
+
+def pod_layout(topo, nodes=None):
+    """
+    Returns the hosts, ToR switches and aggregation switches per pod and the number
+    of pods of a fat tree read with read_topo, computed like FatTreeTopologyCfg::set_custom_params.
+    """
+    nodes = nodes or topo['nodes']
+    tiers = topo['tier']
+    hosts_per_pod = topo['podsize']
+    pods = nodes // hosts_per_pod
+    tors_per_pod = hosts_per_pod // tiers[0]['radix_down']
+    tor_uplinks = (nodes * tiers[0]['downlink_speed_gbps']) // (tiers[1]['downlink_speed_gbps'] * tiers[0]['oversubscribed'])
+    aggs_per_pod = tor_uplinks // (pods * tiers[1]['radix_down'])
+    return {
+        'tiers': topo['tiers'],
+        'pods': pods if topo['tiers'] == 3 else 1,
+        'hosts_per_pod': hosts_per_pod,
+        'tors_per_pod': tors_per_pod,
+        'aggs_per_pod': aggs_per_pod,
+    }
@@ -0,0 +1,153 @@
+# Generators that place traffic by the racks and pods of a fat tree.
+#
+# The hosts of a fat tree .topo file are numbered like FatTreeTopology does:
+# host h hangs off ToR h // Radix_Down of tier 0 and sits in pod h // Podsize
+# (see topo.pod_layout). A flow between hosts of one rack only
+# crosses their ToR, a flow between racks of one pod climbs to the aggregation
+# tier and a flow between pods to the core. Of a two tier leaf-spine, a rack
+# is the block whose traffic to other blocks crosses the top tier, as a pod
+# is of a three tier tree; the generators call it the top block.
+#
+# Sources are drawn like those of permutation, with a NumPy generator seeded
+# with randseed (or unseeded for 0).
+
+import numpy as np
+
+from .generators import derangement, numpy_rng
+from .matrix import ConnectionMatrix, empty_flows
+from .topo import pod_layout, read_topo
+
+
+def topo_layout(path, nodes=None):
+    """
+    Returns the layout of the hosts of a .topo file as a dict: nodes, tiers, hosts_per_rack,
+    hosts_per_pod, racks, pods, hosts_per_block (hosts of a top block) and blocks, and
+    oversubscribed, the oversubscription of the path up to the top tier.
+    """
+    topo = read_topo(path)
+    pods = pod_layout(topo, nodes)
+    nodes = nodes or topo['nodes']
+    hosts_per_rack = topo['tier'][0]['radix_down']
+    hosts_per_pod = pods['hosts_per_pod'] if pods['tiers'] == 3 else nodes
+    if nodes % hosts_per_rack or nodes % hosts_per_pod:
+        raise ValueError(f"{nodes} nodes do not fill racks of {hosts_per_rack} and pods of {hosts_per_pod} hosts")
+    hosts_per_block = hosts_per_pod if pods['tiers'] == 3 else hosts_per_rack
+    oversubscribed = 1
+    for tier in topo['tier'][:pods['tiers'] - 1]:
+        oversubscribed *= tier['oversubscribed']
+    return {
+        'nodes': nodes,
+        'tiers': pods['tiers'],
+        'hosts_per_rack': hosts_per_rack,
+        'hosts_per_pod': hosts_per_pod,
+        'racks': nodes // hosts_per_rack,
+        'pods': nodes // hosts_per_pod,
+        'hosts_per_block': hosts_per_block,
+        'blocks': nodes // hosts_per_block,
+        'oversubscribed': oversubscribed,
+    }
+
+
+def top_tier(layout, srcs, dsts):
+    """
+    Returns the highest tier every flow from srcs to dsts climbs to: 0 for the ToR,
+    1 for the tier above it and 2 for the core of a three tier tree.
+    """
+    srcs, dsts = np.asarray(srcs), np.asarray(dsts)
+    tier = np.where(srcs // layout['hosts_per_rack'] != dsts // layout['hosts_per_rack'], 1, 0)
+    if layout['tiers'] == 3:
+        tier[srcs // layout['hosts_per_pod'] != dsts // layout['hosts_per_pod']] = 2
+    return tier
+
+
+def topology_flows(layout, srcs, dsts, flowsize, start):
+    flows = empty_flows(len(srcs))
+    flows['src'] = srcs
+    flows['dst'] = dsts
+    flows['id'] = np.arange(1, len(srcs) + 1)
+    flows['start'] = start
+    flows['size'] = flowsize
+    return ConnectionMatrix(layout['nodes'], flows)
+
+
+def sources(layout, conns, rng):
+    if conns > layout['nodes']:
+        raise ValueError(f"A permutation of {layout['nodes']} nodes has at most {layout['nodes']} connections")
+    return rng.permutation(layout['nodes'])[:conns]
+
+
+def intra_rack(layout, conns, flowsize, extrastarttime=0, randseed=0):
+    """
+    Returns a permutation matrix within the racks: conns flows from distinct random
+    sources, each to another host of its own rack, all starting at extrastarttime us.
+    The hosts of every rack are put in random order and each sends to the next.
+    """
+    hosts_per_rack = layout['hosts_per_rack']
+    if hosts_per_rack < 2:
+        raise ValueError("No host shares its rack with another")
+    rng = numpy_rng(randseed)
+    racks = np.arange(layout['nodes']).reshape(layout['racks'], hosts_per_rack)
+    order = rng.permuted(racks, axis=1)
+    dsts = np.empty(layout['nodes'], dtype=np.int64)
+    dsts[order] = np.roll(order, -1, axis=1)
+    srcs = sources(layout, conns, rng)
+    return topology_flows(layout, srcs, dsts[srcs], flowsize, int(extrastarttime * 1000000))
+
+
+def cross_pod(layout, conns, flowsize, extrastarttime=0, randseed=0):
+    """
+    Returns a random permutation matrix in which every flow leaves its top block, so
+    that every flow crosses the top tier, all starting at extrastarttime us.
+    """
+    if layout['blocks'] < 2:
+        raise ValueError("The topology has a single top block, no flow can cross its top tier")
+    rng = numpy_rng(randseed)
+    dsts = derangement(layout['nodes'], rng, layout['hosts_per_block'])
+    srcs = sources(layout, conns, rng)
+    return topology_flows(layout, srcs, dsts[srcs], flowsize, int(extrastarttime * 1000000))
+
+
+def oversubscription_stress(layout, conns, flowsize, extrastarttime=0, randseed=0):
+    """
+    Returns the permutation matrix that loads the oversubscribed uplinks worst: every
+    top block sends to another, drawn at random, host by host, so that all hosts of a
+    rack send to the hosts of a single remote rack. Every flow crosses the top tier,
+    the uplinks of every ToR carry as many flows as it has hosts, and few pairs of
+    racks leave the least room to spread them. All flows start at extrastarttime us.
+    """
+    if layout['blocks'] < 2:
+        raise ValueError("The topology has a single top block, no flow can cross its top tier")
+    rng = numpy_rng(randseed)
+    hosts_per_block = layout['hosts_per_block']
+    hosts = np.arange(layout['nodes'])
+    dsts = derangement(layout['blocks'], rng)[hosts // hosts_per_block] * hosts_per_block + hosts % hosts_per_block
+    srcs = sources(layout, conns, rng)
+    return topology_flows(layout, srcs, dsts[srcs], flowsize, int(extrastarttime * 1000000))
+
+
+def rack_incast(layout, conns, flowsize, extrastarttime=0, randseed=0):
+    """
+    Returns an incast on a random rack: conns flows from random hosts outside the top
+    block of the rack, spread evenly over the hosts of the rack, so that they converge
+    on its ToR through the top tier. Each flow starts at a random time up to extrastarttime us.
+    """
+    rng = numpy_rng(randseed)
+    hosts_per_rack, hosts_per_block = layout['hosts_per_rack'], layout['hosts_per_block']
+    rack = int(rng.integers(layout['racks']))
+    block = rack * hosts_per_rack // hosts_per_block
+    remote = np.concatenate([np.arange(block * hosts_per_block),
+                             np.arange((block + 1) * hosts_per_block, layout['nodes'])])
+    if conns > len(remote):
+        raise ValueError(f"Only {len(remote)} hosts outside the top block of the rack can send to it")
+    srcs = rng.permutation(remote)[:conns]
+    dsts = rack * hosts_per_rack + np.arange(conns) % hosts_per_rack
+    extra = int(extrastarttime * 1000000)
+    return topology_flows(layout, srcs, dsts, flowsize, rng.integers(0, extra + 1, size=conns))
+
+
+PATTERNS = {
+    'intra_rack': intra_rack,
+    'cross_pod': cross_pod,
+    'stress': oversubscription_stress,
+    'rack_incast': rack_incast,
+}
@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+
+# Generate a traffic matrix placed by the racks and pods of a fat tree topology.
+# python gen_topology.py <filename> <topofile> <pattern> <conns> <flowsize> <extrastarttime> <randseed>
+# Parameters:
+# <topofile>   fat tree .topo file (e.g. ../topologies/fat_tree_1024_4os.topo) giving the nodes, racks and pods
+# <pattern>   intra_rack: every host sends to another host of its rack
+#             cross_pod: random permutation in which every flow leaves its pod (its rack on a two tier topology)
+#             stress: every pod (rack) sends host by host to another, loading the oversubscribed uplinks worst
+#             rack_incast: hosts of other pods send to the hosts of one rack
+# <conns>    number of active connections
+# <flowsize>   size of the flows in bytes
+# <extrastarttime>   Start time of the flows in microseconds; for rack_incast, start times are random in between 0 and this time.  Can be a float.
+# <randseed>   Seed for random number generator, or set to 0 for random seed
+
+import sys
+
+from cmgen import cli
+
+if __name__ == "__main__":
+    cli.gen_topology(sys.argv)
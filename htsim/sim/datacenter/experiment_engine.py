@@ -0,0 +1,893 @@
+#!/usr/bin/env python
+# Shared engine for the validation runners (validate.py, validate_parallel.py
+# and validate_with_plot.py).
+#
+# An experiment plan is a text file made of blocks like:
+#
+#   connection_matrices/one.cm
+#   !Experiment Single Connection
+#   !Binary ./htsim_uec
+#   !Param -end 1000
+#   !tailFCT 190
+#   !FCT Uec_0_1 150
+#
+# The engine parses a plan once, runs every experiment on a process pool and
+# prints the [PASS]/[FAIL] report of each experiment in plan order, so the
+# output stays comparable by check_regressions.py whatever the completion
+# order of the runs was.
+
+import argparse
+import gzip
+import os
+import json
+import resource
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import Manager
+
+import quantile_sketch
+import result_cache
+import results_table
+import run_history
+import run_journal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "connection_matrices"))
+import cmgen
+
+DEFAULT_BINARY = "./htsim_uec"
+
+# Failures worth retrying: the run was killed from outside, most likely by the OOM killer.
+TRANSIENT_SIGNALS = (signal.SIGKILL, signal.SIGTERM)
+# Without an explicit timeout, a run gets timeout_factor times its predicted runtime
+# of CPU time, but never less than MIN_TIMEOUT seconds, and twice that in wallclock time.
+# A run without a prediction (e.g. on a fresh history) gets UNPREDICTED_TIMEOUT seconds.
+DEFAULT_TIMEOUT_FACTOR = 10
+MIN_TIMEOUT = 60
+UNPREDICTED_TIMEOUT = 4 * 3600
+
+
+def parse_plan(input_filename, default_binary=DEFAULT_BINARY):
+    """
+    Parses an experiment plan and returns a list of experiment dicts in plan order.
+    """
+    with open(input_filename, 'r') as file:
+        inputlines = file.readlines()
+
+    experiments = []
+    i = 0
+    while i < len(inputlines):
+        filename = inputlines[i].rstrip()
+        i = i + 1
+
+        if not filename or filename.startswith("#"):
+            continue
+        elif filename.startswith("!"):
+            print("Found parameters when not processing a file!", filename)
+            continue
+
+        experiment = {
+            'index': len(experiments),
+            'name': "",
+            'cm': filename,
+            'binary': default_binary,
+            'params': [],
+            'target_tail_fct': 0,
+            'target_fct': {},
+            'hold': False,
+            'seed': None,
+        }
+
+        # The parameter lines of an experiment follow its connection matrix.
+        while i < len(inputlines) and inputlines[i].startswith("!"):
+            p = inputlines[i]
+            i = i + 1
+
+            if "Binary" in p:
+                experiment['binary'] = p.split(" ", 1)[1].rstrip()
+            elif "Param" in p:
+                experiment['params'].append(p.split(" ", 1)[1].rstrip())
+            elif "tailFCT" in p:
+                experiment['target_tail_fct'] = int(p.split(" ", 1)[1])
+            elif "FCT" in p:
+                q = p.split()
+                experiment['target_fct'][q[1]] = int(q[2])
+            elif "Experiment" in p:
+                experiment['name'] = p.split(" ", 1)[1].rstrip("\n")
+            elif "continue" in p:
+                experiment['hold'] = True
+
+        experiments.append(experiment)
+
+    return experiments
+
+
+def expand_seeds(experiments, seeds):
+    """
+    Returns the experiments of a plan repeated once per seed in 1..seeds, each
+    run with -seed and named "<name> (seed <seed>)", so repeated runs can be
+    compared as distributions (see check_regressions.py).
+    """
+    expanded = []
+    for experiment in experiments:
+        for seed in range(1, seeds + 1):
+            expanded.append(dict(experiment, index=len(expanded), name=f"{experiment['name']} (seed {seed})",
+                                 params=experiment['params'] + [f"-seed {seed}"], seed=seed))
+    return expanded
+
+
+def build_cmdline(experiment):
+    """
+    Returns the simulator command line of an experiment as a single string.
+    """
+    cmdline = experiment['binary'] + " -tm " + experiment['cm'] + " "
+    for p in experiment['params']:
+        cmdline = cmdline + p + " "
+    return cmdline
+
+
+def matrix_stats(cm_file):
+    """
+    Returns the node count and connection count of a connection matrix, and the
+    total bytes of its flows, read from its binary sidecar (see cmgen.binary).
+    """
+    matrix = cmgen.load(cm_file)
+    return {'nodes': matrix.nodes, 'connections': len(matrix.flows),
+            'total_bytes': int(matrix.flows['size'].sum())}
+
+
+def param_value(experiment, name):
+    """
+    Returns the value given to a simulator flag in the !Param lines of an experiment, or None.
+    """
+    tokens = shlex.split(" ".join(experiment['params']))
+    for flag, value in zip(tokens, tokens[1:]):
+        if flag == name:
+            return value
+    return None
+
+
+def run_features(experiment, stats):
+    """
+    Returns the features the runtime of an experiment is predicted from.
+    """
+    features = dict(stats)
+    features['cmdline'] = build_cmdline(experiment)
+    features['binary'] = experiment['binary']
+    nodes = param_value(experiment, "-nodes")
+    if nodes is not None:
+        features['nodes'] = int(nodes)
+    end = param_value(experiment, "-end")
+    features['end'] = float(end) if end is not None else 0
+    return features
+
+
+def schedule_order(positions, features, history, policy):
+    """
+    Returns the positions to run in submission order for a scheduling policy,
+    with the predicted runtime of each position, or None when there is not
+    enough history to predict them all.
+
+    'plan' keeps plan order, 'lpt' starts the longest runs first so that no long
+    run is left alone at the end of the plan, and 'spt' starts the shortest first.
+    Without a prediction for every run, total bytes stand in for the runtime.
+    """
+    predicted = {}
+    if history is not None:
+        predicted = {position: history.predict(features[position]) for position in positions}
+    if any(value is None for value in predicted.values()) or len(predicted) < len(positions):
+        predicted = None
+        costs = {position: features[position]['total_bytes'] for position in positions}
+    else:
+        costs = predicted
+
+    if policy == 'lpt':
+        order = sorted(positions, key=lambda position: -costs[position])
+    elif policy == 'spt':
+        order = sorted(positions, key=lambda position: costs[position])
+    else:
+        order = list(positions)
+    return order, predicted
+
+
+def parse_summary(line):
+    """
+    Turns the final 'New: 490 Rtx: 0 RTS: 0 ...' line of a run into a dict of counters.
+    """
+    items = line.split()
+    counters = {}
+    for key, value in zip(items[0::2], items[1::2]):
+        try:
+            counters[key.rstrip(":")] = int(value)
+        except ValueError:
+            pass
+    return counters
+
+
+class OutputParser:
+    """
+    Incremental parser of simulator stdout.
+    Lines are fed one at a time as they are read from the pipe, so the memory
+    used does not depend on how much the simulator prints. The FCTs of all flows
+    go into the sketch; the name, FCT and bytes of a flow are only kept for the
+    flows named in flow_names (e.g. the targets of an experiment), or for every
+    flow with all_flows.
+    """
+
+    def __init__(self, flow_names=(), all_flows=False):
+        self.fct_tail = 0
+        self.fct_min = 0
+        self.finished = 0
+        self.flow_names = set(flow_names)
+        self.all_flows = all_flows
+        self.flows = []
+        self.fct_sketch = quantile_sketch.QuantileSketch()
+        self.summary = ""
+        self.counters = {}
+
+    def feed(self, x):
+        if "finished" in x:
+            items = x.split()
+
+            if "total messages" in x:
+                assert items[9] == 'total'
+                assert items[10] == 'messages'
+                self.finished += int(items[11])
+            else:
+                self.finished += 1
+
+            fct = float(items[8])
+            self.fct_tail = fct
+            if self.fct_min == 0:
+                self.fct_min = fct
+
+            if self.all_flows or items[1] in self.flow_names:
+                flow_bytes = 0
+                if "total bytes" in x:
+                    flow_bytes = int(items[items.index("bytes") + 1])
+                self.flows.append((items[1], fct, flow_bytes))
+            self.fct_sketch.add(fct)
+        elif "New:" in x and "Rtx:" in x:
+            self.summary = x.strip()
+            self.counters = parse_summary(x)
+
+    def result(self):
+        result = {
+            'fct_tail': self.fct_tail,
+            'fct_min': self.fct_min,
+            'fct_p99': self.fct_sketch.quantile(0.99),
+            'fct_sketch': self.fct_sketch.to_dict(),
+            'finished': self.finished,
+            'summary': self.summary,
+            'counters': self.counters,
+        }
+        if self.all_flows or self.flow_names:
+            result['flows'] = self.flows
+        return result
+
+
+def reparse_flows(result, output_path, flow_names=(), all_flows=False):
+    """
+    Sets the flows of a cached result from the raw output stored with it, as the
+    run that stored it may have kept other flows.
+    """
+    parser = OutputParser(flow_names, all_flows)
+    with gzip.open(output_path, 'rt', errors='replace') as f:
+        for line in f:
+            parser.feed(line)
+    result['flows'] = parser.flows
+
+
+def read_tail(f, limit=65536):
+    """
+    Returns at most the last limit bytes of an open binary file as text.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(max(0, size - limit))
+    return f.read().decode('utf-8', errors='replace')
+
+
+def read_memory(pid):
+    """
+    Returns the current and peak resident memory of a process in bytes, read from /proc.
+    Both are 0 where /proc is not available or the process is gone.
+    """
+    rss = peak = 0
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return rss, peak
+
+
+def available_memory():
+    """
+    Returns the memory available for new processes in bytes, or None where /proc is not available.
+    """
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """
+    Samples the resident memory of a running simulator every interval seconds.
+    peak is the high-water mark seen so far; if usage is given, usage[position]
+    is kept up to date with the current resident memory.
+    """
+
+    def __init__(self, pid, usage=None, position=None, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.usage = usage
+        self.position = position
+        self.interval = interval
+        self.peak = 0
+        self._stopped = threading.Event()
+
+    def sample(self):
+        rss, peak = read_memory(self.pid)
+        self.peak = max(self.peak, peak, rss)
+        if self.usage is not None and rss:
+            self.usage[self.position] = rss
+
+    def run(self):
+        self.sample()
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def start_process(args, cpu_timeout=None, **kwargs):
+    """
+    Starts a process in a process group of its own, so that it and everything it
+    starts can be killed together, with its CPU time limited to cpu_timeout seconds.
+    The kernel stops a process over its CPU limit with SIGXCPU.
+    """
+    def limit_cpu():
+        if cpu_timeout is not None:
+            limit = max(1, int(cpu_timeout))
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, limit + 5))
+
+    return subprocess.Popen(args, start_new_session=True, preexec_fn=limit_cpu, **kwargs)
+
+
+def kill_group(process):
+    """
+    Kills the process group of a process started with start_process.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+class Watchdog:
+    """
+    Kills the process group of a process that is still running after timeout seconds.
+    fired tells whether it had to.
+    """
+
+    def __init__(self, process, timeout):
+        self.fired = False
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self._expire, (process,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self, process):
+        self.fired = True
+        kill_group(process)
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+
+def classify_failure(returncode, timed_out, finished, expected):
+    """
+    Returns the failure of a run as a dict with its kind ('timeout', 'crash',
+    'exit' or 'incomplete') and whether it is worth retrying, or None if the run
+    succeeded. Crashes carry the name of the signal that killed the run.
+    """
+    if timed_out or returncode == -signal.SIGXCPU:
+        return {'kind': 'timeout', 'detail': "CPU time limit" if not timed_out else "wallclock limit",
+                'transient': False}
+    if returncode < 0:
+        return {'kind': 'crash', 'detail': signal.Signals(-returncode).name,
+                'transient': -returncode in TRANSIENT_SIGNALS}
+    if returncode > 0:
+        return {'kind': 'exit', 'detail': f"exit code {returncode}", 'transient': False}
+    if finished < expected:
+        return {'kind': 'incomplete', 'detail': f"{finished} of {expected} flows finished", 'transient': False}
+    return None
+
+
+def run_timeouts(predicted, timeout=None, cpu_timeout=None, factor=DEFAULT_TIMEOUT_FACTOR):
+    """
+    Returns the wallclock and CPU timeouts of a run in seconds. Timeouts that are not
+    given are derived from the predicted runtime, or from UNPREDICTED_TIMEOUT without a
+    prediction, so that no run can hang a plan.
+    """
+    if predicted is not None:
+        default = max(MIN_TIMEOUT, factor * predicted)
+    else:
+        default = UNPREDICTED_TIMEOUT
+    if cpu_timeout is None:
+        cpu_timeout = default
+    if timeout is None:
+        timeout = 2 * default
+    return timeout, cpu_timeout
+
+
+def run_experiment(experiment, debug=False, cache=None, key=None, progress=None, position=None,
+                   usage=None, timeout=None, cpu_timeout=None, all_flows=False):
+    """
+    Runs one experiment to completion and returns its result dict, with the flows
+    of its FCT targets, or of every flow with all_flows (see OutputParser).
+    Executed in the worker processes of the pool. stdout is parsed line by line
+    while the simulator runs; successful runs are stored in the result cache
+    under key. If progress is given, progress[position] is kept up to date
+    with the number of flows finished so far, and usage[position] with the
+    resident memory of the simulator. A run over timeout seconds of wallclock
+    or cpu_timeout seconds of CPU time is killed.
+    """
+    cmdline = build_cmdline(experiment)
+    parser = OutputParser(experiment['target_fct'], all_flows)
+    raw = None
+    if cache is not None and key is not None:
+        raw = cache.new_output(key)
+
+    started = time.time()
+    last_progress = started
+    with tempfile.TemporaryFile() as stderr:
+        process = start_process(shlex.split(cmdline), cpu_timeout, stdout=subprocess.PIPE, stderr=stderr,
+                                universal_newlines=True, errors='replace')
+        watchdog = Watchdog(process, timeout)
+        sampler = MemorySampler(process.pid, usage, position)
+        sampler.start()
+        for line in process.stdout:
+            parser.feed(line)
+            if raw is not None:
+                raw.write(line)
+            if progress is not None and time.time() - last_progress > 0.5:
+                progress[position] = parser.finished
+                last_progress = time.time()
+        # The last sample is taken before the process is reaped, while /proc still has it.
+        sampler.sample()
+        process.wait()
+        watchdog.cancel()
+        sampler.stop()
+        errors = read_tail(stderr)
+
+    result = parser.result()
+    result['returncode'] = process.returncode
+    result['timed_out'] = watchdog.fired
+    result['errors'] = errors
+    result['wallclock'] = time.time() - started
+    result['peak_rss'] = sampler.peak
+    if progress is not None:
+        progress[position] = parser.finished
+
+    if raw is not None:
+        if process.returncode == 0:
+            cache.store(key, result, raw)
+        else:
+            cache.discard(raw)
+    return result
+
+
+def print_report(experiment, result, connection_count, debug=False):
+    """
+    Prints the [PASS]/[FAIL] report of a finished experiment.
+    """
+    print("\n\nExperiment:", experiment['name'], "\n==========================================")
+    print("Running", build_cmdline(experiment))
+
+    if result['returncode'] != 0:
+        failure = result.get('failure') or {}
+        print("Error processing file ", experiment['cm'], failure.get('kind', ""), failure.get('detail', ""),
+              result['errors'])
+        return
+
+    target_fct = experiment['target_fct']
+    for flowname, fct, _ in result.get('flows', []):
+        if flowname not in target_fct:
+            continue
+        target = target_fct[flowname]
+        if fct <= target:
+            print("[PASS] FCT", fct, "us for flow ", flowname, "which is below the target of", target, "us")
+        else:
+            print("[FAIL] FCT", fct, "us for flow ", flowname, "which is higher than the target of", target, "us")
+
+    fcttail = result['fct_tail']
+    fctmin = result['fct_min']
+    target_tail_fct = experiment['target_tail_fct']
+    if fcttail > target_tail_fct and target_tail_fct > 0:
+        print("[FAIL] Tail FCT", fcttail, "us above the target of", target_tail_fct, "us")
+    else:
+        print("[PASS] Tail FCT", fcttail, "us below the target of", target_tail_fct, "us")
+
+    if result['finished'] != connection_count:
+        print("[FAIL] Total connections in connection matrix was ", connection_count, " but only ", result['finished'], "finished")
+    else:
+        print("[PASS] Connection count", result['finished'])
+
+    if fctmin > 0:
+        print("FCT Spread", fctmin, "->", fcttail, "ratio", fcttail / fctmin)
+    print("Summary:", result['summary'])
+
+    if debug:
+        print("Wallclock", round(result['wallclock'], 2), "s, peak memory", result.get('peak_rss', 0) // (1024 * 1024),
+              "MB", "(cached)" if result.get('cached') else "")
+
+
+def print_progress(progress, connection_counts, runnable, running, done, total):
+    """
+    Prints a one-line progress counter of the runs in flight to stderr.
+    """
+    finished = sum(progress.get(position, 0) for position in running)
+    expected = sum(connection_counts[runnable[position]['index']] for position in running)
+    sys.stderr.write(f"\r{done}/{total} experiments done, {finished}/{expected} flows finished in running experiments ")
+    sys.stderr.flush()
+
+
+def admit(queue, running, footprints, usage, budget):
+    """
+    Returns the first queued position whose predicted memory footprint fits in what
+    the running ones leave of budget, or None if none fits.
+    A running experiment counts with the larger of its predicted and its current memory.
+    With nothing running the first queued position is admitted whatever its
+    footprint, so an experiment larger than the budget still runs on its own.
+    """
+    if budget is None or not running:
+        return queue[0]
+    used = sum(max(footprints[position], usage.get(position, 0)) for position in running)
+    for position in queue:
+        if used + footprints[position] <= budget:
+            return position
+    return None
+
+
+def run_plan(experiments, jobs=None, cores_per_run=1, debug=False, dryrun=False, on_result=None,
+             cache=None, force=False, show_progress=False, history=None, schedule='lpt',
+             memory_budget=None, journal=None, timeout=None, cpu_timeout=None,
+             timeout_factor=DEFAULT_TIMEOUT_FACTOR, retries=1, failure_report=None, results=None,
+             results_flows=False, seeds=None):
+    """
+    Runs a list of experiments on a process pool and reports them in plan order.
+
+    jobs is the number of simulator runs in flight at once and defaults to the
+    number of cores divided by cores_per_run. on_result(experiment, result) is
+    called for every finished experiment, in plan order.
+    Experiments found in cache are answered without running, unless force is set.
+    With show_progress a live count of finished flows is printed to stderr.
+    Runs are started in the order of the schedule policy (see schedule_order),
+    using the runtimes predicted from history; every run is added to history.
+    With a memory_budget in bytes, a run is only started while the memory
+    predicted for it and the runs in flight fits the budget (see admit); runs
+    that do not fit wait while smaller ones behind them fill the free slots.
+    Every finished run is appended to journal; runs the journal already has as
+    completed are reported from it without running again.
+    Runs are killed after timeout seconds of wallclock or cpu_timeout seconds of
+    CPU time, by default derived from their predicted runtime (see run_timeouts).
+    Failed runs are classified (see classify_failure), transient failures are
+    retried up to retries times, and the failures are written to failure_report
+    as JSON. One row per experiment is written to the result file results (see
+    results_table), with the per-flow FCTs if results_flows is set.
+    With seeds, every experiment is run once per seed (see expand_seeds).
+    Returns the list of (experiment, result) pairs that ran.
+    """
+    if seeds:
+        experiments = expand_seeds(experiments, seeds)
+    if jobs is None:
+        jobs = max(1, (os.cpu_count() or 1) // max(1, cores_per_run))
+
+    runnable = []
+    connection_counts = {}
+    features = []
+    stats = {}
+    for experiment in experiments:
+        if not os.path.isfile(experiment['cm']):
+            print("\n=================================\n!!!!Cannot find traffic matrix file ", experiment['cm'],
+                  "- skipping to next experiment\n================================")
+            continue
+        if debug:
+            print("Cmdline\n", build_cmdline(experiment), "\nTargetTailFCT", experiment['target_tail_fct'],
+                  "\nTargetFCT", experiment['target_fct'])
+        if dryrun:
+            continue
+        if experiment['cm'] not in stats:
+            stats[experiment['cm']] = matrix_stats(experiment['cm'])
+        connection_counts[experiment['index']] = stats[experiment['cm']]['connections']
+        features.append(run_features(experiment, stats[experiment['cm']]))
+        runnable.append(experiment)
+
+    if not runnable:
+        return []
+
+    finished = {}
+    keys = {}
+    journal_params = [{'name': experiment['name'], 'cmdline': build_cmdline(experiment)} for experiment in runnable]
+    if journal is not None:
+        for position in range(len(runnable)):
+            entry = journal.completed(journal_params[position])
+            if entry is not None:
+                finished[position] = entry['metrics']
+    if cache is not None:
+        for position, experiment in enumerate(runnable):
+            if position in finished:
+                continue
+            keys[position] = cache.key(shlex.split(build_cmdline(experiment)))
+            result = cache.lookup(keys[position], force)
+            if result is not None:
+                result['cached'] = True
+                if (experiment['target_fct'] or results_flows) and os.path.exists(cache.output_path(keys[position])):
+                    reparse_flows(result, cache.output_path(keys[position]), experiment['target_fct'], results_flows)
+                result['failure'] = classify_failure(result['returncode'], False, result['finished'],
+                                                     connection_counts[experiment['index']])
+                finished[position] = result
+                if journal is not None:
+                    journal.record(journal_params[position], None, result['returncode'], result,
+                                   build_cmdline(experiment), result['failure'])
+
+    to_run = [position for position in range(len(runnable)) if position not in finished]
+    to_run, predicted = schedule_order(to_run, features, history, schedule)
+    print("Running", len(to_run), "experiments with", jobs, "parallel jobs")
+    sys.stdout.flush()
+
+    reported = []
+
+    def report_ready():
+        # Print every report that is now contiguous with the ones already printed.
+        while len(reported) in finished:
+            experiment = runnable[len(reported)]
+            result = finished.pop(len(reported))
+            print_report(experiment, result, connection_counts[experiment['index']], debug)
+            sys.stdout.flush()
+            if on_result is not None and result['returncode'] == 0:
+                on_result(experiment, result)
+            reported.append((experiment, result))
+
+    footprints = {}
+    timeouts = {}
+    for position in to_run:
+        footprint = history.predict(features[position], 'peak_rss') if history is not None else None
+        footprints[position] = footprint or 0
+        runtime = history.predict(features[position]) if history is not None else None
+        timeouts[position] = run_timeouts(runtime, timeout, cpu_timeout, timeout_factor)
+
+    attempts = {}
+    failures = []
+
+    report_ready()
+    manager = Manager() if show_progress or memory_budget is not None else None
+    progress = manager.dict() if show_progress else None
+    usage = manager.dict() if memory_budget is not None else {}
+    started = time.time()
+    queue = list(to_run)
+    futures = {}
+    pending = set()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while queue or pending:
+            # Runs are only submitted when a worker is free, so they start in schedule order.
+            while queue and len(pending) < jobs:
+                position = admit(queue, [futures[future] for future in pending], footprints, usage,
+                                 memory_budget)
+                if position is None:
+                    break
+                queue.remove(position)
+                attempts[position] = attempts.get(position, 0) + 1
+                run_timeout, run_cpu_timeout = timeouts[position]
+                future = executor.submit(run_experiment, runnable[position], debug, cache, keys.get(position),
+                                         progress, position, usage if memory_budget is not None else None,
+                                         run_timeout, run_cpu_timeout, results_flows)
+                futures[future] = position
+                pending.add(future)
+
+            done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                position = futures[future]
+                experiment = runnable[position]
+                try:
+                    result = future.result()
+                    result['failure'] = classify_failure(result['returncode'], result['timed_out'],
+                                                         result['finished'], connection_counts[experiment['index']])
+                except Exception as e:
+                    result = {'returncode': -1, 'errors': str(e),
+                              'failure': {'kind': 'error', 'detail': str(e), 'transient': False}}
+                result['attempts'] = attempts[position]
+
+                failure = result['failure']
+                if failure is not None and failure['transient'] and attempts[position] <= retries:
+                    sys.stderr.write(f"Retrying {experiment['name']} after {failure['kind']} ({failure['detail']})\n")
+                    queue.insert(0, position)
+                    continue
+                if failure is not None:
+                    failures.append({'index': experiment['index'], 'name': experiment['name'], 'cmdline': build_cmdline(experiment),
+                                     'kind': failure['kind'], 'detail': failure['detail'],
+                                     'returncode': result['returncode'], 'attempts': attempts[position],
+                                     'timeouts': timeouts[position], 'errors': result['errors'][-2000:]})
+
+                finished[position] = result
+                if history is not None and result['returncode'] == 0:
+                    history.record(features[position], result['wallclock'], peak_rss=result['peak_rss'])
+                if journal is not None:
+                    journal.record(journal_params[position], None, result['returncode'], result,
+                                   build_cmdline(experiment), failure)
+            report_ready()
+            if show_progress:
+                running = [futures[future] for future in pending if future.running()]
+                print_progress(progress, connection_counts, runnable, running,
+                               len(runnable) - len(pending) - len(queue), len(runnable))
+    if show_progress:
+        sys.stderr.write("\n")
+    if manager is not None:
+        manager.shutdown()
+
+    if predicted is not None:
+        estimate = f"{run_history.makespan([predicted[position] for position in to_run], jobs):.2f} s"
+    else:
+        estimate = "unknown"
+    print(f"Makespan ({schedule} schedule): predicted {estimate}, actual {time.time() - started:.2f} s")
+
+    if cache is not None:
+        cache.evict()
+        print(cache.report())
+    if journal is not None:
+        print(journal.report())
+
+    if results is not None:
+        rows = [results_table.make_row(experiment['name'], build_cmdline(experiment), " ".join(experiment['params']),
+                                       result, connection_counts[experiment['index']], results_flows,
+                                       experiment['seed'])
+                for experiment, result in reported]
+        results_table.write_results(rows, results)
+
+    failures.sort(key=lambda failure: failure['index'])
+    print(len(failures), "failed runs" + (f", see {failure_report}" if failures and failure_report else ""))
+    if failure_report is not None:
+        with open(failure_report, 'w') as f:
+            json.dump(failures, f, indent=1)
+
+    return reported
+
+
+def make_arg_parser(description, default_plan, default_jobs=None):
+    """
+    Returns the command line parser shared by the plan runners.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('plan', nargs='?', default=default_plan, help='Experiment plan to run.')
+    parser.add_argument('-debug', '--debug', action='store_true', help='Print command lines and per-run details.')
+    parser.add_argument('-dryrun', '--dryrun', action='store_true', help='Parse the plan without running anything.')
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs,
+                        help='Number of simulator runs in flight at once (default: cores / cores-per-run).')
+    parser.add_argument('--cores-per-run', type=int, default=1,
+                        help='Cores reserved for each simulator run when sizing the pool.')
+    parser.add_argument('--progress', action='store_true', default=sys.stderr.isatty(),
+                        help='Show a live count of finished flows on stderr (default when stderr is a terminal).')
+    parser.add_argument('--cache-dir', default=result_cache.DEFAULT_CACHE_DIR,
+                        help='Directory of the result cache.')
+    parser.add_argument('--cache-size', type=int, default=result_cache.DEFAULT_CACHE_SIZE_MB,
+                        help='Size limit of the result cache in MB; least recently used entries are evicted.')
+    parser.add_argument('--no-cache', action='store_true', help='Neither read nor write the result cache.')
+    parser.add_argument('--force', action='store_true', help='Rerun every experiment and refresh its cache entry.')
+    parser.add_argument('--invalidate', action='store_true', help='Drop the whole result cache before running.')
+    parser.add_argument('--schedule', choices=['lpt', 'spt', 'plan'], default='lpt',
+                        help='Order runs are started in: longest predicted first, shortest predicted first, '
+                             'or plan order. Reports are always printed in plan order.')
+    parser.add_argument('--history', default=run_history.DEFAULT_HISTORY_FILE,
+                        help='Run history the runtimes are predicted from.')
+    parser.add_argument('--no-history', action='store_true', help='Neither read nor record the run history.')
+    parser.add_argument('--memory-budget', type=int, default=None,
+                        help='Memory in MB the runs in flight may use together '
+                             '(default: 90%% of the memory available at start, 0 for no limit).')
+    parser.add_argument('--journal', default=None,
+                        help='Journal of completed runs (default: the plan file name with .journal appended).')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip the runs the journal has as completed and rerun the missing or failed ones.')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Wallclock seconds after which a run is killed (default: derived from its predicted runtime).')
+    parser.add_argument('--cpu-timeout', type=float, default=None,
+                        help='CPU seconds after which a run is killed (default: derived from its predicted runtime).')
+    parser.add_argument('--timeout-factor', type=float, default=DEFAULT_TIMEOUT_FACTOR,
+                        help='Multiple of the predicted runtime the default timeouts allow.')
+    parser.add_argument('--retries', type=int, default=1,
+                        help='Number of times a run killed from outside (e.g. by the OOM killer) is retried.')
+    parser.add_argument('--failure-report', default=None,
+                        help='JSON report of the failed runs (default: the plan file name with .failures.json appended).')
+    parser.add_argument('--results', default=None,
+                        help='Result file with one row per experiment, Parquet if it ends in .parquet '
+                             '(default: the plan file name with .results.json appended).')
+    parser.add_argument('--results-flows', action='store_true', help='Add the per-flow FCTs to the result file.')
+    parser.add_argument('--seeds', type=int, default=None,
+                        help='Run every experiment with seeds 1..N, for a statistical comparison of the results.')
+    return parser
+
+
+def make_cache(args):
+    """
+    Returns the result cache selected on the command line, or None if caching is disabled.
+    """
+    if args.no_cache:
+        return None
+    cache = result_cache.ResultCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    if args.invalidate:
+        cache.invalidate()
+    return cache
+
+
+def make_history(args):
+    """
+    Returns the run history selected on the command line, or None if it is disabled.
+    """
+    if args.no_history:
+        return None
+    return run_history.RunHistory(args.history)
+
+
+def memory_budget(args):
+    """
+    Returns the memory budget in bytes selected on the command line, or None for no limit.
+    """
+    if args.memory_budget is not None:
+        return args.memory_budget * 1024 * 1024 if args.memory_budget > 0 else None
+    available = available_memory()
+    return int(available * 0.9) if available is not None else None
+
+
+def make_journal(args):
+    """
+    Returns the run journal of the plan selected on the command line, or None for a dry run.
+    """
+    if args.dryrun:
+        return None
+    return run_journal.RunJournal(args.journal or args.plan + ".journal", args.resume)
+
+
+def plan_options(args):
+    """
+    Returns the run_plan keyword arguments selected on the command line.
+    """
+    return {
+        'jobs': args.jobs,
+        'cores_per_run': args.cores_per_run,
+        'debug': args.debug,
+        'dryrun': args.dryrun,
+        'cache': make_cache(args),
+        'force': args.force,
+        'show_progress': args.progress,
+        'history': make_history(args),
+        'schedule': args.schedule,
+        'memory_budget': memory_budget(args),
+        'journal': make_journal(args),
+        'timeout': args.timeout,
+        'cpu_timeout': args.cpu_timeout,
+        'timeout_factor': args.timeout_factor,
+        'retries': args.retries,
+        'failure_report': None if args.dryrun else args.failure_report or args.plan + ".failures.json",
+        'results': None if args.dryrun else args.results or args.plan + ".results.json",
+        'results_flows': args.results_flows,
+        'seeds': args.seeds,
+    }
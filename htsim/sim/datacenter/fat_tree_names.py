@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Resolution of the names of the logged objects of a fat tree.
+#
+# FatTreeTopology names its switches Switch_LowerPod_N, Switch_UpperPod_N and
+# Switch_Core_N, and the queues and pipes of its links after the two ends of
+# the link, e.g. LS3->US1(0) for the queue of bundle link 0 from ToR 3 up to
+# aggregation switch 1 and Pipe-LS3->US1(0) for its pipe (see
+# FatTreeTopology::init_network). A NameTable parses the names of a log
+# (idmap.txt and the log preamble) once into arrays by object id: the kind of
+# object, its tier and index, the tier and index of the other end of its link
+# (its port) and, given the pod layout of the topology (see cmgen.topo), its
+# pod. Records are then selected by tier, pod or name pattern with one lookup
+# per record instead of string matching on their names.
+#
+# A link belongs to the device that sends on it, and to the pod of that
+# device; the down links of a core switch belong to the pod they lead into.
+
+import re
+
+import numpy as np
+
+KINDS = ['other', 'switch', 'queue', 'pipe']
+TIERS = ['host', 'lower', 'upper', 'core']
+TIER_INDEX = {tier: index for index, tier in enumerate(TIERS)}
+
+SWITCH_TIERS = {'LowerPod': 'lower', 'UpperPod': 'upper', 'Core': 'core'}
+PORT_TIERS = {'SRC': 'host', 'DST': 'host', 'LS': 'lower', 'LS_': 'lower', 'US': 'upper', 'CS': 'core'}
+SWITCH_NAME = re.compile(r'^Switch_(LowerPod|UpperPod|Core)_(\d+)$')
+LINK_NAME = re.compile(r'^(Pipe-)?(SRC|LS|US|CS)(\d+)->(DST|LS_?|US|CS)(\d+)\((\d+)\)$')
+
+
+class NameTable:
+    def __init__(self, names, layout=None):
+        """
+        Parses names, a dict of object names by id (e.g. HtsimLog.names), with the
+        pod layout of the topology (see cmgen.topo.pod_layout) to place objects in pods.
+        """
+        self.names = names
+        self.ids = np.array(sorted(names), dtype=np.int64)
+        count = len(self.ids)
+        self.kind = np.zeros(count, dtype=np.int8)
+        self.tier = np.full(count, -1, dtype=np.int8)
+        self.index = np.full(count, -1, dtype=np.int64)
+        self.peer_tier = np.full(count, -1, dtype=np.int8)
+        self.peer = np.full(count, -1, dtype=np.int64)
+        self.bundle = np.full(count, -1, dtype=np.int64)
+
+        for row, id in enumerate(self.ids.tolist()):
+            name = names[id]
+            match = SWITCH_NAME.match(name)
+            if match:
+                self.kind[row] = KINDS.index('switch')
+                self.tier[row] = TIER_INDEX[SWITCH_TIERS[match.group(1)]]
+                self.index[row] = int(match.group(2))
+                continue
+            match = LINK_NAME.match(name)
+            if match:
+                self.kind[row] = KINDS.index('pipe' if match.group(1) else 'queue')
+                self.tier[row] = TIER_INDEX[PORT_TIERS[match.group(2)]]
+                self.index[row] = int(match.group(3))
+                self.peer_tier[row] = TIER_INDEX[PORT_TIERS[match.group(4)]]
+                self.peer[row] = int(match.group(5))
+                self.bundle[row] = int(match.group(6))
+
+        self.pod = np.full(count, -1, dtype=np.int64)
+        if layout is not None:
+            self.pod = np.where(self.tier == TIER_INDEX['core'],
+                                self._pod_of(self.peer_tier, self.peer, layout),
+                                self._pod_of(self.tier, self.index, layout))
+
+        # Row of every id, for looking up the ids of records
+        self._rows = np.full(int(self.ids.max()) + 1 if count else 0, -1, dtype=np.int64)
+        self._rows[self.ids] = np.arange(count)
+
+    @staticmethod
+    def _pod_of(tier, index, layout):
+        if layout['tiers'] == 2:
+            return np.where(tier >= 0, 0, -1)
+        per_pod = np.select([tier == TIER_INDEX['host'], tier == TIER_INDEX['lower'], tier == TIER_INDEX['upper']],
+                            [layout['hosts_per_pod'], layout['tors_per_pod'], layout['aggs_per_pod']], 0)
+        return np.where(per_pod > 0, index // np.maximum(per_pod, 1), -1)
+
+    def rows(self, ids):
+        """
+        Returns the rows of the given object ids in the table, -1 for unknown ids.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(self._rows))
+        return np.where(known, self._rows[np.where(known, ids, 0)] if len(self._rows) else -1, -1)
+
+    def row_mask(self, tier=None, pod=None, kind=None, pattern=None, peer_tier=None):
+        """
+        Returns the mask of the rows of the table of the given tiers, pods and kinds
+        (each a value or a list of values), linked to the given peer tiers and whose
+        name matches the regular expression pattern.
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        if tier is not None:
+            mask &= np.isin(self.tier, [TIER_INDEX[t] for t in _as_list(tier)])
+        if peer_tier is not None:
+            mask &= np.isin(self.peer_tier, [TIER_INDEX[t] for t in _as_list(peer_tier)])
+        if pod is not None:
+            mask &= np.isin(self.pod, _as_list(pod))
+        if kind is not None:
+            mask &= np.isin(self.kind, [KINDS.index(k) for k in _as_list(kind)])
+        if pattern is not None:
+            regex = re.compile(pattern)
+            mask &= np.array([bool(regex.search(self.names[id])) for id in self.ids.tolist()], dtype=bool)
+        return mask
+
+    def select_ids(self, **selection):
+        """
+        Returns the ids of the objects selected as with row_mask.
+        """
+        return self.ids[self.row_mask(**selection)]
+
+    def mask(self, ids, **selection):
+        """
+        Returns the mask of the records with the given ids (e.g. a log's id column)
+        whose objects are selected as with row_mask.
+        """
+        rows = self.rows(ids)
+        selected = np.append(self.row_mask(**selection), False)
+        return selected[rows]
+
+    def tier_names(self, ids):
+        """
+        Returns the tier names of the objects with the given ids, "" where unknown.
+        """
+        tiers = np.append(self.tier, -1)[self.rows(ids)]
+        return np.array(TIERS + [""])[tiers]
+
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple, set, np.ndarray)) else [value]
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# Reader of the binary logs (logout.dat) written by the simulator's Logfile.
+#
+# A finished log starts with a text preamble (": name=id" lines naming the
+# logged objects, "# numrecords=N", "# transpose=0|1" and "# TRACE"),
+# followed by N records of double time, u32 type, u32 id, u32 ev and double
+# val1, val2, val3. With transpose=0 the records are stored one after the other,
+# with transpose=1 as seven columns of N values each. The records are mapped
+# into memory as NumPy arrays rather than read, so selecting the events of a
+# few objects from a multi-GB log only touches the pages it needs.
+#
+# The ev field of a finished log is offset by 100 times the record type (see
+# Logfile::transposeLog); the "event" column undoes that, like parse_output does.
+#
+# Run as a script, the selected records are printed in the format of
+# "parse_output -ascii" for the shell scripts that grep it, selected by type,
+# time and object (by name, or by fat tree tier and pod, see fat_tree_names and cmgen.topo).
+
+import argparse
+import os
+import re
+import sys
+
+import numpy as np
+
+import fat_tree_names
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "connection_matrices"))
+from cmgen.topo import pod_layout, read_topo
+
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('type', '<u4'),
+    ('id', '<u4'),
+    ('ev', '<u4'),
+    ('val1', '<f8'),
+    ('val2', '<f8'),
+    ('val3', '<f8'),
+])
+COLUMNS = RECORD_DTYPE.names
+
+# Logger::EventType (loggertypes.h)
+EVENT_TYPES = {
+    'QUEUE_EVENT': 0, 'TCP_EVENT': 1, 'TCP_STATE': 2, 'TRAFFIC_EVENT': 3,
+    'QUEUE_RECORD': 4, 'QUEUE_APPROX': 5, 'TCP_RECORD': 6,
+    'QCN_EVENT': 7, 'QCNQUEUE_EVENT': 8, 'TCP_TRAFFIC': 9, 'NDP_TRAFFIC': 10,
+    'TCP_SINK': 11, 'MTCP': 12, 'ENERGY': 13, 'TCP_MEMORY': 14,
+    'NDP_EVENT': 15, 'NDP_STATE': 16, 'NDP_RECORD': 17, 'NDP_SINK': 18, 'NDP_MEMORY': 19,
+    'SWIFT_EVENT': 20, 'SWIFT_STATE': 21, 'SWIFT_TRAFFIC': 22, 'SWIFT_SINK': 23, 'SWIFT_MEMORY': 24,
+    'ROCE_TRAFFIC': 25, 'ROCE_SINK': 26, 'HPCC_TRAFFIC': 27, 'HPCC_SINK': 28,
+    'STRACK_EVENT': 29, 'STRACK_STATE': 30, 'STRACK_TRAFFIC': 31, 'STRACK_SINK': 32, 'STRACK_MEMORY': 33,
+    'DCQCN_TRAFFIC': 34, 'DCQCN_SINK': 35,
+    'EQDS_EVENT': 38, 'EQDS_STATE': 39, 'EQDS_RECORD': 40, 'EQDS_SINK': 41, 'EQDS_MEMORY': 42, 'EQDS_TRAFFIC': 43,
+    'UEC_EVENT': 44, 'UEC_STATE': 45, 'UEC_RECORD': 46, 'UEC_SINK': 47, 'UEC_MEMORY': 48, 'UEC_TRAFFIC': 49,
+    'FLOW_EVENT': 50, 'NIC_EVENT': 51,
+}
+TYPE_NAMES = {value: name for name, value in EVENT_TYPES.items()}
+
+# The events of the record types used by the analysis scripts.
+QUEUE_EVENTS = {'ENQUEUE': 0, 'DROP': 1, 'SERVICE': 2, 'TRIM': 3, 'BOUNCE': 4, 'UNQUEUE': 5, 'ARRIVE': 6}
+QUEUE_RECORD_EVENTS = {'CUM_TRAFFIC': 0}
+QUEUE_APPROX_EVENTS = {'RANGE': 0, 'OVERFLOW': 1}
+TRAFFIC_EVENTS = {'ARRIVE': 0, 'DEPART': 1, 'CREATESEND': 2, 'DROP': 3, 'RCVDESTROY': 4, 'CREATE': 5,
+                  'SEND': 6, 'TRIM': 7, 'BOUNCE': 8}
+FLOW_EVENTS = {'START': 0, 'FINISH': 1}
+
+
+def read_preamble(f):
+    """
+    Reads the preamble of a log from the binary file f, leaving f at the first record.
+    Returns a dict with the names of the logged objects by id, the number of
+    records, whether they are transposed and the offset of the first record.
+    """
+    names = {}
+    numrecords = 0
+    transpose = 1
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError(f"{f.name} ended while reading the preamble (is the simulation still running?)")
+        text = line.decode('utf-8', errors='replace').rstrip("\n")
+        if text.startswith("# TRACE"):
+            break
+        if text.startswith("# numrecords="):
+            numrecords = int(text[len("# numrecords="):])
+        elif text.startswith("# transpose="):
+            transpose = int(text[len("# transpose="):])
+        elif text.startswith(": "):
+            name, _, id = text[2:].partition("=")
+            names[int(id)] = name
+    return {'names': names, 'numrecords': numrecords, 'transpose': bool(transpose), 'offset': f.tell()}
+
+
+def read_idmap(path):
+    """
+    Reads an idmap.txt ("id name" lines) into a dict of names by id.
+    """
+    names = {}
+    with open(path, 'r') as f:
+        for line in f:
+            id, _, name = line.strip().partition(" ")
+            if name:
+                names[int(id)] = name
+    return names
+
+
+def map_records(path, offset, count):
+    """
+    Maps count records stored one after the other from offset of path.
+    """
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=offset, shape=(count,))
+
+
+class HtsimLog:
+    def __init__(self, path, idmap=None):
+        """
+        Opens the log at path, and the idmap.txt at idmap if given for the names
+        of the objects missing from the preamble.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            preamble = read_preamble(f)
+        self.names = read_idmap(idmap) if idmap else {}
+        self.names.update(preamble['names'])
+        self.transposed = preamble['transpose']
+        offset = preamble['offset']
+        available = (os.path.getsize(path) - offset) // RECORD_DTYPE.itemsize
+
+        if self.transposed:
+            # Every column holds numrecords values, so a short file cannot be mapped column by column.
+            self.numrecords = preamble['numrecords']
+            if available < self.numrecords:
+                raise ValueError(f"{path} holds {available} of {self.numrecords} transposed records")
+            self.records = None
+            self._columns = {}
+            for name in COLUMNS:
+                dtype = RECORD_DTYPE.fields[name][0]
+                if self.numrecords:
+                    self._columns[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset,
+                                                    shape=(self.numrecords,))
+                else:
+                    self._columns[name] = np.zeros(0, dtype=dtype)
+                offset += dtype.itemsize * self.numrecords
+        else:
+            self.numrecords = min(preamble['numrecords'], available)
+            self.records = map_records(path, offset, self.numrecords)
+            self._columns = {name: self.records[name] for name in COLUMNS}
+
+    def __len__(self):
+        return self.numrecords
+
+    def __getitem__(self, column):
+        """
+        Returns a column of the log, or "event" for ev without the 100 * type offset.
+        """
+        if column == 'event':
+            return self._columns['ev'].astype(np.int64) - 100 * self._columns['type'].astype(np.int64)
+        return self._columns[column]
+
+    def select(self, types=None, ids=None, start=None, end=None):
+        """
+        Returns the mask of the records of the given types (names or numbers) and
+        object ids whose time in seconds is in [start, end).
+        """
+        mask = np.ones(self.numrecords, dtype=bool)
+        if types is not None:
+            codes = [EVENT_TYPES[t] if isinstance(t, str) else t for t in types]
+            mask &= np.isin(self['type'], codes)
+        if ids is not None:
+            mask &= np.isin(self['id'], list(ids))
+        if start is not None:
+            mask &= self['time'] >= start
+        if end is not None:
+            mask &= self['time'] < end
+        return mask
+
+    def table(self, mask=None):
+        """
+        Returns the records (all, or those selected by mask) as a structured array in memory.
+        """
+        if self.records is not None:
+            return np.array(self.records if mask is None else self.records[mask])
+        rows = self.numrecords if mask is None else int(np.count_nonzero(mask))
+        table = np.empty(rows, dtype=RECORD_DTYPE)
+        for name in COLUMNS:
+            table[name] = self._columns[name] if mask is None else self._columns[name][mask]
+        return table
+
+    def ids(self, pattern):
+        """
+        Returns the ids of the objects whose name matches the regular expression pattern.
+        """
+        regex = re.compile(pattern)
+        return sorted(id for id, name in self.names.items() if regex.search(name))
+
+
+def format_record(record, name=""):
+    """
+    Formats one record like parse_output -ascii does for the queue records,
+    and like RawLogEvent::str for the others.
+    """
+    type = int(record['type'])
+    event = int(record['ev']) - 100 * type
+    time = record['time']
+    suffix = f" Name {name}" if name else ""
+    if type == EVENT_TYPES['QUEUE_APPROX'] and event == QUEUE_APPROX_EVENTS['RANGE']:
+        return (f"{time:.9f} Type QUEUE_APPROX ID {record['id']} Ev RANGE LastQ {int(record['val1'])}"
+                f" MinQ {int(record['val2'])} MaxQ {int(record['val3'])}{suffix}")
+    if type == EVENT_TYPES['QUEUE_APPROX'] and event == QUEUE_APPROX_EVENTS['OVERFLOW']:
+        return (f"{time:.9f} Type QUEUE_APPROX ID {record['id']} Ev OVERLOW LastIdled {int(record['val1'])}"
+                f" LastDropped {int(record['val2'])} QueueBuf {int(record['val3'])}{suffix}")
+    if type == EVENT_TYPES['QUEUE_RECORD']:
+        return (f"{time:.9f} Type QUEUE_APPROX ID {record['id']} Ev CUM_TRAFFIC CumArr {int(record['val1'])}"
+                f" CumIdle {int(record['val2'])} CumDrop {int(record['val3'])}{suffix}")
+    return (f"{time:.6f} Type={type} ID={record['id']} EV={event} VAL1={record['val1']:.6f}"
+            f" VAL2={record['val2']:.6f} VAL3={record['val3']:.6f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the records of an htsim binary log as text.')
+    parser.add_argument('logfile', help='The binary log (logout.dat).')
+    parser.add_argument('-idmap', default=None, help='The idmap.txt of the run.')
+    parser.add_argument('-type', action='append', default=None,
+                        help='Only print records of this type (name or number, repeatable).')
+    parser.add_argument('-name', default=None, help='Only print records of objects whose name matches this regex.')
+    parser.add_argument('-tier', action='append', choices=fat_tree_names.TIERS, default=None,
+                        help='Only print records of the switches and links of this fat tree tier (repeatable).')
+    parser.add_argument('-pod', action='append', type=int, default=None,
+                        help='Only print records of the switches and links of this pod (repeatable, needs -topo).')
+    parser.add_argument('-kind', action='append', choices=fat_tree_names.KINDS[1:], default=None,
+                        help='Only print records of switches, queues or pipes (repeatable).')
+    parser.add_argument('-topo', default=None, help='The .topo file of the run, for -pod.')
+    parser.add_argument('-start', type=float, default=None, help='Only print records from this time (s).')
+    parser.add_argument('-end', type=float, default=None, help='Only print records before this time (s).')
+    args = parser.parse_args()
+
+    log = HtsimLog(args.logfile, args.idmap)
+    types = None
+    if args.type:
+        types = [int(t) if t.isdigit() else t for t in args.type]
+    mask = log.select(types, None, args.start, args.end)
+    if args.name or args.tier or args.kind or args.pod is not None:
+        if args.pod is not None and not args.topo:
+            parser.error("-pod needs -topo")
+        layout = pod_layout(read_topo(args.topo)) if args.topo else None
+        names = fat_tree_names.NameTable(log.names, layout)
+        mask &= names.mask(log['id'], tier=args.tier, pod=args.pod, kind=args.kind, pattern=args.name)
+    table = log.table(mask)
+    out = sys.stdout
+    for record in table:
+        out.write(format_record(record, log.names.get(int(record['id']), "")) + "\n")
+
+
+if __name__ == "__main__":
+    main()
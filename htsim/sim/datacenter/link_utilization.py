@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# Link utilization over time from an htsim binary log.
+#
+# Every packet leaving a queue is logged as a TRAFFIC_EVENT DEPART of that
+# queue when the run logs traffic (-log traffic), or as a QUEUE_EVENT SERVICE
+# with a simple queue logger. As every queue feeds one link, summing the bytes
+# of these records per queue id and time bin gives the bytes carried by each
+# link in each bin, for every tier of the fat tree, in one histogram over the
+# record arrays (see htsim_log). Links are placed in tiers by the names of
+# their queues (see fat_tree_names).
+#
+# Traffic events carry the packet size in val3. Queue events and traffic
+# events of logs written before that carry no size, and count as packet_size
+# bytes (the -mtu of the run).
+
+import argparse
+import math
+import sys
+
+import numpy as np
+
+import fat_tree_names
+import htsim_log
+
+DEFAULT_PACKET_SIZE = 4150
+DEFAULT_LINKSPEED_MBPS = 100000
+
+# Sending and receiving tier of the links of each tier of the fat tree
+LINK_TIERS = {
+    'host_up': ('host', 'lower'),
+    'tor_down': ('lower', 'host'),
+    'tor_up': ('lower', 'upper'),
+    'agg_down': ('upper', 'lower'),
+    'agg_up': ('upper', 'core'),
+    'core_down': ('core', 'upper'),
+}
+
+
+def departure_mask(log, source='auto'):
+    """
+    Returns the mask of the records counted as packets leaving a queue and the
+    source they were taken from: 'traffic' (TRAFFIC_EVENT DEPART) or 'queue'
+    (QUEUE_EVENT SERVICE). With 'auto' traffic events are used if there are any.
+    """
+    types = log['type']
+    events = log['event']
+    masks = {
+        'traffic': (types == htsim_log.EVENT_TYPES['TRAFFIC_EVENT']) & (events == htsim_log.TRAFFIC_EVENTS['DEPART']),
+        'queue': (types == htsim_log.EVENT_TYPES['QUEUE_EVENT']) & (events == htsim_log.QUEUE_EVENTS['SERVICE']),
+    }
+    if source == 'auto':
+        # Both loggers see the same packets leave, so only one of them may be counted.
+        source = 'traffic' if masks['traffic'].any() else 'queue'
+    return masks[source], source
+
+
+def link_bytes(log, bin_width, ids=None, start=None, end=None, source='auto', packet_size=DEFAULT_PACKET_SIZE):
+    """
+    Returns the bytes sent on each link in each time bin of bin_width seconds,
+    counting from start (or 0) up to end (or the last departure), as a dict of
+    the link ids, the bin edges, the links x bins byte matrix and the source of the counts.
+    Only the given link (queue) ids are counted if ids is given, each with a row, of
+    zeros for a link that sent nothing, so that idle links count in the imbalance.
+    """
+    mask, source = departure_mask(log, source)
+    if ids is not None:
+        mask &= np.isin(log['id'], list(ids))
+    if start is not None:
+        mask &= log['time'] >= start
+    if end is not None:
+        mask &= log['time'] < end
+
+    time = np.asarray(log['time'][mask])
+    if source == 'traffic':
+        size = np.asarray(log['val3'][mask], dtype=np.float64)
+        size[size == 0] = packet_size
+    else:
+        size = np.full(len(time), float(packet_size))
+
+    if ids is not None:
+        link_ids = np.unique(np.asarray(list(ids), dtype=np.int64))
+        link = np.searchsorted(link_ids, np.asarray(log['id'][mask]))
+    else:
+        link_ids, link = np.unique(np.asarray(log['id'][mask]), return_inverse=True)
+    origin = start if start is not None else 0.0
+    if end is None:
+        end = float(time.max()) if len(time) else origin
+    bins = max(1, int(math.ceil((end - origin) / bin_width)))
+    column = np.minimum(((time - origin) / bin_width).astype(np.int64), bins - 1)
+    matrix = np.bincount(link * bins + column, weights=size, minlength=len(link_ids) * bins)
+
+    return {
+        'ids': link_ids,
+        'edges': origin + bin_width * np.arange(bins + 1),
+        'bytes': matrix.reshape(len(link_ids), bins),
+        'source': source,
+    }
+
+
+def link_ids(names, tiers=None):
+    """
+    Returns the ids of the queues of the links of the given tiers (all if None)
+    in a fat_tree_names.NameTable.
+    """
+    mask = np.zeros(len(names.ids), dtype=bool)
+    for tier in tiers or LINK_TIERS:
+        sender, receiver = LINK_TIERS[tier]
+        mask |= names.row_mask(kind='queue', tier=sender, peer_tier=receiver)
+    return names.ids[mask]
+
+
+def link_tiers(names, ids):
+    """
+    Returns the link tier of the queues with the given ids, "" for other objects.
+    """
+    rows = names.rows(ids)
+    queue = np.append(names.kind == fat_tree_names.KINDS.index('queue'), False)[rows]
+    sender = np.append(names.tier, -1)[rows]
+    receiver = np.append(names.peer_tier, -1)[rows]
+    tiers = np.full(len(rows), "", dtype=object)
+    for tier, (a, b) in LINK_TIERS.items():
+        tiers[queue & (sender == fat_tree_names.TIER_INDEX[a]) & (receiver == fat_tree_names.TIER_INDEX[b])] = tier
+    return tiers
+
+
+def utilization(matrix, edges, linkspeed_mbps=DEFAULT_LINKSPEED_MBPS):
+    """
+    Returns the fraction of the capacity of each link used in each bin.
+    """
+    capacity = linkspeed_mbps * 1e6 / 8 * np.diff(edges)
+    return matrix / capacity
+
+
+def imbalance(matrix):
+    """
+    Returns the imbalance between the links (rows) of a bytes matrix: per bin the
+    coefficient of variation and the max over mean of the bytes of the links,
+    and over the whole run the same of their total bytes.
+    """
+    if len(matrix) == 0:
+        return None
+    mean = matrix.mean(axis=0)
+    busy = mean > 0
+    safe_mean = np.where(busy, mean, 1)
+    totals = matrix.sum(axis=1)
+    total_mean = totals.mean()
+    return {
+        'links': len(matrix),
+        'bin_cv': np.where(busy, matrix.std(axis=0) / safe_mean, 0.0),
+        'bin_max_over_mean': np.where(busy, matrix.max(axis=0) / safe_mean, 0.0),
+        'total_bytes': float(totals.sum()),
+        'total_cv': float(totals.std() / total_mean) if total_mean else 0.0,
+        'total_max_over_mean': float(totals.max() / total_mean) if total_mean else 0.0,
+    }
+
+
+def tier_rows(names, ids):
+    """
+    Returns the rows of the links of each tier, in LINK_TIERS order, for the links with the given ids.
+    """
+    tiers = link_tiers(names, ids)
+    return {tier: np.flatnonzero(tiers == tier) for tier in LINK_TIERS if (tiers == tier).any()}
+
+
+def write_csv(path, names, result, util):
+    with open(path, 'w') as f:
+        f.write("link,tier,bin_start,bytes,utilization\n")
+        starts = result['edges'][:-1]
+        tiers = link_tiers(names, result['ids'])
+        for row, id in enumerate(result['ids']):
+            prefix = f"{names.names.get(int(id), str(id))},{tiers[row]},"
+            f.write("".join(f"{prefix}{start:.9f},{count:.0f},{fraction:.6f}\n"
+                            for start, count, fraction in zip(starts.tolist(), result['bytes'][row].tolist(),
+                                                              util[row].tolist())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-link bytes and utilization over time from an htsim binary log.')
+    parser.add_argument('logfile', help='The binary log (logout.dat) of a run with -log traffic.')
+    parser.add_argument('-idmap', default=None, help='The idmap.txt of the run.')
+    parser.add_argument('-bin_us', type=float, default=10.0, help='Width of the time bins in us (default 10).')
+    parser.add_argument('-start', type=float, default=None, help='Only count departures from this time (s).')
+    parser.add_argument('-end', type=float, default=None, help='Only count departures before this time (s).')
+    parser.add_argument('-tier', action='append', choices=sorted(LINK_TIERS), default=None,
+                        help='Only count the links of this tier (repeatable, default all).')
+    parser.add_argument('-source', choices=['auto', 'traffic', 'queue'], default='auto',
+                        help='Records counted as departures (default: traffic events if logged).')
+    parser.add_argument('-mtu', type=int, default=DEFAULT_PACKET_SIZE,
+                        help=f'Bytes of a packet whose record has no size (default {DEFAULT_PACKET_SIZE}).')
+    parser.add_argument('-linkspeed', type=float, default=DEFAULT_LINKSPEED_MBPS,
+                        help=f'Link speed in Mbps (default {DEFAULT_LINKSPEED_MBPS}).')
+    parser.add_argument('-o', dest='output', default=None, help='Write the per-link, per-bin counts to this CSV.')
+    args = parser.parse_args()
+
+    log = htsim_log.HtsimLog(args.logfile, args.idmap)
+    names = fat_tree_names.NameTable(log.names)
+    tiers = args.tier or list(LINK_TIERS)
+    ids = link_ids(names, tiers)
+    result = link_bytes(log, args.bin_us * 1e-6, ids, args.start, args.end, args.source, args.mtu)
+    if not result['bytes'].any():
+        sys.exit(f"No departures of {', '.join(tiers)} links in {args.logfile} (was the run logged with -log traffic?)")
+    util = utilization(result['bytes'], result['edges'], args.linkspeed)
+
+    print(f"{len(result['ids'])} links, {len(result['edges']) - 1} bins of {args.bin_us:g} us, "
+          f"from {result['source']} events")
+    print(f"{'tier':<10} {'links':>5} {'GB':>10} {'mean util':>9} {'total CV':>8} {'max/mean':>8}"
+          f" {'bin CV p50':>10} {'bin CV p99':>10}")
+    for tier, rows in tier_rows(names, result['ids']).items():
+        stats = imbalance(result['bytes'][rows])
+        busy = stats['bin_cv'][result['bytes'][rows].sum(axis=0) > 0]
+        cv50, cv99 = np.percentile(busy, [50, 99]) if len(busy) else (0.0, 0.0)
+        print(f"{tier:<10} {stats['links']:>5} {stats['total_bytes'] / 1e9:>10.3f} {util[rows].mean():>9.3f}"
+              f" {stats['total_cv']:>8.3f} {stats['total_max_over_mean']:>8.3f} {cv50:>10.3f} {cv99:>10.3f}")
+
+    if args.output:
+        write_csv(args.output, names, result, util)
+        print(f"Per-link counts written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# Analysis of the binary log of a simulation while it is running.
+#
+# Until it exits, the simulator writes its records to the log one after the
+# other as they happen, without a preamble and with the raw ev field (see
+# Logfile::writeRecord); the preamble and the ev offset are only added when
+# the log is rewritten at exit. The records are read from a named pipe given
+# to the simulator as its log (-o), or by following the growing log file, and
+# fed chunk by chunk into rolling per-queue statistics (QUEUE_APPROX RANGE
+# records, -log switch) and flow completion counters (FLOW_EVENT records,
+# -log flow_events).
+#
+# Stop rules end a run as soon as it has answered the question: once every
+# flow has finished, or once the tail FCT exceeds a target. Run as a script, it
+# either starts the simulator itself on a named pipe (live_log.py [options] --
+# ./htsim_uec ...) or follows the log of a simulator started elsewhere
+# (-follow logout.dat -pid PID).
+
+import argparse
+import os
+import select
+import shutil
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import experiment_engine
+import htsim_log
+from quantile_sketch import QuantileSketch
+
+DEFAULT_POLL = 0.2
+READ_SIZE = 1 << 20
+
+
+def read_rewritten(path, skip, running=None, poll=DEFAULT_POLL):
+    """
+    Returns the records after the first skip ones of the log at path once the
+    simulator has finished rewriting it at exit, with the raw ev field, or
+    None if it stops before the rewritten log is complete.
+    """
+    while True:
+        try:
+            with open(path, 'rb') as f:
+                preamble = htsim_log.read_preamble(f)
+            complete = (not preamble['transpose'] and os.path.getsize(path) >=
+                        preamble['offset'] + preamble['numrecords'] * htsim_log.RECORD_DTYPE.itemsize)
+        except ValueError:
+            complete = False
+        if complete:
+            break
+        if running is not None and not running():
+            return None
+        time.sleep(poll)
+    records = np.array(htsim_log.map_records(path, preamble['offset'], preamble['numrecords'])[skip:])
+    records['ev'] -= 100 * records['type']
+    return records
+
+
+def read_stream(path, running=None, poll=DEFAULT_POLL):
+    """
+    Yields the records written to the log at path as arrays of RECORD_DTYPE,
+    in chunks as they arrive, until the writer is done. A named pipe is done when
+    its writer closes it, a log file when running() returns False with nothing
+    left to read, or once it is rewritten at exit; the records not read until
+    then are taken from the rewritten log. running() also tells whether to keep
+    waiting for a writer to open the pipe.
+    """
+    fifo = stat.S_ISFIFO(os.stat(path).st_mode)
+    fd = os.open(path, os.O_RDONLY | (os.O_NONBLOCK if fifo else 0))
+    pending = b""
+    head = None
+    connected = False
+    consumed = 0
+    try:
+        while True:
+            if fifo:
+                select.select([fd], [], [], poll)
+            try:
+                data = os.read(fd, READ_SIZE)
+            except BlockingIOError:
+                # The pipe has a writer but no data yet.
+                connected = True
+                continue
+
+            if not fifo and data:
+                # The first record identifies the log; once the simulator rewrites the log
+                # at exit, it is gone and whatever was just read belongs to the rewritten log.
+                if head is None:
+                    head = (pending + data)[:htsim_log.RECORD_DTYPE.itemsize]
+                    if head[:1] in (b":", b"#"):
+                        raise ValueError(f"{path} is a finished log, read it with htsim_log")
+                if os.pread(fd, len(head), 0) != head:
+                    break
+
+            if data:
+                connected = True
+                pending += data
+                whole = len(pending) // htsim_log.RECORD_DTYPE.itemsize * htsim_log.RECORD_DTYPE.itemsize
+                if whole:
+                    records = np.frombuffer(pending[:whole], dtype=htsim_log.RECORD_DTYPE)
+                    consumed += len(records)
+                    pending = pending[whole:]
+                    yield records
+                continue
+
+            # Nothing to read: a pipe whose writer closed it is done, otherwise wait for more.
+            if fifo and connected:
+                return
+            if not fifo and head is not None and os.pread(fd, len(head), 0) != head:
+                break
+            if running is not None and not running():
+                return
+            time.sleep(poll)
+    finally:
+        os.close(fd)
+
+    # Only a rewritten log ends the loop without returning.
+    rest = read_rewritten(path, consumed, running, poll)
+    if rest is not None and len(rest):
+        yield rest
+
+
+class LiveAnalysis:
+    """
+    Rolling statistics of the records of a running simulation, fed chunk by chunk.
+    """
+
+    def __init__(self, expected_flows=None):
+        self.expected_flows = expected_flows
+        self.records = 0
+        self.now = 0.0
+        # Queue statistics by object id, over the QUEUE_APPROX RANGE samples so far
+        self.queue_count = np.zeros(0, dtype=np.int64)
+        self.queue_sum = np.zeros(0)
+        self.queue_sumsq = np.zeros(0)
+        self.queue_max = np.zeros(0)
+        self.queue_last = np.zeros(0)
+        # Start times of the flows still running, by flow id
+        self.flow_start = {}
+        self.started = 0
+        self.finished = 0
+        self.fcts = QuantileSketch()
+
+    def _grow(self, size):
+        if size <= len(self.queue_count):
+            return
+        extra = size - len(self.queue_count)
+        self.queue_count = np.concatenate([self.queue_count, np.zeros(extra, dtype=np.int64)])
+        self.queue_sum = np.concatenate([self.queue_sum, np.zeros(extra)])
+        self.queue_sumsq = np.concatenate([self.queue_sumsq, np.zeros(extra)])
+        self.queue_max = np.concatenate([self.queue_max, np.zeros(extra)])
+        self.queue_last = np.concatenate([self.queue_last, np.zeros(extra)])
+
+    def feed(self, records):
+        """
+        Adds a chunk of raw records (ev without the 100 * type offset of a finished log).
+        """
+        if len(records) == 0:
+            return
+        self.records += len(records)
+        self.now = float(records['time'][-1])
+        types = records['type']
+        events = records['ev']
+
+        samples = records[(types == htsim_log.EVENT_TYPES['QUEUE_APPROX'])
+                          & (events == htsim_log.QUEUE_APPROX_EVENTS['RANGE'])]
+        if len(samples):
+            ids = samples['id'].astype(np.int64)
+            last_q = samples['val1']
+            size = int(ids.max()) + 1
+            self._grow(size)
+            self.queue_count[:size] += np.bincount(ids, minlength=size)
+            self.queue_sum[:size] += np.bincount(ids, weights=last_q, minlength=size)
+            self.queue_sumsq[:size] += np.bincount(ids, weights=last_q * last_q, minlength=size)
+            np.maximum.at(self.queue_max, ids, samples['val3'])
+            # Samples are in time order, so the last assignment of every id wins.
+            self.queue_last[ids] = last_q
+
+        flows = records[types == htsim_log.EVENT_TYPES['FLOW_EVENT']]
+        if len(flows):
+            starts = flows[flows['ev'] == htsim_log.FLOW_EVENTS['START']]
+            self.flow_start.update(zip(starts['val1'].astype(np.int64).tolist(), starts['time'].tolist()))
+            self.started += len(starts)
+            finishes = flows[flows['ev'] == htsim_log.FLOW_EVENTS['FINISH']]
+            fcts = [end - self.flow_start.pop(flow, end)
+                    for flow, end in zip(finishes['val1'].astype(np.int64).tolist(), finishes['time'].tolist())]
+            self.finished += len(fcts)
+            self.fcts.update(np.array(fcts) * 1e6)
+
+    def queue_stats(self):
+        """
+        Returns the statistics of the queue length of every object with samples,
+        as a dict of arrays: id, count, mean, stdev, max and last.
+        """
+        ids = np.flatnonzero(self.queue_count)
+        count = self.queue_count[ids]
+        mean = self.queue_sum[ids] / count
+        variance = np.where(count > 1, (self.queue_sumsq[ids] - count * mean * mean) / np.maximum(count - 1, 1), 0.0)
+        return {
+            'id': ids,
+            'count': count,
+            'mean': mean,
+            'stdev': np.sqrt(np.maximum(variance, 0.0)),
+            'max': self.queue_max[ids],
+            'last': self.queue_last[ids],
+        }
+
+    @property
+    def tail_fct(self):
+        """The largest FCT so far in us, counting the flows still running as finishing now."""
+        # Flows are added in the order they started, so the first one left is the oldest.
+        oldest = next(iter(self.flow_start.values()), self.now)
+        running = (self.now - oldest) * 1e6
+        return max(self.fcts.max if self.fcts.count else 0.0, running)
+
+    def stop_reason(self, all_finished=False, max_fct_us=None):
+        """
+        Returns why the run can stop now under the given rules, or None.
+        """
+        if all_finished and self.expected_flows and self.finished >= self.expected_flows:
+            return f"all {self.expected_flows} flows finished"
+        if max_fct_us is not None and self.tail_fct > max_fct_us:
+            return f"tail FCT {self.tail_fct:.1f} us exceeds {max_fct_us:g} us"
+        return None
+
+    def report(self):
+        line = f"t={self.now * 1e6:.1f} us records={self.records}"
+        if self.started or self.finished:
+            total = self.expected_flows or self.started
+            line += f" flows={self.finished}/{total} finished"
+            if self.fcts.count:
+                line += f" p99 FCT={self.fcts.quantile(0.99):.1f} us"
+            line += f" tail FCT={self.tail_fct:.1f} us"
+        if self.queue_count.any():
+            busiest = int(np.argmax(self.queue_max))
+            line += f" max queue={self.queue_max[busiest]:.0f} B (id {busiest})"
+        return line
+
+
+def print_queue_stats(analysis, names):
+    stats = analysis.queue_stats()
+    if len(stats['id']) == 0:
+        return
+    print(f"{'queue':<30} {'samples':>8} {'mean':>12} {'stdev':>12} {'max':>10} {'last':>10}")
+    for k in np.argsort([names.get(int(id), str(id)) for id in stats['id']]):
+        name = names.get(int(stats['id'][k]), str(stats['id'][k]))
+        print(f"{name:<30} {stats['count'][k]:>8} {stats['mean'][k]:>12.1f} {stats['stdev'][k]:>12.1f}"
+              f" {stats['max'][k]:>10.0f} {stats['last'][k]:>10.0f}")
+
+
+def command_matrix(command):
+    """
+    Returns the connection matrix given to a simulator command with -tm, or None.
+    """
+    if "-tm" in command[:-1]:
+        return command[command.index("-tm") + 1]
+    return None
+
+
+def analyse(path, analysis, running, stop, report_interval, all_finished=False, max_fct_us=None):
+    """
+    Feeds the records of the log at path into analysis until the log ends or a
+    stop rule fires, then calls stop(). Returns the reason of an early stop, or None.
+    """
+    last_report = time.monotonic()
+    for records in read_stream(path, running):
+        analysis.feed(records)
+        reason = analysis.stop_reason(all_finished, max_fct_us)
+        if reason is not None:
+            stop()
+            return reason
+        if report_interval and time.monotonic() - last_report >= report_interval:
+            print(analysis.report(), flush=True)
+            last_report = time.monotonic()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Analyse the log of a running simulation and stop it early.',
+        usage='%(prog)s [options] (-follow LOG [-pid PID] | -- SIMULATOR ARGS...)')
+    parser.add_argument('-follow', default=None, help='Follow this log of a simulator started elsewhere.')
+    parser.add_argument('-pid', type=int, default=None, help='Process id of that simulator (stopped with SIGTERM).')
+    parser.add_argument('-idmap', default=None, help='The idmap.txt of the topology, for queue names.')
+    parser.add_argument('-flows', type=int, default=None,
+                        help='Number of flows of the run (default: the connections of its -tm matrix).')
+    parser.add_argument('-stop_finished', action='store_true', help='Stop once every flow has finished.')
+    parser.add_argument('-max_fct_us', type=float, default=None,
+                        help='Stop once a flow has taken longer than this many us.')
+    parser.add_argument('-report', type=float, default=1.0, help='Seconds between progress lines (0 for none).')
+    parser.add_argument('-sim_output', default=None, help='Write the output of the simulator to this file.')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='Simulator command line, after --.')
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if bool(command) == bool(args.follow):
+        parser.error("give either -follow LOG or a simulator command after --")
+    expected = args.flows
+    matrix = command_matrix(command) if command else None
+    if expected is None and matrix:
+        expected = experiment_engine.matrix_stats(matrix)['connections']
+    if args.stop_finished and not expected:
+        parser.error("-stop_finished needs -flows or a simulator command with -tm")
+    analysis = LiveAnalysis(expected)
+    rules = {'all_finished': args.stop_finished, 'max_fct_us': args.max_fct_us}
+
+    if args.follow:
+        def running():
+            if args.pid is None:
+                return True
+            try:
+                os.kill(args.pid, 0)
+            except OSError:
+                return False
+            return True
+
+        def stop():
+            if args.pid is not None:
+                try:
+                    os.kill(args.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+        try:
+            reason = analyse(args.follow, analysis, running, stop, args.report, **rules)
+        except ValueError as e:
+            sys.exit(str(e))
+        returncode = 0
+    else:
+        directory = tempfile.mkdtemp(prefix="live_log")
+        fifo = os.path.join(directory, "logout.fifo")
+        os.mkfifo(fifo)
+        output = open(args.sim_output, 'w') if args.sim_output else None
+        try:
+            process = experiment_engine.start_process(command + ["-o", fifo], stdout=output,
+                                                      stderr=subprocess.STDOUT if output else None)
+            reason = analyse(fifo, analysis, lambda: process.poll() is None,
+                             lambda: experiment_engine.kill_group(process), args.report, **rules)
+            returncode = process.wait()
+        finally:
+            if output:
+                output.close()
+            shutil.rmtree(directory, ignore_errors=True)
+        if reason is not None:
+            returncode = 0
+
+    print(analysis.report())
+    names = htsim_log.read_idmap(args.idmap) if args.idmap else {}
+    print_queue_stats(analysis, names)
+    if reason is not None:
+        print(f"Stopped early: {reason}")
+    elif returncode:
+        print(f"Simulator exited with status {returncode}")
+    sys.exit(1 if returncode else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# Columnar store of an htsim binary log, indexed by object and time.
+#
+# Converting a log (see htsim_log) writes one directory per record type, each
+# holding the time, id, event and val1..val3 columns of that type as .npy
+# files. The records of a type are sorted by object id and then by time, and an
+# index of the first record of every id is stored next to them. A query for
+# some ids between two times then reads only the slice of each id and finds the
+# time window in it by binary search, on arrays mapped from disk. A log is
+# converted in chunks of records, so logs larger than memory can be converted.
+#
+# The store remembers the size and modification time of the log it was built
+# from and is rebuilt by open_store when the log changes.
+
+import argparse
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+import htsim_log
+
+STORE_VERSION = 1
+STORE_COLUMNS = ['time', 'id', 'event', 'val1', 'val2', 'val3']
+STORE_DTYPES = {'time': '<f8', 'id': '<u4', 'event': np.int32, 'val1': '<f8', 'val2': '<f8', 'val3': '<f8'}
+# Records read from the log at once while converting it
+CONVERT_CHUNK = 1 << 22
+
+
+def source_stamp(log_path):
+    stat = os.stat(log_path)
+    return {'path': os.path.abspath(log_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def record_keys(log, begin, end):
+    """
+    Returns one key per record of log[begin:end] that orders the records by type, then by id.
+    """
+    types = np.asarray(log['type'][begin:end]).astype(np.uint64)
+    ids = np.asarray(log['id'][begin:end]).astype(np.uint64)
+    return (types << np.uint64(32)) | ids
+
+
+def convert(log_path, store_dir, idmap=None, chunk=CONVERT_CHUNK):
+    """
+    Converts the log at log_path (and its idmap.txt, if given) into a store in store_dir.
+    The log is read twice, chunk records at a time: once to count the records of every
+    (type, id), which places every id in the columns of its type, and once to copy each
+    chunk, sorted by (type, id), to those places. The columns are written to files mapped
+    from disk, so the memory used depends on the chunk size and not on the log size.
+    """
+    log = htsim_log.HtsimLog(log_path, idmap)
+    tmp_dir = store_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    keys = []
+    counts = []
+    for begin in range(0, len(log), chunk):
+        chunk_keys, chunk_counts = np.unique(record_keys(log, begin, begin + chunk), return_counts=True)
+        keys.append(chunk_keys)
+        counts.append(chunk_counts)
+    keys, inverse = np.unique(np.concatenate(keys) if keys else np.zeros(0, dtype=np.uint64), return_inverse=True)
+    key_counts = np.zeros(len(keys), dtype=np.int64)
+    if counts:
+        np.add.at(key_counts, inverse, np.concatenate(counts))
+    key_types = (keys >> np.uint64(32)).astype(np.uint32)
+    key_ids = (keys & np.uint64(0xffffffff)).astype(np.uint32)
+
+    # cursor holds the next free place of every (type, id) in the columns of its type.
+    cursor = np.zeros(len(keys), dtype=np.int64)
+    columns = {}
+    partitions = {}
+    types, type_starts = np.unique(key_types, return_index=True)
+    for type, first, last in zip(types.tolist(), type_starts.tolist(), np.append(type_starts[1:], len(keys)).tolist()):
+        offsets = np.append(0, np.cumsum(key_counts[first:last]))
+        cursor[first:last] = offsets[:-1]
+        directory = os.path.join(tmp_dir, f"type_{type}")
+        os.makedirs(directory)
+        np.save(os.path.join(directory, "index_ids.npy"), key_ids[first:last])
+        np.save(os.path.join(directory, "index_offsets.npy"), offsets.astype(np.int64))
+        columns[type] = {column: np.lib.format.open_memmap(os.path.join(directory, column + ".npy"), mode='w+',
+                                                           dtype=STORE_DTYPES[column], shape=(int(offsets[-1]),))
+                         for column in STORE_COLUMNS}
+        partitions[type] = int(offsets[-1])
+
+    for begin in range(0, len(log), chunk):
+        chunk_keys = record_keys(log, begin, begin + chunk)
+        # Records are logged in time order, so a stable sort keeps every id in time order.
+        order = np.argsort(chunk_keys, kind='stable')
+        key_index = np.searchsorted(keys, chunk_keys[order])
+        first = np.flatnonzero(np.append(True, key_index[1:] != key_index[:-1]))
+        sizes = np.diff(np.append(first, len(order)))
+        places = cursor[key_index] + np.arange(len(order)) - np.repeat(first, sizes)
+        cursor[key_index[first]] += sizes
+
+        values = {column: np.asarray(log[column][begin:begin + chunk])
+                  for column in STORE_COLUMNS if column != 'event'}
+        values['event'] = (np.asarray(log['ev'][begin:begin + chunk]).astype(np.int64)
+                           - 100 * np.asarray(log['type'][begin:begin + chunk]).astype(np.int64)).astype(np.int32)
+        # The sorted chunk holds the records of every type in one run, made of the groups of its ids.
+        group_types = key_types[key_index[first]]
+        bounds = np.append(first, len(order))
+        for type in np.unique(group_types).tolist():
+            selected = slice(bounds[np.searchsorted(group_types, type)],
+                             bounds[np.searchsorted(group_types, type, side='right')])
+            for column in STORE_COLUMNS:
+                columns[type][column][places[selected]] = values[column][order[selected]]
+
+    for partition in columns.values():
+        for values in partition.values():
+            values.flush()
+    del columns
+
+    meta = {
+        'version': STORE_VERSION,
+        'source': source_stamp(log_path),
+        'numrecords': len(log),
+        'partitions': partitions,
+    }
+    with open(os.path.join(tmp_dir, "names.json"), 'w') as f:
+        json.dump({str(id): name for id, name in log.names.items()}, f)
+    with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.rename(tmp_dir, store_dir)
+
+
+def is_current(store_dir, log_path):
+    """
+    Returns True if store_dir holds a store of the log at log_path as it is now.
+    """
+    try:
+        with open(os.path.join(store_dir, "meta.json"), 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get('version') == STORE_VERSION and meta.get('source') == source_stamp(log_path)
+
+
+def open_store(log_path, idmap=None, store_dir=None):
+    """
+    Returns the store of the log at log_path, converting the log first if there is
+    no store for it yet or the log changed since. The store is kept in
+    <log_path>.store unless store_dir is given.
+    """
+    if store_dir is None:
+        store_dir = log_path + ".store"
+    if not is_current(store_dir, log_path):
+        convert(log_path, store_dir, idmap)
+    return LogStore(store_dir)
+
+
+class LogStore:
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json"), 'r') as f:
+            self.meta = json.load(f)
+        with open(os.path.join(store_dir, "names.json"), 'r') as f:
+            self.names = {int(id): name for id, name in json.load(f).items()}
+        self._partitions = {}
+
+    def types(self):
+        """
+        Returns the record types in the store with their number of records.
+        """
+        return {int(type): count for type, count in self.meta['partitions'].items()}
+
+    def partition(self, type):
+        """
+        Returns the columns and the id index of one record type (a name or a number),
+        mapped from disk, or None if the log has no records of that type.
+        """
+        if isinstance(type, str):
+            type = htsim_log.EVENT_TYPES[type]
+        if type not in self._partitions:
+            directory = os.path.join(self.store_dir, f"type_{type}")
+            if not os.path.isdir(directory):
+                return None
+            partition = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode='r')
+                         for name in STORE_COLUMNS + ['index_ids', 'index_offsets']}
+            self._partitions[type] = partition
+        return self._partitions[type]
+
+    def ids(self, pattern):
+        """
+        Returns the ids of the objects whose name matches the regular expression pattern.
+        """
+        regex = re.compile(pattern)
+        return sorted(id for id, name in self.names.items() if regex.search(name))
+
+    def query(self, type, ids=None, start=None, end=None, columns=None):
+        """
+        Returns the records of one type for the given object ids (all if None) whose
+        time in seconds is in [start, end), as a dict of columns in memory.
+        The records are grouped by id, in the order of ids, and are in time order within an id.
+        """
+        columns = columns or STORE_COLUMNS
+        partition = self.partition(type)
+        if partition is None:
+            return {name: np.zeros(0) for name in columns}
+
+        index_ids = partition['index_ids']
+        offsets = partition['index_offsets']
+        if ids is None:
+            positions = np.arange(len(index_ids))
+        else:
+            ids = np.asarray(list(ids), dtype=index_ids.dtype)
+            positions = np.searchsorted(index_ids, ids)
+            found = positions < len(index_ids)
+            found[found] = index_ids[positions[found]] == ids[found]
+            positions = positions[found]
+
+        time = partition['time']
+        slices = []
+        for position in positions:
+            first, last = int(offsets[position]), int(offsets[position + 1])
+            if start is not None:
+                first += int(np.searchsorted(time[first:last], start, side='left'))
+            if end is not None:
+                last = first + int(np.searchsorted(time[first:last], end, side='left'))
+            if last > first:
+                slices.append((first, last))
+
+        result = {}
+        for name in columns:
+            values = partition[name]
+            if slices:
+                result[name] = np.concatenate([values[first:last] for first, last in slices])
+            else:
+                result[name] = np.zeros(0, dtype=values.dtype)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert an htsim binary log into an indexed columnar store.')
+    parser.add_argument('logfile', help='The binary log (logout.dat).')
+    parser.add_argument('-idmap', default=None, help='The idmap.txt of the run.')
+    parser.add_argument('-store', default=None, help='The store directory (default: <logfile>.store).')
+    parser.add_argument('-force', action='store_true', help='Convert even if the store is up to date.')
+    args = parser.parse_args()
+
+    store_dir = args.store or args.logfile + ".store"
+    if args.force:
+        shutil.rmtree(store_dir, ignore_errors=True)
+    store = open_store(args.logfile, args.idmap, store_dir)
+    print(f"Store {store_dir}: {store.meta['numrecords']} records, {len(store.names)} named objects")
+    for type, count in sorted(store.types().items()):
+        print(f"  {htsim_log.TYPE_NAMES.get(type, type)}: {count} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# Mergeable quantile sketch for flow completion times.
+#
+# A QuantileSketch is a merging t-digest: values are collected in a buffer
+# and, once the buffer is full, folded into at most about `compression`
+# weighted centroids, small ones at the tails and large ones in the middle,
+# so tail quantiles stay accurate. Count, sum, sum of squares, minimum and
+# maximum are kept exactly, for the mean and variance. Until the buffer first
+# fills up the sketch holds every value and its quantiles are exact, taken by
+# nearest rank like the analysis scripts do.
+#
+# Sketches of different runs or seeds are combined with merge, and to_dict /
+# from_dict store them as JSON (e.g. in the result files of the runners).
+
+import math
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 500
+# Values collected before they are folded into centroids, as a multiple of the compression.
+BUFFER_FACTOR = 2
+
+
+class QuantileSketch:
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.count = 0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._means = np.zeros(0)
+        self._weights = np.zeros(0)
+        self._buffer = []
+        # True while every value added is still held, either in the buffer or as a centroid of weight one.
+        self.exact = True
+
+    def add(self, value):
+        value = float(value)
+        self._buffer.append(value)
+        self.count += 1
+        self.sum += value
+        self.sum_squares += value * value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.sum_squares += float(np.dot(values, values))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._buffer.extend(values.tolist())
+        if len(self._buffer) >= BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        """
+        Adds the values summarised by other to this sketch and returns it.
+        """
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_squares += other.sum_squares
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if other.exact:
+            self._buffer.extend(other._buffer)
+        else:
+            self._means = np.concatenate([self._means, other._means, np.asarray(other._buffer, dtype=float)])
+            self._weights = np.concatenate([self._weights, other._weights, np.ones(len(other._buffer))])
+            self.exact = False
+        if not self.exact or len(self._buffer) >= BUFFER_FACTOR * self.compression:
+            self._compress()
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def variance(self):
+        """
+        Returns the sample variance of the values added, or 0 for fewer than two.
+        """
+        if self.count < 2:
+            return 0.0
+        return max(0.0, (self.sum_squares - self.sum * self.mean) / (self.count - 1))
+
+    def _compress(self):
+        """
+        Folds the buffer into the centroids, merging neighbours as long as a centroid
+        spans at most one unit of the scale k(q) = compression / (2 pi) * asin(2q - 1).
+        """
+        means = np.concatenate([self._means, np.asarray(self._buffer, dtype=float)])
+        weights = np.concatenate([self._weights, np.ones(len(self._buffer))])
+        self._buffer = []
+        self.exact = False
+        order = np.argsort(means, kind='stable')
+        means = means[order]
+        weights = weights[order]
+        total = weights.sum()
+
+        def limit(weight_so_far):
+            k = self.compression / (2 * math.pi) * math.asin(2 * weight_so_far / total - 1) + 1
+            if k >= self.compression / 4:
+                return total
+            return total * (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+        merged_means = []
+        merged_weights = []
+        so_far = 0.0
+        current_mean = means[0]
+        current_weight = weights[0]
+        bound = limit(0.0)
+        for mean, weight in zip(means[1:].tolist(), weights[1:].tolist()):
+            if so_far + current_weight + weight <= bound:
+                current_mean += (mean - current_mean) * weight / (current_weight + weight)
+                current_weight += weight
+            else:
+                merged_means.append(current_mean)
+                merged_weights.append(current_weight)
+                so_far += current_weight
+                bound = limit(so_far)
+                current_mean = mean
+                current_weight = weight
+        merged_means.append(current_mean)
+        merged_weights.append(current_weight)
+        self._means = np.array(merged_means)
+        self._weights = np.array(merged_weights)
+
+    def _sorted_values(self):
+        return np.sort(np.concatenate([self._means, np.asarray(self._buffer, dtype=float)]))
+
+    def quantile(self, q):
+        """
+        Returns the q quantile (0 <= q <= 1) of the values added, or 0 if there are none.
+        """
+        if self.count == 0:
+            return 0.0
+        if self.exact:
+            values = self._sorted_values()
+            return float(values[min(int(q * len(values)), len(values) - 1)])
+        if self._buffer:
+            self._compress()
+
+        # Centroid i stands for the values around rank centers[i]; interpolate between centers.
+        centers = np.cumsum(self._weights) - self._weights / 2
+        rank = q * self.count
+        if rank <= centers[0]:
+            low, high, low_rank, high_rank = self.min, self._means[0], 0.0, centers[0]
+        elif rank >= centers[-1]:
+            low, high, low_rank, high_rank = self._means[-1], self.max, centers[-1], self.count
+        else:
+            i = int(np.searchsorted(centers, rank, side='right'))
+            low, high, low_rank, high_rank = self._means[i - 1], self._means[i], centers[i - 1], centers[i]
+        if high_rank <= low_rank:
+            return float(high)
+        return float(low + (high - low) * (rank - low_rank) / (high_rank - low_rank))
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
+
+    def cdf_points(self):
+        """
+        Returns the values and cumulative fractions to plot the CDF from: every value
+        while the sketch is exact, one point per centroid otherwise.
+        """
+        if self.count == 0:
+            return np.zeros(0), np.zeros(0)
+        if self.exact:
+            values = self._sorted_values()
+            return values, np.arange(1, len(values) + 1) / len(values)
+        if self._buffer:
+            self._compress()
+        return self._means.copy(), np.cumsum(self._weights) / self.count
+
+    def to_dict(self):
+        if not self.exact and self._buffer:
+            self._compress()
+        values = self._sorted_values() if self.exact else self._means
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'sum': self.sum,
+            'sum_squares': self.sum_squares,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'exact': self.exact,
+            'means': values.tolist(),
+            # Every value of an exact sketch has weight one.
+            'weights': [] if self.exact else self._weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data.get('compression', DEFAULT_COMPRESSION))
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        # Sketches stored before the sum of squares was kept have no variance, unless they hold every value
+        sketch.sum_squares = data.get('sum_squares', math.nan)
+        if data['exact']:
+            sketch._buffer = list(data['means'])
+            if 'sum_squares' not in data:
+                sketch.sum_squares = float(np.dot(sketch._buffer, sketch._buffer)) if sketch._buffer else 0.0
+        else:
+            sketch.exact = False
+            sketch._means = np.asarray(data['means'], dtype=float)
+            sketch._weights = np.asarray(data['weights'], dtype=float)
+        return sketch
+
+
+def merge_all(sketches, compression=DEFAULT_COMPRESSION):
+    """
+    Returns one sketch summarising all the given sketches (or their dicts).
+    """
+    merged = QuantileSketch(compression)
+    for sketch in sketches:
+        if sketch is None:
+            continue
+        if isinstance(sketch, dict):
+            sketch = QuantileSketch.from_dict(sketch)
+        merged.merge(sketch)
+    return merged
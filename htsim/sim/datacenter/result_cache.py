@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# Content-addressed cache of simulator runs.
+#
+# A run is keyed on the bytes of the simulator binary, the fully expanded
+# command line and the bytes of every input file named on it (the .cm and
+# .topo files), so an unchanged experiment is answered from the cache while
+# any rebuild of the binary or edit of an input file forces a rerun.
+# Each entry holds the parsed result as JSON and the gzipped raw stdout.
+# The cache is bounded in size and evicts the least recently used entries.
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR = ".htsim_cache"
+DEFAULT_CACHE_SIZE_MB = 4096
+
+
+def resolve_binary(binary):
+    """
+    Returns the path of the executable a command would run, or None if it cannot be found.
+    """
+    if os.sep in binary:
+        return binary if os.path.isfile(binary) else None
+    return shutil.which(binary)
+
+
+class ResultCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._digests = {}
+
+    def file_digest(self, path):
+        """
+        Returns the sha256 of a file, memoized on its size and modification time.
+        """
+        st = os.stat(path)
+        memo_key = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            self._digests[memo_key] = digest
+        return digest
+
+    def key(self, args):
+        """
+        Returns the cache key of a command line given as an argument list,
+        or None if the binary cannot be found.
+        """
+        binary = resolve_binary(args[0])
+        if binary is None:
+            return None
+        h = hashlib.sha256()
+        h.update(b"binary\0" + self.file_digest(binary).encode())
+        h.update(b"cmdline\0" + "\0".join(args).encode())
+        for arg in args[1:]:
+            if os.path.isfile(arg):
+                h.update(b"input\0" + arg.encode() + b"\0" + self.file_digest(arg).encode())
+        return h.hexdigest()
+
+    def _paths(self, key):
+        entry_dir = os.path.join(self.directory, key[:2])
+        return os.path.join(entry_dir, key + ".json"), os.path.join(entry_dir, key + ".out.gz")
+
+    def lookup(self, key, force=False):
+        """
+        Returns the cached result for a key and marks it as recently used, or None on a miss.
+        With force every lookup misses, so the run is repeated and its entry refreshed.
+        """
+        if key is None or force:
+            self.misses += 1
+            return None
+        result_path, _ = self._paths(key)
+        try:
+            with open(result_path, 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(result_path)
+        self.hits += 1
+        return result
+
+    def output_path(self, key):
+        """
+        Returns the path of the gzipped raw output stored for a key.
+        """
+        return self._paths(key)[1]
+
+    def new_output(self, key):
+        """
+        Returns a gzip text file, under a temporary name, that the raw output of a run
+        is streamed into. It becomes part of the entry when the run is stored.
+        """
+        entry_dir = os.path.dirname(self._paths(key)[0])
+        os.makedirs(entry_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=entry_dir, suffix=".tmp")
+        os.close(fd)
+        return gzip.open(tmp, 'wt')
+
+    def discard(self, raw):
+        """
+        Drops the raw output of a run that is not going to be stored.
+        """
+        raw.close()
+        os.unlink(raw.name)
+
+    def store(self, key, result, raw):
+        """
+        Stores the parsed result and the raw output file of a run.
+        Both files are written under temporary names and renamed, so concurrent
+        workers never leave a half-written entry behind.
+        """
+        result_path, output_path = self._paths(key)
+        raw.close()
+        os.replace(raw.name, output_path)
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(result_path), suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp, result_path)
+
+    def invalidate(self):
+        """
+        Drops every cached entry.
+        """
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        entries = []
+        total = 0
+        for entry_dir, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                key = filename[:-len(".json")]
+                result_path, output_path = self._paths(key)
+                size = os.path.getsize(result_path)
+                if os.path.exists(output_path):
+                    size += os.path.getsize(output_path)
+                entries.append((os.path.getmtime(result_path), size, key))
+                total += size
+
+        evicted = 0
+        entries.sort()
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.unlink(path)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def report(self):
+        return f"Result cache {self.directory}: {self.hits} hits, {self.misses} misses"
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Columnar result files written by the validation runners.
+#
+# A result file holds one row per experiment: its name, seed, command line and
+# parameters, exit status, tail, 99th percentile and minimum FCT, expected and
+# finished connection counts, the packet counters of the summary line, a
+# quantile sketch of the FCTs (see quantile_sketch) and, optionally, the
+# per-flow FCTs as arrays. Files ending in .parquet are written with pyarrow,
+# anything else as JSON with one list per column.
+
+import json
+
+import quantile_sketch
+
+COUNTERS = ['New', 'Rtx', 'RTS', 'Bounced', 'ACKs', 'NACKs', 'Pulls', 'sleek_pkts']
+COLUMNS = ['name', 'seed', 'command', 'params', 'returncode', 'failure', 'fct_tail', 'fct_p99', 'fct_min',
+           'connections', 'finished', 'wallclock'] + COUNTERS + ['fct_sketch']
+FLOW_COLUMNS = ['flow_names', 'flow_fcts']
+
+
+def make_row(name, command, params, result, connections, flows=False, seed=None):
+    """
+    Returns the row of one experiment from its result dict (see experiment_engine.run_experiment).
+    With flows the names and FCTs of its flows are included, in completion order; the result
+    only holds them when the run was asked for per-flow results (see experiment_engine.OutputParser).
+    """
+    failure = result.get('failure') or {}
+    counters = result.get('counters') or {}
+    row = {
+        'name': name,
+        'seed': seed,
+        'command': command,
+        'params': params,
+        'returncode': result.get('returncode', -1),
+        'failure': failure.get('kind', ""),
+        'fct_tail': result.get('fct_tail', 0.0),
+        'fct_p99': result.get('fct_p99', 0.0),
+        'fct_min': result.get('fct_min', 0.0),
+        'connections': connections,
+        'finished': result.get('finished', 0),
+        'wallclock': result.get('wallclock', 0.0),
+    }
+    for counter in COUNTERS:
+        row[counter] = counters.get(counter, 0)
+    row['fct_sketch'] = result.get('fct_sketch')
+    if flows:
+        row['flow_names'] = [flow[0] for flow in result.get('flows', [])]
+        row['flow_fcts'] = [flow[1] for flow in result.get('flows', [])]
+    return row
+
+
+def to_columns(rows):
+    """
+    Turns a list of rows into a dict of columns.
+    """
+    columns = list(COLUMNS)
+    if rows and 'flow_names' in rows[0]:
+        columns += FLOW_COLUMNS
+    return {column: [row[column] for row in rows] for column in columns}
+
+
+def to_rows(table):
+    """
+    Turns a dict of columns into a list of rows.
+    """
+    names = list(table)
+    return [dict(zip(names, values)) for values in zip(*(table[name] for name in names))]
+
+
+def write_results(rows, path):
+    """
+    Writes rows to a result file, as Parquet if path ends in .parquet and as JSON otherwise.
+    """
+    table = to_columns(rows)
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Writing " + path + " needs pyarrow; install it or use a .json result file")
+        pyarrow.parquet.write_table(pyarrow.table(table), path)
+    else:
+        with open(path, 'w') as f:
+            json.dump(table, f)
+
+
+def read_results(path):
+    """
+    Reads a result file back as a dict of columns.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(path).to_pydict()
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def fct_sketch(rows):
+    """
+    Returns the quantile sketch of the FCTs of all flows of the given rows, e.g.
+    every seed of one experiment, without reading their per-flow FCTs.
+    """
+    return quantile_sketch.merge_all(row.get('fct_sketch') for row in rows)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# History of simulator runs and the runtime and memory models fitted on it.
+#
+# Every finished run appends one JSON line with its command line, its wallclock
+# time, its peak resident memory and the features both are predicted from:
+# number of connections, number of nodes, total bytes to transfer and the -end
+# time. Each model is a least-squares fit of the log of the target on the log
+# of those features; a command line that already ran is predicted from its own
+# past runs instead. The models are fitted on the first prediction after new
+# runs were recorded, and only the last MAX_RECORDS runs are kept: older ones
+# are dropped from the file when the history is opened.
+
+import collections
+import json
+import math
+import os
+
+import numpy as np
+
+DEFAULT_HISTORY_FILE = ".htsim_history.jsonl"
+FEATURES = ['connections', 'nodes', 'total_bytes', 'end']
+TARGETS = ['wallclock', 'peak_rss']
+MAX_RECORDS = 10000
+
+
+def feature_row(features):
+    return [1.0] + [math.log(1.0 + float(features.get(name) or 0)) for name in FEATURES]
+
+
+class RunHistory:
+    def __init__(self, path=DEFAULT_HISTORY_FILE, max_records=MAX_RECORDS):
+        self.path = path
+        self.records = collections.deque(maxlen=max_records)
+        self._coefficients = {}
+        self._by_cmdline = {}
+        self._stale = True
+        lines = 0
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        self.records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        if lines > len(self.records):
+            self.trim()
+
+    def trim(self):
+        """
+        Rewrites the history file with the records kept.
+        """
+        partial = f"{self.path}.{os.getpid()}.tmp"
+        with open(partial, 'w') as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(partial, self.path)
+
+    def record(self, features, wallclock, **extra):
+        """
+        Appends a finished run to the history file.
+        """
+        record = dict(features)
+        record['wallclock'] = wallclock
+        record.update(extra)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        self.records.append(record)
+        self._stale = True
+
+    def fit(self):
+        """
+        Fits the models of every target on the recorded runs.
+        A model is only used once there are more runs than coefficients.
+        """
+        self._by_cmdline = {}
+        for record in self.records:
+            self._by_cmdline.setdefault(record.get('cmdline'), []).append(record)
+
+        for target in TARGETS:
+            rows = [r for r in self.records if (r.get(target) or 0) > 0]
+            if len(rows) <= len(FEATURES) + 1:
+                self._coefficients[target] = None
+                continue
+            a = np.array([feature_row(r) for r in rows])
+            b = np.log(np.array([r[target] for r in rows]))
+            self._coefficients[target], _, _, _ = np.linalg.lstsq(a, b, rcond=None)
+        self._stale = False
+
+    def predict(self, features, target='wallclock'):
+        """
+        Returns the predicted wallclock time of a run in seconds, or its peak resident
+        memory in bytes for target 'peak_rss', or None without enough history.
+        Past runs of the same command line give the mean runtime and the largest peak memory.
+        """
+        if self._stale:
+            self.fit()
+        past = [r[target] for r in self._by_cmdline.get(features.get('cmdline'), []) if r.get(target)]
+        if past:
+            return max(past) if target == 'peak_rss' else sum(past) / len(past)
+        coefficients = self._coefficients.get(target)
+        if coefficients is None:
+            return None
+        return float(math.exp(np.dot(coefficients, feature_row(features))))
+
+
+def makespan(durations, jobs):
+    """
+    Returns the makespan of running durations, in the given order, on jobs parallel slots.
+    """
+    slots = [0.0] * max(1, jobs)
+    for duration in durations:
+        i = slots.index(min(slots))
+        slots[i] += duration
+    return max(slots)
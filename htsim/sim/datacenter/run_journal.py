@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Append-only journal of the runs of a sweep, used to resume it after a crash.
+#
+# Every completed run appends one JSON line with its parameters, its command
+# line, its output path, its exit code, its failure (see
+# experiment_engine.classify_failure) and its parsed metrics. Each line is
+# flushed and fsync'd before the next run is reported, so a journal read back
+# after the sweep died lists every run that finished; a torn last line is
+# dropped when the journal is resumed.
+
+import json
+import os
+
+
+class RunJournal:
+    def __init__(self, path, resume=False):
+        """
+        Opens the journal at path. With resume the runs already journaled are
+        loaded, otherwise the journal is started afresh.
+        """
+        self.path = path
+        self.entries = {}
+        if resume and os.path.exists(path):
+            end = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    end += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[self.key(entry['params'])] = entry
+            # A torn last line is cut off, so that the next run is not appended to it.
+            if end < os.path.getsize(path):
+                os.truncate(path, end)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a' if resume else 'w')
+
+    @staticmethod
+    def key(params):
+        return json.dumps(params, sort_keys=True)
+
+    @staticmethod
+    def succeeded(entry):
+        """
+        Returns whether a journaled run succeeded: it exited with 0 and was not
+        classified as a failure, e.g. for flows that did not finish.
+        """
+        failure = entry.get('failure') or (entry.get('metrics') or {}).get('failure')
+        return entry['exit_code'] == 0 and not failure
+
+    def completed(self, params):
+        """
+        Returns the journal entry of a run that completed successfully and whose
+        output is still there, or None if the run has to be (re)done.
+        """
+        entry = self.entries.get(self.key(params))
+        if entry is None or not self.succeeded(entry):
+            return None
+        if entry.get('output') and not os.path.exists(entry['output']):
+            return None
+        return entry
+
+    def record(self, params, output, exit_code, metrics, command=None, failure=None):
+        """
+        Appends a completed run with its failure, None for a success, and forces it to disk.
+        """
+        entry = {'params': params, 'command': command, 'output': output, 'exit_code': exit_code,
+                 'failure': failure, 'metrics': metrics}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entries[self.key(params)] = entry
+
+    def close(self):
+        self._file.close()
+
+    def report(self):
+        done = sum(1 for entry in self.entries.values() if self.succeeded(entry))
+        return f"Run journal {self.path}: {done} completed runs, {len(self.entries) - done} failed"
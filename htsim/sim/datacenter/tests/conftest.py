@@ -0,0 +1,9 @@
+# The tools of sim/datacenter are scripts importing each other by module name,
+# so the tests import them from that folder (and cmgen from connection_matrices).
+
+import os
+import sys
+
+DATACENTER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(DATACENTER, "connection_matrices"))
+sys.path.insert(0, DATACENTER)
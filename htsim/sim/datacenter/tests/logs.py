@@ -0,0 +1,36 @@
+# Synthetic logout.dat files for the tests of the log readers.
+
+import numpy as np
+
+import htsim_log
+
+
+def make_records(**columns):
+    """
+    Returns records with the given columns, the other columns zero. type and event
+    default to 0, and ev is set from them like Logfile::transposeLog does.
+    """
+    count = len(next(iter(columns.values())))
+    records = np.zeros(count, dtype=htsim_log.RECORD_DTYPE)
+    event = columns.pop('event', 0)
+    for name, values in columns.items():
+        records[name] = values
+    records['ev'] = 100 * records['type'] + event
+    return records
+
+
+def write_log(path, records, names, transpose=False, numrecords=None):
+    """
+    Writes records as a finished log with the given names in its preamble.
+    """
+    preamble = "".join(f": {name}={id}\n" for id, name in names.items())
+    preamble += f"# numrecords={len(records) if numrecords is None else numrecords}\n"
+    preamble += f"# transpose={int(transpose)}\n# TRACE\n"
+    with open(path, 'wb') as f:
+        f.write(preamble.encode())
+        if transpose:
+            for name in htsim_log.COLUMNS:
+                f.write(np.ascontiguousarray(records[name]).tobytes())
+        else:
+            f.write(records.tobytes())
+    return str(path)
@@ -0,0 +1,45 @@
+import itertools
+from fractions import Fraction
+
+import pytest
+
+import check_regressions
+
+
+def exact_p_values(old, new):
+    """
+    Returns the one-sided p-values of the Mann-Whitney U of new against old by
+    enumerating every split of the pooled samples.
+    """
+    def u(olds, news):
+        return sum(Fraction(1) if b > a else Fraction(1, 2) if b == a else 0 for a in olds for b in news)
+
+    pooled = list(old) + list(new)
+    observed = u(old, new)
+    splits = [(u([pooled[i] for i in range(len(pooled)) if i not in chosen], [pooled[i] for i in chosen]))
+              for chosen in map(set, itertools.combinations(range(len(pooled)), len(new)))]
+    return (float(observed), sum(value >= observed for value in splits) / len(splits),
+            sum(value <= observed for value in splits) / len(splits))
+
+
+def test_separated_samples():
+    assert check_regressions.mann_whitney([1, 2, 3], [4, 5, 6]) == pytest.approx((9, 1 / 20, 1))
+    assert check_regressions.mann_whitney([1, 2, 3, 4], [5, 6, 7, 8]) == pytest.approx((16, 1 / 70, 1))
+    assert check_regressions.mann_whitney([5, 6, 7, 8], [1, 2, 3, 4]) == pytest.approx((0, 1, 1 / 70))
+
+
+@pytest.mark.parametrize('old, new', [
+    ([10.0, 12.5, 11.0, 13.0], [12.0, 14.0, 13.5, 15.0]),
+    ([3, 1, 4, 1, 5], [9, 2, 6, 5, 3]),
+    ([7, 7, 8, 9], [7, 8, 8, 10, 11]),
+    ([100, 101], [99, 102, 103]),
+])
+def test_against_enumeration(old, new):
+    assert check_regressions.mann_whitney(old, new) == pytest.approx(exact_p_values(old, new))
+
+
+def test_smallest_p_value():
+    assert check_regressions.smallest_p_value(3, 3) == pytest.approx(1 / 20)
+    assert check_regressions.smallest_p_value(4, 4) == pytest.approx(1 / 70)
+    assert check_regressions.seeds_needed(0.05) == 4
+    assert check_regressions.seeds_needed(0.01) == 5
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+import cmgen
+
+MATRICES = {
+    'permutation': lambda: cmgen.permutation(64, 64, 2000000, extrastarttime=0.001, randseed=3),
+    'incast': lambda: cmgen.incast(64, 16, 4096, extrastarttime=0.001, randseed=3),
+    'ring_allreduce': lambda: cmgen.ring_allreduce(64, 64, 8, 2000000, randseed=3),
+    'windowed_alltoall': lambda: cmgen.windowed_alltoall(32, 32, 8, 2, 4096, randseed=3, prio=True),
+}
+
+
+def assert_same(matrix, expected):
+    assert matrix.nodes == expected.nodes
+    assert np.array_equal(matrix.flows, expected.flows)
+    if expected.triggers is None:
+        assert matrix.triggers is None
+    else:
+        assert np.array_equal(matrix.triggers, expected.triggers)
+
+
+@pytest.mark.parametrize('name', sorted(MATRICES))
+def test_round_trip(tmp_path, name):
+    matrix = MATRICES[name]()
+    path = str(tmp_path / f"{name}.cm")
+    matrix.write(path)
+    assert_same(cmgen.read_text(path), matrix)
+
+    sidecar = cmgen.sidecar_path(path)
+    assert not os.path.exists(sidecar)
+    assert_same(cmgen.load(path), matrix)
+    assert cmgen.is_fresh(sidecar, path)
+    assert_same(cmgen.load(sidecar), matrix)
+
+
+def test_stale_sidecar(tmp_path):
+    path = str(tmp_path / "perm.cm")
+    MATRICES['permutation']().write(path, sidecar=True)
+    assert cmgen.is_fresh(cmgen.sidecar_path(path), path)
+
+    matrix = MATRICES['incast']()
+    matrix.write(path)
+    os.utime(path, ns=(0, 0))
+    assert not cmgen.is_fresh(cmgen.sidecar_path(path), path)
+    assert_same(cmgen.load(path), matrix)
+
+
+def test_seeded():
+    first = MATRICES['permutation']()
+    assert np.array_equal(first.flows, MATRICES['permutation']().flows)
+    assert not np.array_equal(first.flows, cmgen.permutation(64, 64, 2000000, extrastarttime=0.001, randseed=4).flows)
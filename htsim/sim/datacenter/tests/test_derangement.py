@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from cmgen import generators
+
+
+@pytest.mark.parametrize('count, group_size', [(2, 1), (3, 1), (17, 1), (1024, 1), (64, 8), (70, 8), (128, 64),
+                                               (96, 32)])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_invariants(count, group_size, seed):
+    dst = generators.derangement(count, np.random.default_rng(seed), group_size)
+    assert np.array_equal(np.sort(dst), np.arange(count))
+    assert not np.any(dst // group_size == np.arange(count) // group_size)
+
+
+def test_seeded():
+    first = generators.derangement(256, np.random.default_rng(5), 16)
+    assert np.array_equal(first, generators.derangement(256, np.random.default_rng(5), 16))
+    assert not np.array_equal(first, generators.derangement(256, np.random.default_rng(6), 16))
+
+
+@pytest.mark.parametrize('count, group_size', [(1, 1), (3, 2), (10, 6)])
+def test_impossible(count, group_size):
+    with pytest.raises(ValueError):
+        generators.derangement(count, np.random.default_rng(1), group_size)
@@ -0,0 +1,88 @@
+import os
+import stat
+import sys
+
+import experiment_engine
+import quantile_sketch
+import result_cache
+
+# Stands in for htsim_uec: logs the matrix it ran and prints a finished line per flow.
+FAKE_SIMULATOR = """#!{python}
+import sys
+cm = sys.argv[sys.argv.index("-tm") + 1]
+with open({log!r}, "a") as f:
+    f.write(cm + "\\n")
+flows = [line for line in open(cm) if "->" in line]
+for i, line in enumerate(flows):
+    print(f"Flow f{{i}} flowId {{i}} src dst finished at {{10.0 * (i + 1)}}")
+print("New: 1 Rtx: 0 RTS: 0")
+"""
+
+
+def write_matrix(path, flows, size):
+    with open(path, 'w') as f:
+        f.write(f"Nodes 16\nConnections {flows}\n")
+        for i in range(flows):
+            f.write(f"{i}->{(i + 1) % 16} id {i + 1} start 0 size {size}\n")
+    return str(path)
+
+
+def make_plan(tmp_path, sizes, target=""):
+    log = str(tmp_path / "runs.log")
+    simulator = tmp_path / "htsim_fake"
+    simulator.write_text(FAKE_SIMULATOR.format(python=sys.executable, log=log))
+    simulator.chmod(simulator.stat().st_mode | stat.S_IEXEC)
+    plan = tmp_path / "plan.txt"
+    with open(plan, 'w') as f:
+        for name, size in sizes:
+            f.write(write_matrix(tmp_path / f"{name}.cm", 4, size) + "\n")
+            f.write(f"!Experiment {name}\n!Binary {simulator}\n!Param -end 1000\n{target}")
+    return experiment_engine.parse_plan(str(plan)), log
+
+
+def test_lpt_runs_longest_first_and_reports_in_plan_order(tmp_path, capsys):
+    experiments, log = make_plan(tmp_path, [("small", 1000), ("large", 100000), ("medium", 10000)])
+    seen = []
+    reported = experiment_engine.run_plan(experiments, jobs=1, schedule='lpt',
+                                          on_result=lambda experiment, result: seen.append(experiment['name']))
+
+    ran = [os.path.splitext(os.path.basename(line.strip()))[0] for line in open(log)]
+    assert ran == ["large", "medium", "small"]
+    assert seen == ["small", "large", "medium"]
+    assert [experiment['name'] for experiment, _ in reported] == seen
+    assert all(result['failure'] is None and result['finished'] == 4 for _, result in reported)
+    output = capsys.readouterr().out
+    assert [output.index(f"Experiment: {name}") for name in seen] == sorted(
+        output.index(f"Experiment: {name}") for name in seen)
+
+
+def test_schedule_order():
+    features = [{'total_bytes': size} for size in (10, 30, 20)]
+    assert experiment_engine.schedule_order([0, 1, 2], features, None, 'lpt') == ([1, 2, 0], None)
+    assert experiment_engine.schedule_order([0, 1, 2], features, None, 'spt') == ([0, 2, 1], None)
+    assert experiment_engine.schedule_order([0, 1, 2], features, None, 'plan') == ([0, 1, 2], None)
+
+
+def test_flows_kept_only_for_targets(tmp_path):
+    experiments, _ = make_plan(tmp_path, [("perm", 1000)], target="!FCT f2 100\n")
+    (_, result), = experiment_engine.run_plan(experiments, jobs=1)
+    assert result['flows'] == [("f2", 30.0, 0)]
+    assert result['finished'] == 4 and result['fct_tail'] == 40.0
+    assert list(quantile_sketch.QuantileSketch.from_dict(result['fct_sketch']).cdf_points()[0]) == [10, 20, 30, 40]
+
+    experiments, _ = make_plan(tmp_path, [("perm", 1000)])
+    (_, result), = experiment_engine.run_plan(experiments, jobs=1)
+    assert 'flows' not in result
+
+
+def test_cached_results_reparse_flows(tmp_path):
+    experiments, log = make_plan(tmp_path, [("perm", 1000)])
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    (_, result), = experiment_engine.run_plan(experiments, jobs=1, cache=cache)
+    assert 'flows' not in result
+
+    (_, result), = experiment_engine.run_plan(experiments, jobs=1, cache=cache, results_flows=True)
+    assert result['cached']
+    assert [name for name, _, _ in result['flows']] == ["f0", "f1", "f2", "f3"]
+    assert len(open(log).readlines()) == 1
+
@@ -0,0 +1,33 @@
+import importlib.util
+import os
+
+import pytest
+
+ASSIGNMENT2 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assignment2")
+
+
+def load_script(path):
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0],
+                                                  os.path.join(ASSIGNMENT2, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='module')
+def scripts():
+    return load_script("task1/extract_fct_from_log.py"), load_script("task4/extract_fct.py")
+
+
+def test_scripts_agree_on_dctcp_events(tmp_path, scripts):
+    task1, task4 = scripts
+    output = tmp_path / "run.out"
+    output.write_text("1.000 DCTCP cwnd 10 Uec_0_16\n"
+                      "2.500 DCTCP cwnd 12 Uec_0_16 ack from Uec_16_0\n"
+                      "3.000 other Uec_0_16\n"
+                      "4.250 DCTCP cwnd 8 Uec_16_0\n")
+    first_last = task1.scan_dctcp_events(str(output))
+    first_last_count = task4.scan_dctcp_events(str(output))
+    assert first_last == {'Uec_0_16': (1.0, 2.5), 'Uec_16_0': (4.25, 4.25)}
+    assert {name: tuple(entry[:2]) for name, entry in first_last_count.items()} == first_last
+    assert first_last_count['Uec_0_16'][2] == 2
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import htsim_log
+import logs
+
+NAMES = {7: "Queue-up-LS0->US1", 9: "Queue-down-US1->LS0"}
+
+
+def make_records(count):
+    rng = np.random.default_rng(4)
+    types = rng.choice([htsim_log.EVENT_TYPES['QUEUE_EVENT'], htsim_log.EVENT_TYPES['QUEUE_APPROX']], count)
+    return logs.make_records(time=np.sort(rng.random(count)), type=types, id=rng.choice(list(NAMES), count),
+                             event=rng.integers(0, 3, count), val1=rng.random(count), val2=rng.random(count),
+                             val3=rng.random(count))
+
+
+def write_log(path, records, transpose, numrecords=None):
+    return logs.write_log(path, records, NAMES, transpose, numrecords)
+
+
+@pytest.mark.parametrize('transpose', [False, True])
+def test_layouts(tmp_path, transpose):
+    records = make_records(1000)
+    log = htsim_log.HtsimLog(write_log(tmp_path / "logout.dat", records, transpose))
+    assert log.transposed == transpose
+    assert len(log) == 1000
+    assert log.names == NAMES
+    assert np.array_equal(log.table(), records)
+    for name in htsim_log.COLUMNS:
+        assert np.array_equal(log[name], records[name])
+    assert np.array_equal(log['event'], records['ev'] - 100 * records['type'].astype(np.int64))
+
+    mask = log.select(types=['QUEUE_APPROX'], ids=log.ids("up"), start=0.25, end=0.75)
+    expected = ((records['type'] == htsim_log.EVENT_TYPES['QUEUE_APPROX']) & (records['id'] == 7)
+                & (records['time'] >= 0.25) & (records['time'] < 0.75))
+    assert np.array_equal(mask, expected)
+    assert np.array_equal(log.table(mask), records[expected])
+
+
+def test_idmap(tmp_path):
+    idmap = tmp_path / "idmap.txt"
+    idmap.write_text("7 stale\n11 Queue-up-US1->CS0\n")
+    log = htsim_log.HtsimLog(write_log(tmp_path / "logout.dat", make_records(10), False), str(idmap))
+    assert log.names == {**NAMES, 11: "Queue-up-US1->CS0"}
+
+
+def test_short_logs(tmp_path):
+    records = make_records(100)
+    assert len(htsim_log.HtsimLog(write_log(tmp_path / "plain.dat", records, False, numrecords=150))) == 100
+    with pytest.raises(ValueError):
+        htsim_log.HtsimLog(write_log(tmp_path / "transposed.dat", records, True, numrecords=150))
+    with open(tmp_path / "running.dat", 'wb') as f:
+        f.write(b": x=1\n# numrecords=0\n")
+    with pytest.raises(ValueError):
+        htsim_log.HtsimLog(str(tmp_path / "running.dat"))
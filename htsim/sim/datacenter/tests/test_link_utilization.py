@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import fat_tree_names
+import htsim_log
+import link_utilization
+import logs
+
+# Three ToR uplinks; link 11 stays idle.
+NAMES = {7: "LS0->US0(0)", 9: "LS0->US1(1)", 11: "LS1->US0(2)", 20: "US0->CS0(3)"}
+TRAFFIC = htsim_log.EVENT_TYPES['TRAFFIC_EVENT']
+QUEUE = htsim_log.EVENT_TYPES['QUEUE_EVENT']
+DEPART = htsim_log.TRAFFIC_EVENTS['DEPART']
+
+
+def open_log(tmp_path, **columns):
+    return htsim_log.HtsimLog(logs.write_log(tmp_path / "logout.dat", logs.make_records(**columns), NAMES))
+
+
+def test_idle_links_keep_a_row(tmp_path):
+    log = open_log(tmp_path, time=[0.01, 0.05, 0.15, 0.12], type=[TRAFFIC] * 4, id=[7, 7, 7, 9],
+                   event=[DEPART] * 4, val3=[1000, 2000, 3000, 0])
+    result = link_utilization.link_bytes(log, 0.1, ids=[11, 9, 7], packet_size=500)
+    assert result['source'] == 'traffic'
+    assert list(result['ids']) == [7, 9, 11]
+    assert np.array_equal(result['bytes'], [[3000, 3000], [0, 500], [0, 0]])
+    assert np.allclose(result['edges'], [0, 0.1, 0.2])
+
+    stats = link_utilization.imbalance(result['bytes'])
+    totals = np.array([6000, 500, 0])
+    assert stats['links'] == 3
+    assert stats['total_cv'] == pytest.approx(totals.std() / totals.mean())
+    assert stats['total_max_over_mean'] == pytest.approx(6000 / totals.mean())
+    # Bins of [3000, 0, 0] and [3000, 500, 0] bytes
+    assert np.allclose(stats['bin_max_over_mean'], [3, 3000 / (3500 / 3)])
+
+
+def test_without_ids_only_busy_links(tmp_path):
+    log = open_log(tmp_path, time=[0.01, 0.12], type=[TRAFFIC] * 2, id=[9, 7], event=[DEPART] * 2,
+                   val3=[100, 200])
+    result = link_utilization.link_bytes(log, 0.1)
+    assert list(result['ids']) == [7, 9]
+    assert np.array_equal(result['bytes'], [[0, 200], [100, 0]])
+
+
+def test_queue_events_and_window(tmp_path):
+    service = htsim_log.QUEUE_EVENTS['SERVICE']
+    log = open_log(tmp_path, time=[0.05, 0.15, 0.25, 0.35], type=[QUEUE] * 4, id=[7, 7, 9, 7],
+                   event=[service, service, service, htsim_log.QUEUE_EVENTS['DROP']])
+    result = link_utilization.link_bytes(log, 0.1, ids=[7, 9], start=0.1, end=0.3, packet_size=4000)
+    assert result['source'] == 'queue'
+    assert np.array_equal(result['bytes'], [[4000, 0], [0, 4000]])
+    # 0.32 Mbps carry 4000 bytes in 0.1 s
+    assert np.allclose(link_utilization.utilization(result['bytes'], result['edges'], 0.32), [[1, 0], [0, 1]])
+
+
+def test_tiers():
+    names = fat_tree_names.NameTable(NAMES)
+    assert list(link_utilization.link_ids(names, ['tor_up'])) == [7, 9, 11]
+    assert list(link_utilization.link_tiers(names, np.array([7, 20, 99]))) == ['tor_up', 'agg_up', '']
+    rows = link_utilization.tier_rows(names, np.array([20, 7, 11]))
+    assert list(rows) == ['tor_up', 'agg_up']
+    assert list(rows['tor_up']) == [1, 2]
@@ -0,0 +1,130 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import htsim_log
+import live_log
+import logs
+
+QUEUE_APPROX = htsim_log.EVENT_TYPES['QUEUE_APPROX']
+FLOW_EVENT = htsim_log.EVENT_TYPES['FLOW_EVENT']
+RANGE = htsim_log.QUEUE_APPROX_EVENTS['RANGE']
+START, FINISH = htsim_log.FLOW_EVENTS['START'], htsim_log.FLOW_EVENTS['FINISH']
+POLL = 0.01
+
+
+def raw(records):
+    """
+    Returns records as the simulator writes them while running, with ev not offset by the type.
+    """
+    records = records.copy()
+    records['ev'] -= 100 * records['type']
+    return records
+
+
+def queue_samples(count):
+    rng = np.random.default_rng(2)
+    return logs.make_records(time=np.sort(rng.random(count)), type=np.full(count, QUEUE_APPROX),
+                             id=rng.choice([2, 5], count), event=RANGE, val1=rng.integers(0, 1000, count),
+                             val3=rng.integers(0, 2000, count))
+
+
+def flow_events():
+    # Flows 1 and 2 take 10 and 30 us, flow 3 is still running at the queue sample at 50 us
+    return logs.make_records(time=np.array([0, 5, 10, 35, 40, 50]) * 1e-6, type=[FLOW_EVENT] * 5 + [QUEUE_APPROX],
+                             event=[START, START, FINISH, FINISH, START, RANGE], id=[0, 0, 0, 0, 0, 2],
+                             val1=[1, 2, 1, 2, 3, 0])
+
+
+def test_queue_stats():
+    records = queue_samples(500)
+    analysis = live_log.LiveAnalysis()
+    for chunk in np.array_split(raw(records), 7):
+        analysis.feed(chunk)
+    stats = analysis.queue_stats()
+    assert stats['id'].tolist() == [2, 5]
+    for k, id in enumerate([2, 5]):
+        samples = records[records['id'] == id]
+        assert stats['count'][k] == len(samples)
+        assert stats['mean'][k] == pytest.approx(np.mean(samples['val1']))
+        assert stats['stdev'][k] == pytest.approx(np.std(samples['val1'], ddof=1))
+        assert stats['max'][k] == np.max(samples['val3'])
+        assert stats['last'][k] == samples['val1'][-1]
+    assert analysis.records == 500
+    assert analysis.now == records['time'][-1]
+
+
+def test_flows_and_stop_rules():
+    analysis = live_log.LiveAnalysis(expected_flows=3)
+    records = raw(flow_events())
+    analysis.feed(records[:4])
+    assert (analysis.started, analysis.finished) == (2, 2)
+    assert analysis.fcts.max == pytest.approx(30)
+    assert analysis.stop_reason(all_finished=True) is None
+    assert analysis.stop_reason(max_fct_us=25) is not None
+
+    analysis.feed(records[4:])
+    assert analysis.tail_fct == pytest.approx(30)
+    assert analysis.stop_reason(max_fct_us=30) is None
+    analysis.feed(raw(logs.make_records(time=[100e-6], type=[FLOW_EVENT], event=[FINISH], val1=[3])))
+    assert analysis.tail_fct == pytest.approx(60)
+    assert analysis.stop_reason(all_finished=True) == "all 3 flows finished"
+
+
+def test_read_growing_file(tmp_path):
+    records = raw(queue_samples(100))
+    path = tmp_path / "logout.dat"
+    # A torn last record is not read until the rest of it is written
+    path.write_bytes(records.tobytes()[:-10])
+    chunks = list(live_log.read_stream(str(path), lambda: False, POLL))
+    assert np.array_equal(np.concatenate(chunks), records[:-1])
+
+
+def test_read_rewritten_file(tmp_path):
+    records = queue_samples(100)
+    path = tmp_path / "logout.dat"
+    path.write_bytes(raw(records[:40]).tobytes())
+    stream = live_log.read_stream(str(path), lambda: True, POLL)
+    assert np.array_equal(next(stream), raw(records[:40]))
+
+    # The simulator rewrites its log in place at exit, with a preamble and the ev offset
+    logs.write_log(path, records, {2: "LS0->US0(0)", 5: "LS0->US1(0)"})
+    assert np.array_equal(np.concatenate(list(stream)), raw(records[40:]))
+
+
+def test_read_finished_log(tmp_path):
+    path = logs.write_log(tmp_path / "logout.dat", queue_samples(10), {2: "LS0->US0(0)"})
+    with pytest.raises(ValueError):
+        list(live_log.read_stream(path, lambda: False, POLL))
+
+
+def test_read_fifo(tmp_path):
+    records = raw(queue_samples(2000))
+    path = str(tmp_path / "logout.fifo")
+    os.mkfifo(path)
+
+    def write():
+        with open(path, 'wb') as f:
+            for chunk in np.array_split(records, 5):
+                f.write(chunk.tobytes())
+                f.flush()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        chunks = list(live_log.read_stream(path, lambda: True, POLL))
+    finally:
+        writer.join()
+    assert np.array_equal(np.concatenate(chunks), records)
+
+
+def test_analyse_stops_early(tmp_path):
+    path = tmp_path / "logout.dat"
+    path.write_bytes(raw(flow_events()).tobytes())
+    analysis = live_log.LiveAnalysis(expected_flows=3)
+    stopped = []
+    reason = live_log.analyse(str(path), analysis, lambda: False, lambda: stopped.append(True), 0, max_fct_us=20)
+    assert reason.startswith("tail FCT")
+    assert stopped == [True]
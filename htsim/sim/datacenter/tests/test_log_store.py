@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+import htsim_log
+import log_store
+import logs
+
+NAMES = {3: "LS0->US0(0)", 5: "US0->CS0(0)", 8: "Switch_Core_0"}
+QUEUE_EVENT = htsim_log.EVENT_TYPES['QUEUE_EVENT']
+QUEUE_RECORD = htsim_log.EVENT_TYPES['QUEUE_RECORD']
+
+
+def make_records(count):
+    rng = np.random.default_rng(9)
+    return logs.make_records(time=np.sort(rng.random(count)), type=rng.choice([QUEUE_EVENT, QUEUE_RECORD], count),
+                             id=rng.choice(list(NAMES), count), event=rng.integers(0, 3, count),
+                             val1=rng.random(count), val2=rng.random(count), val3=rng.random(count))
+
+
+def expected(records, type, ids=None, start=None, end=None):
+    """
+    The records of a query, selected from the log by brute force: grouped by id in the
+    order of ids and in time order within an id.
+    """
+    groups = []
+    for id in (sorted(NAMES) if ids is None else ids):
+        mask = (records['type'] == type) & (records['id'] == id)
+        if start is not None:
+            mask &= records['time'] >= start
+        if end is not None:
+            mask &= records['time'] < end
+        groups.append(records[mask])
+    return np.concatenate(groups)
+
+
+@pytest.mark.parametrize('transpose', [False, True])
+@pytest.mark.parametrize('chunk', [log_store.CONVERT_CHUNK, 64])
+def test_convert(tmp_path, transpose, chunk):
+    records = make_records(1000)
+    log_path = logs.write_log(tmp_path / "logout.dat", records, NAMES, transpose)
+    log_store.convert(log_path, str(tmp_path / "store"), chunk=chunk)
+    store = log_store.LogStore(str(tmp_path / "store"))
+
+    assert store.names == NAMES
+    assert store.meta['numrecords'] == 1000
+    assert store.types() == {QUEUE_EVENT: int(np.sum(records['type'] == QUEUE_EVENT)),
+                             QUEUE_RECORD: int(np.sum(records['type'] == QUEUE_RECORD))}
+    for type in (QUEUE_EVENT, QUEUE_RECORD):
+        result = store.query(type)
+        want = expected(records, type)
+        for name in ('time', 'id', 'val1', 'val2', 'val3'):
+            assert np.array_equal(result[name], want[name])
+        assert np.array_equal(result['event'], want['ev'] - 100 * type)
+
+
+def test_query(tmp_path):
+    records = make_records(1000)
+    store = log_store.open_store(logs.write_log(tmp_path / "logout.dat", records, NAMES))
+
+    result = store.query('QUEUE_RECORD', ids=[5, 3], start=0.25, end=0.75, columns=['time', 'id'])
+    want = expected(records, QUEUE_RECORD, [5, 3], 0.25, 0.75)
+    assert sorted(result) == ['id', 'time']
+    assert np.array_equal(result['time'], want['time'])
+    assert np.array_equal(result['id'], want['id'])
+
+    assert store.ids(r"->") == [3, 5]
+    assert len(store.query(QUEUE_EVENT, ids=[4])['time']) == 0
+    assert len(store.query(QUEUE_EVENT, ids=[3], start=2.0)['time']) == 0
+    assert len(store.query('TCP_EVENT')['time']) == 0
+    assert store.partition('TCP_EVENT') is None
+
+
+def test_open_store_rebuilds(tmp_path):
+    log_path = logs.write_log(tmp_path / "logout.dat", make_records(100), NAMES)
+    store_dir = log_path + ".store"
+    log_store.open_store(log_path)
+    assert log_store.is_current(store_dir, log_path)
+
+    records = make_records(200)
+    logs.write_log(tmp_path / "logout.dat", records, NAMES)
+    os.utime(log_path, (0, 0))
+    assert not log_store.is_current(store_dir, log_path)
+    store = log_store.open_store(log_path)
+    assert store.meta['numrecords'] == 200
+    assert np.array_equal(store.query(QUEUE_EVENT)['time'], expected(records, QUEUE_EVENT)['time'])
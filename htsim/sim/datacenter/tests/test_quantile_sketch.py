@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import quantile_sketch
+
+
+def rank_error(values, estimate, q):
+    return abs(np.searchsorted(values, estimate, side='right') / len(values) - q)
+
+
+@pytest.mark.parametrize('q, tolerance', [(0.5, 0.01), (0.9, 0.005), (0.99, 0.001), (0.999, 0.0002)])
+def test_accuracy(q, tolerance):
+    values = np.random.default_rng(1).lognormal(3, 1.5, 200000)
+    sketch = quantile_sketch.QuantileSketch()
+    sketch.update(values)
+    assert not sketch.exact
+    assert rank_error(np.sort(values), sketch.quantile(q), q) <= tolerance
+
+
+def test_exact_nearest_rank():
+    values = np.random.default_rng(2).random(101)
+    sketch = quantile_sketch.QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    assert sketch.exact
+    ranked = np.sort(values)
+    for q in (0, 0.25, 0.5, 0.99, 1):
+        assert sketch.quantile(q) == ranked[min(int(q * 101), 100)]
+    assert (sketch.min, sketch.max, sketch.count) == (ranked[0], ranked[-1], 101)
+
+
+def test_merge_and_round_trip():
+    rng = np.random.default_rng(3)
+    parts = [rng.exponential(100, 50000) for _ in range(4)]
+    sketches = []
+    for part in parts:
+        sketch = quantile_sketch.QuantileSketch()
+        sketch.update(part)
+        sketches.append(quantile_sketch.QuantileSketch.from_dict(sketch.to_dict()))
+    merged = quantile_sketch.merge_all(sketches)
+    values = np.sort(np.concatenate(parts))
+    assert merged.count == len(values)
+    assert merged.sum == pytest.approx(values.sum())
+    for q in (0.5, 0.99):
+        assert rank_error(values, merged.quantile(q), q) <= 0.01 * (1 - q) + 0.001
+
+
+def test_empty():
+    assert quantile_sketch.QuantileSketch().quantile(0.99) == 0
+
+
+def test_exact_moments():
+    rng = np.random.default_rng(5)
+    first, second = rng.normal(500, 50, 3000), rng.normal(800, 20, 5)
+    sketch = quantile_sketch.QuantileSketch()
+    for value in first:
+        sketch.add(value)
+    other = quantile_sketch.QuantileSketch()
+    other.update(second)
+    sketch = quantile_sketch.QuantileSketch.from_dict(sketch.merge(other).to_dict())
+    values = np.concatenate([first, second])
+    assert sketch.mean == pytest.approx(values.mean())
+    assert sketch.variance() == pytest.approx(values.var(ddof=1))
+    assert (sketch.min, sketch.max) == (values.min(), values.max())
+
+
+def test_variance_of_old_dicts():
+    sketch = quantile_sketch.QuantileSketch()
+    sketch.update([1.0, 2.0, 4.0])
+    data = sketch.to_dict()
+    del data['sum_squares']
+    assert quantile_sketch.QuantileSketch.from_dict(data).variance() == pytest.approx(np.var([1, 2, 4], ddof=1))
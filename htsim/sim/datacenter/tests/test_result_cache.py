@@ -0,0 +1,72 @@
+import os
+
+import result_cache
+
+
+def make_binary(tmp_path):
+    binary = tmp_path / "htsim_fake"
+    binary.write_bytes(b"build 1")
+    return str(binary)
+
+
+def store(cache, key, result):
+    raw = cache.new_output(key)
+    raw.write("output of " + key)
+    cache.store(key, result, raw)
+
+
+def test_key_follows_binary_cmdline_and_inputs(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    binary = make_binary(tmp_path)
+    cm = tmp_path / "perm.cm"
+    cm.write_text("Nodes 2\n0->1 id 1 size 100\n")
+    args = [binary, "-tm", str(cm), "-end", "100"]
+
+    key = cache.key(args)
+    assert key == cache.key(list(args))
+    assert key != cache.key(args[:-1] + ["200"])
+
+    cm.write_text("Nodes 2\n0->1 id 1 size 200\n")
+    edited = cache.key(args)
+    assert edited != key
+
+    with open(binary, 'wb') as f:
+        f.write(b"build 2")
+    assert cache.key(args) not in (key, edited)
+
+
+def test_key_without_binary(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    assert cache.key([str(tmp_path / "missing"), "-tm", "perm.cm"]) is None
+    assert cache.lookup(None) is None
+
+
+def test_lookup_after_store(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    store(cache, "ab" * 32, {'returncode': 0, 'finished': 3})
+    assert cache.lookup("ab" * 32) == {'returncode': 0, 'finished': 3}
+    assert cache.lookup("ab" * 32, force=True) is None
+    assert cache.lookup("cd" * 32) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    keys = [str(i) * 64 for i in range(3)]
+    for age, key in enumerate(keys):
+        store(cache, key, {'returncode': 0, 'padding': "x" * 1000})
+        result_path, _ = cache._paths(key)
+        os.utime(result_path, (1000 + age, 1000 + age))
+    # A lookup makes the oldest entry the most recently used one.
+    assert cache.lookup(keys[0]) is not None
+
+    sizes = [sum(os.path.getsize(path) for path in cache._paths(key)) for key in keys]
+    cache.max_bytes = sum(sizes) - 1
+    assert cache.evict() == 1
+    assert cache.lookup(keys[1]) is None
+    assert cache.lookup(keys[0]) is not None
+    assert cache.lookup(keys[2]) is not None
+
+    cache.max_bytes = 0
+    assert cache.evict() == 2
+    assert not any(os.path.exists(path) for key in keys for path in cache._paths(key))
@@ -0,0 +1,55 @@
+import run_journal
+
+SUCCESS = {'name': "perm", 'cmdline': "./htsim_uec -tm perm.cm"}
+INCOMPLETE = {'name': "incast", 'cmdline': "./htsim_uec -tm incast.cm"}
+CRASHED = {'name': "a2a", 'cmdline': "./htsim_uec -tm a2a.cm"}
+MOVED = {'name': "moved", 'cmdline': "./htsim_uec -tm moved.cm"}
+
+
+def write_sweep(path, output):
+    journal = run_journal.RunJournal(path)
+    journal.record(SUCCESS, None, 0, {'finished': 8})
+    journal.record(INCOMPLETE, None, 0, {'finished': 7},
+                   failure={'kind': 'incomplete', 'detail': "7 of 8 flows finished", 'transient': False})
+    journal.record(CRASHED, None, -9, {}, failure={'kind': 'crash', 'detail': "SIGKILL", 'transient': True})
+    journal.record(MOVED, output, 0, {'finished': 8})
+    journal.close()
+
+
+def test_resume_skips_only_completed_runs(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    output = tmp_path / "moved.out"
+    output.write_text("")
+    write_sweep(path, str(output))
+    output.unlink()
+    # A sweep killed while writing a line leaves it torn.
+    with open(path, 'a') as f:
+        f.write('{"params": {"name": "torn"')
+
+    journal = run_journal.RunJournal(path, resume=True)
+    assert journal.completed(SUCCESS)['metrics'] == {'finished': 8}
+    assert journal.completed(INCOMPLETE) is None
+    assert journal.completed(CRASHED) is None
+    assert journal.completed(MOVED) is None
+    assert journal.completed({'name': "torn"}) is None
+    assert journal.report().endswith("2 completed runs, 2 failed")
+
+    journal.record(CRASHED, None, 0, {'finished': 8})
+    journal.close()
+    assert run_journal.RunJournal(path, resume=True).completed(CRASHED) is not None
+
+
+def test_failure_in_metrics(tmp_path):
+    journal = run_journal.RunJournal(str(tmp_path / "journal.jsonl"))
+    journal.record(INCOMPLETE, None, 0, {'failure': {'kind': 'incomplete'}})
+    assert journal.completed(INCOMPLETE) is None
+    journal.close()
+
+
+def test_without_resume_starts_afresh(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    write_sweep(path, None)
+    journal = run_journal.RunJournal(path)
+    assert journal.completed(SUCCESS) is None
+    journal.close()
+    assert open(path).read() == ""
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from cmgen import topology
+from cmgen.topo import pod_layout, read_topo
+
+# Like topologies/fat_tree_128_4os.topo: 32 racks of 4 hosts in 8 pods of 16, 4:1 at the aggregation tier
+FAT_TREE = """# 3 tier test tree
+Nodes 128
+Tiers 3
+Podsize 16
+
+Tier 0
+Downlink_speed_Gbps 100
+Radix_Down 4
+Radix_Up 4
+
+Tier 1
+Oversubscribed 4
+Downlink_speed_Gbps 100
+Radix_Down 4
+Radix_Up 1
+
+Tier 2
+Downlink_speed_Gbps 100
+Radix_Down 8
+"""
+
+# Like topologies/leaf_spine_tiny.topo: 4 racks of 8 hosts, 4:1 at the ToRs
+LEAF_SPINE = """Nodes 32
+Tiers 2
+Podsize 32
+
+Tier 0
+Downlink_speed_Gbps 100
+Radix_Down 8
+Radix_Up 2
+Oversubscribed 4
+
+Tier 1
+Downlink_speed_Gbps 100
+Radix_Down 4
+"""
+
+
+def write_topo(tmp_path, text):
+    path = tmp_path / "test.topo"
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.fixture
+def fat_tree(tmp_path):
+    return topology.topo_layout(write_topo(tmp_path, FAT_TREE))
+
+
+@pytest.fixture
+def leaf_spine(tmp_path):
+    return topology.topo_layout(write_topo(tmp_path, LEAF_SPINE))
+
+
+def test_read_topo(tmp_path):
+    topo = read_topo(write_topo(tmp_path, FAT_TREE))
+    assert (topo['nodes'], topo['tiers'], topo['podsize']) == (128, 3, 16)
+    assert [tier['oversubscribed'] for tier in topo['tier']] == [1, 4, 1]
+    assert topo['tier'][2]['radix_down'] == 8
+    assert pod_layout(topo) == {'tiers': 3, 'pods': 8, 'hosts_per_pod': 16, 'tors_per_pod': 4, 'aggs_per_pod': 4}
+
+
+def test_topo_layout(fat_tree, leaf_spine):
+    assert fat_tree == {'nodes': 128, 'tiers': 3, 'hosts_per_rack': 4, 'hosts_per_pod': 16, 'racks': 32, 'pods': 8,
+                        'hosts_per_block': 16, 'blocks': 8, 'oversubscribed': 4}
+    assert leaf_spine == {'nodes': 32, 'tiers': 2, 'hosts_per_rack': 8, 'hosts_per_pod': 32, 'racks': 4, 'pods': 1,
+                          'hosts_per_block': 8, 'blocks': 4, 'oversubscribed': 4}
+
+
+def test_topo_layout_partial_rack(tmp_path):
+    with pytest.raises(ValueError):
+        topology.topo_layout(write_topo(tmp_path, FAT_TREE), nodes=126)
+
+
+def test_top_tier(fat_tree):
+    assert topology.top_tier(fat_tree, [0, 0, 0], [3, 4, 16]).tolist() == [0, 1, 2]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_intra_rack(fat_tree, seed):
+    flows = topology.intra_rack(fat_tree, 100, 4096, extrastarttime=0.5, randseed=seed).flows
+    assert len(np.unique(flows['src'])) == 100
+    assert len(np.unique(flows['dst'])) == 100
+    assert np.all(flows['src'] != flows['dst'])
+    assert np.all(topology.top_tier(fat_tree, flows['src'], flows['dst']) == 0)
+    assert np.all(flows['start'] == 500000)
+    assert np.all(flows['size'] == 4096)
+
+
+@pytest.mark.parametrize('layout', ['fat_tree', 'leaf_spine'])
+@pytest.mark.parametrize('pattern', ['cross_pod', 'stress'])
+def test_crosses_top_tier(request, layout, pattern):
+    layout = request.getfixturevalue(layout)
+    flows = topology.PATTERNS[pattern](layout, layout['nodes'], 4096, randseed=7).flows
+    assert np.array_equal(np.sort(flows['src']), np.arange(layout['nodes']))
+    assert np.array_equal(np.sort(flows['dst']), np.arange(layout['nodes']))
+    assert np.all(topology.top_tier(layout, flows['src'], flows['dst']) == layout['tiers'] - 1)
+
+
+def test_stress_pairs_racks(fat_tree):
+    flows = topology.oversubscription_stress(fat_tree, 128, 4096, randseed=3).flows
+    rack = fat_tree['hosts_per_rack']
+    src_racks, dst_racks = flows['src'] // rack, flows['dst'] // rack
+    for src_rack in range(fat_tree['racks']):
+        assert len(np.unique(dst_racks[src_racks == src_rack])) == 1
+
+
+def test_rack_incast(fat_tree):
+    flows = topology.rack_incast(fat_tree, 20, 4096, extrastarttime=0.001, randseed=5).flows
+    rack = fat_tree['hosts_per_rack']
+    assert len(np.unique(flows['dst'] // rack)) == 1
+    assert np.bincount(flows['dst'] % rack).tolist() == [5, 5, 5, 5]
+    assert len(np.unique(flows['src'])) == 20
+    assert np.all(topology.top_tier(fat_tree, flows['src'], flows['dst']) == 2)
+    assert np.all((flows['start'] >= 0) & (flows['start'] <= 1000))
+
+
+def test_seeded(fat_tree):
+    first = topology.cross_pod(fat_tree, 64, 4096, randseed=11).flows
+    assert np.array_equal(first, topology.cross_pod(fat_tree, 64, 4096, randseed=11).flows)
+
+
+def test_impossible(fat_tree, tmp_path):
+    with pytest.raises(ValueError):
+        topology.intra_rack(fat_tree, 129, 4096, randseed=1)
+    with pytest.raises(ValueError):
+        topology.rack_incast(fat_tree, 113, 4096, randseed=1)
+    single_pod = topology.topo_layout(write_topo(tmp_path, FAT_TREE), nodes=16)
+    with pytest.raises(ValueError):
+        topology.cross_pod(single_pod, 16, 4096, randseed=1)
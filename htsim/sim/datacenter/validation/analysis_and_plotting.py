@@ -21,24 +21,24 @@ def get_cc_algo_order():
     """
     return ['NSCC', 'RCCC', 'RCCC+NSCC', 'RCCC+DCTCP']
 
-def get_list_fct(name_file_to_use):
+def get_max_fct(name_file_to_use):
     """
-    Extracts the finished-at runtime values from the file.
+    Returns the largest finished-at runtime value of the file, or None if it has none.
     """
-    temp_list = []
+    max_fct = None
+    pattern = re.compile(r"finished at (\d+)")
     try:
         with open(name_file_to_use) as file:
             for line in file:
-                pattern = r"finished at (\d+)"
-                match = re.search(pattern, line)
+                match = pattern.search(line)
                 if match:
-                    actual_fct = float(match.group(1))
-                    temp_list.append(actual_fct)
+                    fct = float(match.group(1))
+                    max_fct = fct if max_fct is None else max(max_fct, fct)
     except FileNotFoundError:
         print(f"File {name_file_to_use} not found.")
     except Exception as e:
         print(f"An error occurred: {e}")
-    return temp_list
+    return max_fct
 
 def get_num_rtx(name_file_to_use):
     """
@@ -129,12 +129,11 @@ def plot_runtimes(folder_name, folder_name_out, args):
     
     for filename in filenames:
         file_path = os.path.join(folder_name, filename)
-        runtimes = get_list_fct(file_path)
-        if not runtimes:
+        runtime = get_max_fct(file_path)
+        if runtime is None:
             print(f"No valid runtimes found in file {filename}. Skipping.")
             continue
         
-        runtime = max(runtimes)
         parts = filename.split('_')
         experiment = parts[0]
         # Extract the numeric part before 'to' in 'XtoY'
@@ -1,11 +1,25 @@
 import json
 import argparse
 from itertools import product
-import subprocess
 import os
 import shutil
+import sys
+import io
+import shlex
+import time
+import contextlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 import analysis_and_plotting
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import experiment_engine
+import results_table
+import run_history
+import run_journal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "connection_matrices"))
+import cmgen.cli
+
 def check_if_supported_os_ratio(os_ratio):
     if os_ratio not in ["1:1", "4:1", "8:1"]:
         print(f"Error: Oversubscription ratio {os_ratio} is not supported. Supported values are: 1:1, 1:4, 1:8")
@@ -74,11 +88,15 @@ def get_topology_file(topology_size, os_ratio):
     elif (topology_size == 8192):
         return f"../topologies/fat_tree_8192_{os_ratio}os.topo"
     
-def update_link_speed_topo_file(topo_file, link_speed):
+def write_link_speed_topo_file(topo_file, link_speed, destination):
+    """
+    Writes a copy of topo_file with its downlink speeds set to link_speed to destination.
+    The shared topology files are never modified, so concurrent runs cannot race on them.
+    """
     with open(topo_file, 'r') as file:
         lines = file.readlines()
     
-    with open(topo_file, 'w') as file:
+    with open(destination, 'w') as file:
         for line in lines:
             if 'Downlink_speed_Gbps' in line:
                 parts = line.split()
@@ -89,87 +107,76 @@ def update_link_speed_topo_file(topo_file, link_speed):
 
 def get_file_to_run(name_exp, parameters_experiment, global_params, args):
     dir = f"{name_exp}_size{global_params['topology_sizes']}_osratio{global_params['oversubscription_ratio']}_linkspeed{global_params['link_speed_Gbps']}/tmp"
-    cm_name = ""
     output_file = ""
+    generator = []
     extra_start_time = parameters_experiment.get('extra_start_time', 0)
     if (name_exp == "incast"):
-        cm_name = f"{args.output_folder}/{dir}/incast_{parameters_experiment['ratio']}to1_size{parameters_experiment['message_size_bytes']}B.cm"
         output_file = (f"{args.output_folder}/{dir}/incast_{parameters_experiment['ratio']}to1_size{parameters_experiment['message_size_bytes']}B_")
-        cmd_to_run_cm_file = "python ../connection_matrices/gen_incast.py {} {} {} {} {} 42 1".format(cm_name, global_params["topology_sizes"], parameters_experiment["ratio"], parameters_experiment["message_size_bytes"], extra_start_time)
-        try:
-            # Execute the command
-            print(f"Creating CM named {cmd_to_run_cm_file}")
-            subprocess.run(cmd_to_run_cm_file, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"An error occurred while running the command: {e}")
+        generator = "../connection_matrices/gen_incast.py {} {} {} {} 42 1".format(global_params["topology_sizes"], parameters_experiment["ratio"], parameters_experiment["message_size_bytes"], extra_start_time).split()
     
     elif (name_exp == "permutation"):
-        cm_name = f"{args.output_folder}/{dir}/permutation_size{parameters_experiment['message_size_bytes']}B.cm"
         output_file = f"{args.output_folder}/{dir}/permutation_size{parameters_experiment['message_size_bytes']}B_"
-        cmd_to_run_cm_file = "python ../connection_matrices/gen_permutation.py {} {} {} {} {} 42".format(cm_name, global_params["topology_sizes"], global_params["topology_sizes"], parameters_experiment["message_size_bytes"], extra_start_time)
-        try:
-            # Execute the command
-            print(f"Creating CM named {cmd_to_run_cm_file}")
-            subprocess.run(cmd_to_run_cm_file, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"An error occurred while running the command: {e}")
+        generator = "../connection_matrices/gen_permutation.py {} {} {} {} 42".format(global_params["topology_sizes"], global_params["topology_sizes"], parameters_experiment["message_size_bytes"], extra_start_time).split()
     
     elif (name_exp == "outcast_incast"):
         
         incast_ratio, outcast_ratio = get_incast_outcast_ratio(parameters_experiment['ratio']) 
-        cm_name = f"{args.output_folder}/{dir}/outcast_size{parameters_experiment['message_size_bytes']}B_incast{incast_ratio}_outcast{outcast_ratio}.cm"
         output_file = f"{args.output_folder}/{dir}/outcast_size{parameters_experiment['message_size_bytes']}B_incast{incast_ratio}_outcast{outcast_ratio}_"
-        cmd_to_run_cm_file = "python ../connection_matrices/gen_outcast_incast.py {} {} {} {} {} 42".format(cm_name, global_params["topology_sizes"], incast_ratio, outcast_ratio, parameters_experiment["message_size_bytes"])
-        try:
-            # Execute the command
-            print(f"Creating CM named {cmd_to_run_cm_file}")
-            subprocess.run(cmd_to_run_cm_file, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"An error occurred while running the command: {e}")
+        generator = "../connection_matrices/gen_outcast_incast.py {} {} {} {} 42".format(global_params["topology_sizes"], incast_ratio, outcast_ratio, parameters_experiment["message_size_bytes"]).split()
     
     elif (name_exp == "all_reduce_ring"):
         
-        cm_name = f"{args.output_folder}/{dir}/allreduce_size{parameters_experiment['message_size_bytes']}B.cm"
         output_file = f"{args.output_folder}/{dir}/allreduce_size{parameters_experiment['message_size_bytes']}B_"
-        cmd_to_run_cm_file = "python ../connection_matrices/gen_allreduce.py {} {} {} {} {} 1 42".format(cm_name, global_params["topology_sizes"], global_params["topology_sizes"], global_params["topology_sizes"], parameters_experiment["message_size_bytes"])
-        try:
-            # Execute the command
-            print(f"Creating CM named {cmd_to_run_cm_file}")
-            subprocess.run(cmd_to_run_cm_file, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"An error occurred while running the command: {e}")
+        generator = "../connection_matrices/gen_allreduce.py {} {} {} {} 1 42".format(global_params["topology_sizes"], global_params["topology_sizes"], global_params["topology_sizes"], parameters_experiment["message_size_bytes"]).split()
     
     elif (name_exp == "all_reduce_butterfly"):
         
-        cm_name = f"{args.output_folder}/{dir}/allreduceButterfly_size{parameters_experiment['message_size_bytes']}B.cm"
         output_file = f"{args.output_folder}/{dir}/allreduceButterfly_size{parameters_experiment['message_size_bytes']}B_"
-        cmd_to_run_cm_file = "python ../connection_matrices/gen_allreduce_butterfly.py {} {} {} {} {} 1 42".format(cm_name, global_params["topology_sizes"], 1, global_params["topology_sizes"], parameters_experiment["message_size_bytes"])
-        try:
-            # Execute the command
-            print(f"Creating CM named {cmd_to_run_cm_file}")
-            subprocess.run(cmd_to_run_cm_file, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"An error occurred while running the command: {e}")
+        generator = "../connection_matrices/gen_allreduce_butterfly.py {} {} {} {} 1 42".format(global_params["topology_sizes"], 1, global_params["topology_sizes"], parameters_experiment["message_size_bytes"]).split()
     
     elif (name_exp == "all_to_all_windowed"):
         
-        cm_name = f"{args.output_folder}/{dir}/alltoallwindowed_size{parameters_experiment['message_size_bytes']}B_window{parameters_experiment['parallel_connections']}.cm"
         output_file = f"{args.output_folder}/{dir}/alltoallwindowed_size{parameters_experiment['message_size_bytes']}B__window{parameters_experiment['parallel_connections']}_"
-        cmd_to_run_cm_file = "python ../connection_matrices/gen_serialn_alltoall.py {} {} {} {} {} {} 0 42".format(cm_name, global_params["topology_sizes"], global_params["topology_sizes"], global_params["topology_sizes"], parameters_experiment["parallel_connections"], parameters_experiment["message_size_bytes"])
-        try:
-            # Execute the command
-            print(f"Creating CM named {cmd_to_run_cm_file}")
-            subprocess.run(cmd_to_run_cm_file, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"An error occurred while running the command: {e}")
+        generator = "../connection_matrices/gen_serialn_alltoall.py {} {} {} {} {} 0 42".format(global_params["topology_sizes"], global_params["topology_sizes"], global_params["topology_sizes"], parameters_experiment["parallel_connections"], parameters_experiment["message_size_bytes"]).split()
 
     else:
         print("Error: Invalid experiment name")
         exit(1)
 
     other = get_general_experiment_details(parameters_experiment, global_params)
-        
-    return cm_name, output_file + other 
+
+    # The matrix only depends on the generator parameters, not on the link speed or the
+    # oversubscription ratio, so all runs that need it share a single copy.
+    cm_name = get_shared_matrix_file(generator, args)
+    generator.insert(1, cm_name)
+    return cm_name, output_file + other, generator
+
+def get_shared_matrix_file(generator, args):
+    """
+    Returns the path of the connection matrix of a generator command line (without its
+    output file), named after the generator script and its parameters.
+    """
+    script = os.path.splitext(os.path.basename(generator[0]))[0]
+    return os.path.join(args.output_folder, "connection_matrices", "_".join([script] + generator[1:]) + ".cm")
+
+def generate_connection_matrix(generator):
+    """
+    Generates a connection matrix from the command line of its generator script, with
+    the cmgen package in this process. Executed in the worker processes of the pool,
+    so no new interpreter is started per matrix. Returns the matrix_stats of the matrix,
+    read here so that the dispatch loop does not load it, or None if it was not written.
+    """
+    os.makedirs(os.path.dirname(generator[1]), exist_ok=True)
+    try:
+        # The generators print their parameters, which is not wanted here.
+        with contextlib.redirect_stdout(io.StringIO()):
+            cmgen.cli.run(generator)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            return None
+    if not os.path.exists(generator[1]):
+        return None
+    return experiment_engine.matrix_stats(generator[1])
 
 
 def read_json_file(file_path):
@@ -182,14 +189,32 @@ def get_global_combinations(global_parameters):
     values = (global_parameters[key] if isinstance(global_parameters[key], list) else [global_parameters[key]] for key in keys)
     return [dict(zip(keys, combination)) for combination in product(*values)]
 
-def run_experiment(experiment_name, global_params, subparams, args):
-    print(f"Running {experiment_name} with global parameters: {global_params} and subparameters: {subparams}")
+def parse_metrics(output_file, flows=False):
+    """
+    Returns the tail FCT, finished flow count and packet counters of a run output,
+    and with flows the name, FCT and size of every flow.
+    """
+    parser = experiment_engine.OutputParser(all_flows=flows)
+    with open(output_file, 'r', errors='replace') as file:
+        for line in file:
+            parser.feed(line)
+    return parser.result()
 
-    connection_matrix, output_file = get_file_to_run(experiment_name, subparams, global_params, args)
+def prepare_experiment(experiment_name, global_params, subparams, args):
+    """
+    Writes the private topology file of a run and returns the run, with the generator
+    of its connection matrix and its own working directory so the logout.dat and
+    idmap.txt written by concurrent runs do not collide.
+    """
+    connection_matrix, output_file, generator = get_file_to_run(experiment_name, subparams, global_params, args)
     output_file =  output_file + get_global_config(global_params) + ".out"
-    topo_file = get_topology_file(global_params["topology_sizes"], global_params["oversubscription_ratio"])
-    update_link_speed_topo_file(topo_file, global_params["link_speed_Gbps"])
-    
+    work_dir = output_file[:-len(".out")] + "_run"
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+    topo_template = get_topology_file(global_params["topology_sizes"], global_params["oversubscription_ratio"])
+    topo_file = os.path.join(work_dir, os.path.basename(topo_template))
+    write_link_speed_topo_file(topo_template, global_params["link_speed_Gbps"], topo_file)
+
     # Specific Parameters to use
     cc_algo_to_use = get_cc_name(global_params)
     disable_os_cc = ""
@@ -197,17 +222,36 @@ def run_experiment(experiment_name, global_params, subparams, args):
         disable_os_cc = "-force_disable_oversubscribed_cc"
     degraded_links = get_num_degraded_links(subparams)
 
-    # Launch experiment
-    command = "../htsim_uec -tm {} -end 1000000 {} -topo {} -linkspeed {} {} {} {} > {}".format(connection_matrix, cc_algo_to_use, topo_file, int(global_params["link_speed_Gbps"].replace("Gbps","")) * 1000, disable_os_cc, degraded_links, args.command_flags, output_file)
+    # The run executes in its working directory, so every path on the command line is absolute.
+    command = "{} -tm {} -end 1000000 {} -topo {} -linkspeed {} {} {} {}".format(os.path.abspath("../htsim_uec"), os.path.abspath(connection_matrix), cc_algo_to_use, os.path.abspath(topo_file), int(global_params["link_speed_Gbps"].replace("Gbps","")) * 1000, disable_os_cc, degraded_links, args.command_flags)
     command = ' '.join(command.split());
-    print(f"Executing: {command}")
-    try:
-        # Execute the command
-        subprocess.run(command, shell=True, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"An error occurred while running the command: {e}")
+    return {"name": experiment_name, "command": command + " > " + os.path.abspath(output_file),
+            "args": shlex.split(command), "output_file": output_file, "work_dir": work_dir,
+            "connection_matrix": connection_matrix, "generator": generator}
 
-def handle_experiment(experiment, global_combinations, global_params, args):
+def run_experiment(run, timeout=None, cpu_timeout=None, flows=False):
+    """
+    Runs one prepared experiment in its working directory. Executed in the worker processes of the pool.
+    The run is killed after timeout seconds of wallclock or cpu_timeout seconds of CPU time.
+    Returns the exit code, whether the run timed out, its wallclock time and the metrics parsed from the output.
+    """
+    print(f"Executing: {run['command']}", flush=True)
+    started = time.time()
+    with open(run["output_file"], "w") as output:
+        process = experiment_engine.start_process(run["args"], cpu_timeout, stdout=output, cwd=run["work_dir"])
+        watchdog = experiment_engine.Watchdog(process, timeout)
+        exit_code = process.wait()
+        watchdog.cancel()
+    metrics = parse_metrics(run["output_file"], flows)
+    return {"exit_code": exit_code, "timed_out": watchdog.fired, "wallclock": time.time() - started, "metrics": metrics}
+
+def handle_experiment(experiment, global_combinations, global_params, args, journal=None):
+    """
+    Prepares the runs of every parameter combination of an experiment and returns them,
+    with the (tmp, output) directory pairs to plot once they are done.
+    """
+    runs = []
+    plots = []
     for link_speed in global_params["link_speed_Gbps"]:
         for os_ratio in global_params["oversubscription_ratio"]:
             check_if_supported_os_ratio(os_ratio)
@@ -216,12 +260,15 @@ def handle_experiment(experiment, global_combinations, global_params, args):
                 directory = os.path.join(args.output_folder, f"{experiment['name']}_size{topology_size}_osratio{os_ratio}_linkspeed{link_speed}")
                 if not os.path.exists(directory):
                     os.makedirs(directory)
-                delete_folder_contents(directory)
+                # When resuming, the outputs of the completed runs are kept.
+                if not args.resume:
+                    delete_folder_contents(directory)
                 directory_tmp = os.path.join(args.output_folder, f"{experiment['name']}_size{topology_size}_osratio{os_ratio}_linkspeed{link_speed}")
                 directory_tmp = os.path.join(directory_tmp,"tmp")
                 if not os.path.exists(directory_tmp):
                     os.makedirs(directory_tmp)
-                delete_folder_contents(directory_tmp)
+                if not args.resume:
+                    delete_folder_contents(directory_tmp)
                 for cc_algo in global_params["cc_algo"]:
                     subparam_keys = [key for key in experiment.keys() if key != 'name']
                     subparam_values = (experiment[key] if isinstance(experiment[key], list) else [experiment[key]] for key in subparam_keys)
@@ -232,15 +279,110 @@ def handle_experiment(experiment, global_combinations, global_params, args):
                         glob_params["oversubscription_ratio"] = os_ratio
                         glob_params["topology_sizes"] = topology_size
                         glob_params["cc_algo"] = cc_algo
-                        run_experiment(experiment['name'], glob_params, subparams, args)
-                analysis_and_plotting.plot_runtimes(directory_tmp, directory, args)
+                        params = {"experiment": experiment['name'], "global_params": glob_params, "subparams": subparams,
+                                  "command_flags": args.command_flags}
+                        if journal is not None and journal.completed(params) is not None:
+                            print(f"Skipping {experiment['name']} with global parameters: {glob_params} and subparameters: {subparams}, already completed")
+                            continue
+                        print(f"Preparing {experiment['name']} with global parameters: {glob_params} and subparameters: {subparams}")
+                        run = prepare_experiment(experiment['name'], glob_params, subparams, args)
+                        run["params"] = params
+                        runs.append(run)
+                plots.append((directory_tmp, directory))
+    return runs, plots
 
-def launch_experiments(experiments, global_combinations, global_parameters, args):
+def launch_experiments(experiments, global_combinations, global_parameters, args, journal=None, history=None):
     print("\nExperiments:")
+    runs = []
+    plots = []
     for experiment in experiments:
         print(f"Experiment Name: {experiment['name']}")
-        handle_experiment(experiment, global_combinations, global_parameters, args)
-        
+        experiment_runs, experiment_plots = handle_experiment(experiment, global_combinations, global_parameters, args, journal)
+        runs += experiment_runs
+        plots += experiment_plots
+
+    # Runs that need the same matrix, whatever their CC algorithm, link speed or oversubscription
+    # ratio, share one generator command line, which is run once.
+    generators = {}
+    for run in runs:
+        generators.setdefault(tuple(run["generator"]), []).append(run)
+
+    print(f"\nGenerating {len(generators)} connection matrices and running {len(runs)} experiments with {args.jobs} parallel jobs")
+    sys.stdout.flush()
+    failures = []
+    failures_file = os.path.join(args.output_folder, "failures.json")
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        # All matrices are queued ahead of the runs, and each run is queued as soon as its matrix is written.
+        futures = {}
+
+        def submit(run):
+            run["attempts"] = run.get("attempts", 0) + 1
+            future = executor.submit(run_experiment, run, *run["timeouts"], args.results_flows)
+            futures[future] = ("run", run)
+            pending.add(future)
+
+        for generator in generators:
+            print(f"Creating CM named {' '.join(generator)}")
+            futures[executor.submit(generate_connection_matrix, generator)] = ("generate", generator)
+        pending = set(futures)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+            for future in done:
+                stage, item = futures.pop(future)
+                if stage == "generate":
+                    try:
+                        stats = future.result()
+                    except Exception as e:
+                        print(f"An error occurred while generating {item[1]}: {e}")
+                        stats = None
+                    for run in generators[item]:
+                        if stats is not None:
+                            # The timeouts of a run come from its predicted runtime unless given.
+                            run["connections"] = stats["connections"]
+                            run["features"] = dict(stats, cmdline=run["command"], binary=run["args"][0], end=1000000)
+                            predicted = history.predict(run["features"]) if history is not None else None
+                            run["timeouts"] = experiment_engine.run_timeouts(predicted, args.timeout, args.cpu_timeout,
+                                                                             args.timeout_factor)
+                            submit(run)
+                        else:
+                            print(f"An error occurred while generating {item[1]}, skipping {run['command']}")
+                            failures.append({"command": run["command"], "kind": "error", "detail": "connection matrix generation failed", "attempts": 0})
+                            if journal is not None:
+                                journal.record(run["params"], run["output_file"], -1, {}, run["command"],
+                                               failures[-1])
+                    continue
+
+                run = item
+                try:
+                    result = future.result()
+                    failure = experiment_engine.classify_failure(result["exit_code"], result["timed_out"],
+                                                                 result["metrics"]["finished"], run["connections"])
+                except Exception as e:
+                    result = {"exit_code": -1, "metrics": {}}
+                    failure = {"kind": "error", "detail": str(e), "transient": False}
+                if failure is not None and failure["transient"] and run["attempts"] <= args.retries:
+                    print(f"Retrying {run['command']} after {failure['kind']} ({failure['detail']})")
+                    submit(run)
+                    continue
+                if failure is not None:
+                    print(f"An error occurred while running the command: {run['command']}: {failure['kind']} ({failure['detail']})")
+                    failures.append({"command": run["command"], "kind": failure["kind"], "detail": failure["detail"],
+                                     "exit_code": result["exit_code"], "attempts": run["attempts"], "timeouts": run["timeouts"]})
+                elif history is not None:
+                    history.record(run["features"], result["wallclock"])
+                if journal is not None:
+                    metrics = dict(result["metrics"], returncode=result["exit_code"], failure=failure,
+                                   wallclock=result.get("wallclock", 0.0), connections=run["connections"])
+                    journal.record(run["params"], run["output_file"], result["exit_code"], metrics, run["command"],
+                                   failure)
+
+    print(f"{len(failures)} failed runs" + (f", see {failures_file}" if failures else ""))
+    with open(failures_file, "w") as file:
+        json.dump(failures, file, indent=1)
+
+    for directory_tmp, directory in plots:
+        analysis_and_plotting.plot_runtimes(directory_tmp, directory, args)
 
 def main():
     parser = argparse.ArgumentParser(description='Read and parse a JSON file containing experiments.')
@@ -248,6 +390,16 @@ def main():
     parser.add_argument('--show_plot', action='store_true', help='A boolean flag')
     parser.add_argument('--output_folder', required=False, help='Parent output folder where to save all results', default="experiments")
     parser.add_argument('--command_flags', required=False, help='Additional command flags to run with each experiment. Include in \"\", e.g. \"-log queue_usage\".', default="")
+    parser.add_argument('--journal', required=False, help='Journal of completed runs, by default journal.jsonl in the output folder.', default=None)
+    parser.add_argument('-j', '--jobs', type=int, required=False, help='Number of simulator runs in flight at once (default: one per core).', default=os.cpu_count() or 1)
+    parser.add_argument('--resume', action='store_true', help='Keep the previous outputs and only run the experiments the journal does not have as completed.')
+    parser.add_argument('--results', required=False, help='Result file with one row per run, Parquet if it ends in .parquet (default: results.json in the output folder).', default=None)
+    parser.add_argument('--results_flows', action='store_true', help='Add the per-flow FCTs to the result file.')
+    parser.add_argument('--history', required=False, help='Run history the runtimes, and so the default timeouts, are predicted from.', default=run_history.DEFAULT_HISTORY_FILE)
+    parser.add_argument('--timeout', type=float, required=False, help='Wallclock seconds after which a run is killed (default: derived from its predicted runtime).', default=None)
+    parser.add_argument('--cpu_timeout', type=float, required=False, help='CPU seconds after which a run is killed (default: derived from its predicted runtime).', default=None)
+    parser.add_argument('--timeout_factor', type=float, required=False, help='Multiple of the predicted runtime the default timeouts allow.', default=experiment_engine.DEFAULT_TIMEOUT_FACTOR)
+    parser.add_argument('--retries', type=int, required=False, help='Number of times a run killed from outside (e.g. by the OOM killer) is retried.', default=1)
 
     args = parser.parse_args()
 
@@ -271,8 +423,20 @@ def main():
     # Get all global parameter combinations
     global_combinations = get_global_combinations(global_parameters)
     
+    journal = run_journal.RunJournal(args.journal or os.path.join(args.output_folder, "journal.jsonl"), args.resume)
+    history = run_history.RunHistory(args.history)
+
     # Print experiments and handle each experiment specifically
-    launch_experiments(data['experiments'], global_combinations, global_parameters, args)
+    launch_experiments(data['experiments'], global_combinations, global_parameters, args, journal, history)
+    print(journal.report())
+
+    # The result file covers every run in the journal, including the ones done before a resume.
+    rows = []
+    for entry in journal.entries.values():
+        name = os.path.basename(entry["output"])[:-len(".out")]
+        rows.append(results_table.make_row(name, entry.get("command") or "", json.dumps(entry["params"], sort_keys=True),
+                                           entry["metrics"], entry["metrics"].get("connections", 0), args.results_flows))
+    results_table.write_results(rows, args.results or os.path.join(args.output_folder, "results.json"))
 
 if __name__ == "__main__":
     main()
@@ -6,6 +6,7 @@
 #include <iomanip>
 #include <ios>
 #include <vector>
+#include <sys/stat.h>
 
 RawLogEvent::RawLogEvent(double time, uint32_t type, uint32_t id, uint32_t ev, 
                          double val1, double val2, double val3, string name = "") :
@@ -38,7 +39,11 @@ Logfile::Logfile(const string& filename, EventList& eventlist)
 Logfile::~Logfile() {
     if (_logfile != NULL) {
         fclose(_logfile);
-        transposeLog();
+        // A log written to a pipe (e.g. read live by live_log.py) cannot be read back and rewritten
+        struct stat st;
+        if (stat(_logfilename.c_str(), &st) == 0 && S_ISREG(st.st_mode)) {
+            transposeLog();
+        }
     }
 }
 
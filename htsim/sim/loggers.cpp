@@ -442,7 +442,7 @@ void TrafficLoggerSimple::logTraffic(Packet& pkt, Logged& location,
                           ev,
                           pkt.flow().get_id(),
                           pkt.id(),
-                          0); 
+                          pkt.size()); 
 }
 
 string TrafficLoggerSimple::event_to_str(RawLogEvent& event) {